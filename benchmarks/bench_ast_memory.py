@@ -0,0 +1,48 @@
+"""Bytes per AST node for a large generated program.
+
+    python -m benchmarks.bench_ast_memory [size_in_kb]
+"""
+import sys
+import tracemalloc
+
+from monkey.lexer import TableLexer
+from monkey.parser import Parser
+from .sources import generate_program
+
+
+def count_nodes(program):
+    count = 0
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not type(node).__module__.endswith('ast'):
+            continue
+        count += 1
+        for cls in type(node).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                stack.append(getattr(node, name, None))
+        stack.extend(getattr(node, '__dict__', {}).values())
+    return count
+
+
+def main():
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 512
+    source = generate_program(int(size * 1024))
+
+    tracemalloc.start()
+    # the lexer and parser are dropped before measuring, so only the tree
+    # and whatever it keeps alive (tokens, literals) is counted
+    program = Parser(TableLexer(source)).parse_program()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = count_nodes(program)
+    print('source: {} chars'.format(len(source)))
+    print('{} nodes, {} bytes, {:.1f} bytes/node'.format(nodes, size, size / nodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Throughput of monkey.batch on a corpus of many small scripts.
+
+    python -m benchmarks.bench_batch [files]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from monkey.batch import check_paths
+from .sources import generate_program
+
+
+def run(directory, workers, chunk_bytes=256 * 1024):
+    start = time.perf_counter()
+    count = sum(1 for _ in check_paths([directory], workers, chunk_bytes))
+    return count, time.perf_counter() - start
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(2048)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(files):
+            with open(os.path.join(directory, 'script{}.mk'.format(i)), 'w') as f:
+                f.write(source)
+
+        cpus = os.cpu_count() or 1
+        print('{} files of {} chars, {} CPUs'.format(files, len(source), cpus))
+        _, base = run(directory, 1)
+        print('{:>2} workers: {:>6.2f}s'.format(1, base))
+        workers = 2
+        while workers <= cpus:
+            _, elapsed = run(directory, workers)
+            print('{:>2} workers: {:>6.2f}s  {:.1f}x'.format(workers, elapsed, base / elapsed))
+            workers *= 2
+        _, elapsed = run(directory, max(cpus, 2), chunk_bytes=1)
+        print('one file per task, {} workers: {:.2f}s'.format(max(cpus, 2), elapsed))
+
+
+if __name__ == '__main__':
+    main()
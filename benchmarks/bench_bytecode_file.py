@@ -0,0 +1,117 @@
+"""Cold start to first result: running a script from source (parse,
+compile, optimize, run on the VM) against running its precompiled
+bytecode file (mmap, load, run).
+
+Each case is timed in process, phase by phase, and as a fresh
+`python -m monkey.main` process, which includes interpreter startup.
+
+    python -m benchmarks.bench_bytecode_file
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from monkey import bytecode_file
+from monkey.compiler import Compiler
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.peephole import optimize
+from monkey.vm import VM
+
+TEMPLATE = '''let value{n} = {i} * (3 + {i}) - 7;
+let name{n} = "item number {i}";
+let items{n} = [value{n}, {i}, {i} + 1];
+let check{n} = fn(x) {{
+    if (x < {i}) {{
+        return name{n};
+    }} else {{
+        return len(name{n}) + x - value{n};
+    }}
+}};
+let total = total + check{n}(items{n}[1]);
+'''
+
+
+def letters(i):
+    # identifiers cannot contain digits
+    name = ''
+    while True:
+        name += chr(ord('a') + i % 26)
+        i //= 26
+        if i == 0:
+            return name
+
+
+def generate_program(size):
+    """A script of roughly `size` characters, mostly function definitions
+    and calls, ending with a result."""
+    parts = ['let total = 0;\n']
+    length = 0
+    i = 0
+    while length < size:
+        chunk = TEMPLATE.format(i=i, n=letters(i))
+        parts.append(chunk)
+        length += len(chunk)
+        i += 1
+    parts.append('total\n')
+    return ''.join(parts)
+
+
+def best(run, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def from_source(path):
+    with open(path, encoding='utf-8') as f:
+        tree = Parser(Lexer(f.read())).parse_program()
+    compiler = Compiler()
+    compiler.compile(tree)
+    return VM(optimize(compiler.bytecode())).run()
+
+
+def from_bytecode(path):
+    return VM(bytecode_file.load(path)).run()
+
+
+def process(*args):
+    def run():
+        return subprocess.run([sys.executable, '-m', 'monkey.main'] + list(args),
+                              check=True, capture_output=True).stdout
+    return run
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    print('{:<10}{:>10}{:>12}{:>12}{:>9}{:>14}{:>14}{:>9}'.format(
+        'size', 'file', 'source', 'bytecode', 'speedup', 'source proc', 'bytecode proc', 'speedup'))
+    for size in (10000, 100000, 1000000):
+        source = os.path.join(directory, 'program{}.mk'.format(size))
+        compiled = os.path.join(directory, 'program{}.mkc'.format(size))
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(generate_program(size))
+        subprocess.run([sys.executable, '-m', 'monkey.main', '--compile', source], check=True)
+
+        source_time, expected = best(lambda: from_source(source))
+        bytecode_time, result = best(lambda: from_bytecode(compiled))
+        assert result.inspect() == expected.inspect(), (result.inspect(), expected.inspect())
+        source_proc, out = best(process('--engine', 'vm', source), repeat=3)
+        bytecode_proc, compiled_out = best(process(compiled), repeat=3)
+        assert out == compiled_out, (out, compiled_out)
+        print('{:<10}{:>9}K{:>11.4f}s{:>11.4f}s{:>8.1f}x{:>13.4f}s{:>13.4f}s{:>8.1f}x'.format(
+            size, os.path.getsize(compiled) // 1024, source_time, bytecode_time,
+            source_time / bytecode_time, source_proc, bytecode_proc, source_proc / bytecode_proc))
+
+        os.remove(source)
+        os.remove(compiled)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Time to get a Program from source: parsing versus ParseCache hits.
+
+    python -m benchmarks.bench_cache [size_in_kb]
+"""
+import sys
+import tempfile
+import time
+
+from monkey.cache import ParseCache
+from .sources import generate_program
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 256
+    source = generate_program(int(size * 1024))
+    print('source: {} chars'.format(len(source)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        miss = timed(ParseCache(directory).parse, source)
+        disk = timed(ParseCache(directory).parse, source)
+        c = ParseCache(directory)
+        c.parse(source)
+        memory = timed(c.parse, source)
+
+    print('miss (lex + parse + store): {:>9.2f} ms'.format(miss * 1000))
+    print('disk hit:                   {:>9.2f} ms'.format(disk * 1000))
+    print('memory hit:                 {:>9.2f} ms'.format(memory * 1000))
+
+
+if __name__ == '__main__':
+    main()
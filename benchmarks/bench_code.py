@@ -0,0 +1,52 @@
+"""Encoding and decoding instructions with the precomputed struct layouts
+of monkey.code, against encoding operands one by one with int.to_bytes.
+
+    python -m benchmarks.bench_code
+"""
+import timeit
+
+from monkey.code import DefinitionType, Instructions, definitions, make, read_operands
+
+N = 200000
+GET_FREE = int(DefinitionType.op_get_free)
+
+
+def make_by_bytes(op, operands):
+    # what make() did before the layouts
+    instruction = bytearray([op])
+    for operand, width in zip(operands, definitions[op]['operands_widths']):
+        instruction += operand.to_bytes(width, 'big')
+    return instruction
+
+
+def read_by_bytes(op, instructions, offset):
+    operands = []
+    offset += 1
+    for width in definitions[op]['operands_widths']:
+        operands.append(int.from_bytes(instructions[offset:offset + width], 'big'))
+        offset += width
+    return operands
+
+
+def per_call(stmt, namespace):
+    return min(timeit.repeat(stmt, globals=namespace, number=N, repeat=5)) / N * 1e9
+
+
+def main():
+    view = memoryview(make(GET_FREE, (2, 3)))
+    namespace = dict(globals(), view=view)
+    print('{:<14}{:>12}{:>12}'.format('', 'to_bytes', 'struct'))
+    print('{:<14}{:>10.0f}ns{:>10.0f}ns'.format(
+        'make',
+        per_call('make_by_bytes(GET_FREE, (2, 3))', namespace),
+        per_call('make(GET_FREE, (2, 3))', namespace)))
+    print('{:<14}{:>10.0f}ns{:>10.0f}ns'.format(
+        'read_operands',
+        per_call('read_by_bytes(GET_FREE, view, 0)', namespace),
+        per_call('read_operands(GET_FREE, view, 0)', namespace)))
+    print()
+    print(Instructions(bytes(view)), end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Cost of finding the evaluation of a node: the handler table of
+monkey.evaluator versus the isinstance chain it replaced.
+
+    python -m benchmarks.bench_dispatch
+"""
+import sys
+import time
+import timeit
+
+from monkey import ast
+from monkey.environment import Environment
+from monkey.evaluator import evaluate, handlers
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from .programs import FIB, program
+
+# the order in which evaluate() used to test node types
+CHAIN = (
+    ast.Program,
+    ast.IntegerLiteral,
+    ast.ExpressionStatement,
+    ast.Boolean,
+    ast.PrefixExpression,
+    ast.InfixExpression,
+    ast.BlockStatement,
+    ast.IfExpression,
+    ast.ReturnStatement,
+    ast.LetStatement,
+    ast.Identifier,
+    ast.FunctionLiteral,
+    ast.CallExpression,
+    ast.StringLiteral,
+    ast.ArrayLiteral,
+    ast.IndexExpression,
+)
+
+
+def isinstance_dispatch(node):
+    # same tests as the old chain, returning the position instead of evaluating
+    if isinstance(node, ast.Program):
+        return 0
+    elif isinstance(node, ast.IntegerLiteral):
+        return 1
+    elif isinstance(node, ast.ExpressionStatement):
+        return 2
+    elif isinstance(node, ast.Boolean):
+        return 3
+    elif isinstance(node, ast.PrefixExpression):
+        return 4
+    elif isinstance(node, ast.InfixExpression):
+        return 5
+    elif isinstance(node, ast.BlockStatement):
+        return 6
+    elif isinstance(node, ast.IfExpression):
+        return 7
+    elif isinstance(node, ast.ReturnStatement):
+        return 8
+    elif isinstance(node, ast.LetStatement):
+        return 9
+    elif isinstance(node, ast.Identifier):
+        return 10
+    elif isinstance(node, ast.FunctionLiteral):
+        return 11
+    elif isinstance(node, ast.CallExpression):
+        return 12
+    elif isinstance(node, ast.StringLiteral):
+        return 13
+    elif isinstance(node, ast.ArrayLiteral):
+        return 14
+    elif isinstance(node, ast.IndexExpression):
+        return 15
+    return None
+
+
+def table_dispatch(node):
+    return handlers.get(type(node))
+
+
+def sample_nodes():
+    source = 'let x = -1; return fn(y) { if (true) { [y, "s"][x + 1](2) } };'
+    program = Parser(Lexer(source)).parse_program()
+    nodes = {}
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, ast.Node):
+            nodes.setdefault(type(node), node)
+            for cls in type(node).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    stack.append(getattr(node, name))
+    return nodes
+
+
+def main():
+    nodes = sample_nodes()
+    number = 200000
+    print('{:<20} {:>10} {:>10}   (ns per dispatch)'.format('', 'isinstance', 'table'))
+    for node_type in CHAIN:
+        node = nodes[node_type]
+        chain = min(timeit.repeat(lambda: isinstance_dispatch(node), number=number, repeat=3))
+        table = min(timeit.repeat(lambda: table_dispatch(node), number=number, repeat=3))
+        print('{:<20} {:>10.0f} {:>10.0f}'.format(node_type.__name__, chain / number * 1e9, table / number * 1e9))
+
+    sys.setrecursionlimit(10000)
+    fib = Parser(Lexer(program(FIB, 20))).parse_program()
+    start = time.perf_counter()
+    evaluate(fib, Environment())
+    print('fib(20) with evaluate: {:.3f}s'.format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Run time of the execution engines on recursive fib, array indexing and
+string building. The bytecode VM is timed with the compilation.
+
+    python -m benchmarks.bench_engines [scale]
+"""
+import sys
+import time
+
+from monkey.closure_compiler import execute
+from monkey.compiler import Compiler
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.stack_evaluator import stack_evaluate
+from monkey.vm import VM
+from .programs import ARRAY, CLOSURE, FIB, STRING, program
+
+
+
+def vm(tree, env):
+    compiler = Compiler()
+    compiler.compile(tree)
+    return VM(compiler.bytecode()).run()
+
+
+ENGINES = [
+    ('evaluate', evaluate),
+    ('closures', execute),
+    ('stack', stack_evaluate),
+    ('vm', vm),
+]
+
+
+def timed(engine, tree, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = engine(tree, Environment())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('fib(20)', program(FIB, 20 + scale - 1)),
+        ('array sum 2000', program(ARRAY, 2000 * scale)),
+        ('string 2000', program(STRING, 2000 * scale)),
+        ('closure 2000', program(CLOSURE, 2000 * scale)),
+    ]
+    print('{:<16}'.format('') + ''.join('{:>12}'.format(name) for name, _ in ENGINES) + '  best speedup')
+    for name, source in cases:
+        tree = Parser(Lexer(source)).parse_program()
+        times = []
+        results = set()
+        for _, engine in ENGINES:
+            elapsed, result = timed(engine, tree)
+            times.append(elapsed)
+            results.add(result.inspect())
+        assert len(results) == 1, results
+        print('{:<16}'.format(name) + ''.join('{:>11.3f}s'.format(t) for t in times)
+              + '{:>13.2f}x'.format(times[0] / min(times[1:])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Latency of a one-character edit: IncrementalParser versus a full parse.
+
+    python -m benchmarks.bench_incremental [lines]
+"""
+import sys
+import time
+
+from monkey.incremental import IncrementalParser
+from monkey.lexer import TableLexer
+from monkey.parser import Parser
+from .sources import TEMPLATE, generate_program
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    source = generate_program(len(TEMPLATE) * lines // TEMPLATE.count('\n'))
+    print('source: {} lines'.format(source.count('\n')))
+
+    start = time.perf_counter()
+    Parser(TableLexer(source)).parse_program()
+    full = time.perf_counter() - start
+
+    incremental = IncrementalParser(source)
+    offsets = [len(source) * i // 20 for i in range(1, 20)]
+    start = time.perf_counter()
+    for offset in offsets:
+        incremental.edit(offset, 0, '1')
+        incremental.edit(offset, 1, '')
+    edit = (time.perf_counter() - start) / (2 * len(offsets))
+
+    print('full parse:       {:>9.2f} ms'.format(full * 1000))
+    print('incremental edit: {:>9.2f} ms'.format(edit * 1000))
+    print('speedup: {:.0f}x'.format(full / edit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Operators specialized by type inference (monkey.inference) on the
+benchmark programs, and the evaluator with and without them. The JIT is
+turned off so that every call is evaluated.
+
+    python -m benchmarks.bench_inference
+"""
+import sys
+import time
+from unittest import mock
+
+from monkey import evaluator
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.inference import specialize
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from .bench_bytecode_file import generate_program
+from .programs import ARITHMETIC, ARRAY, CLOSURE, FIB, STRING, program
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('fib(22)', program(FIB, 22)),
+        ('array 500', program(ARRAY, 500)),
+        ('string 500', program(STRING, 500)),
+        ('closure 500', program(CLOSURE, 500)),
+        ('arithmetic 500', program(ARITHMETIC, 500)),
+        ('generated', generate_program(100000)),
+    ]
+    print('{:<16}{:>14}{:>12}{:>12}{:>12}{:>10}'.format(
+        '', 'specialized', 'infer', 'generic', 'specialized', 'speedup'))
+    total_specialized = total_operations = 0
+    with mock.patch.object(evaluator, 'JIT_THRESHOLD', None):
+        for name, source in cases:
+            generic_tree = Parser(Lexer(source)).parse_program()
+            tree = Parser(Lexer(source)).parse_program()
+            infer_time, (specialized, operations) = best(lambda: specialize(tree), repeat=1)
+            total_specialized += specialized
+            total_operations += operations
+
+            generic, expected = best(lambda: evaluate(generic_tree, Environment()))
+            fast, result = best(lambda: evaluate(tree, Environment()))
+            assert result.inspect() == expected.inspect(), (result.inspect(), expected.inspect())
+            print('{:<16}{:>7}/{:<6}{:>11.4f}s{:>11.4f}s{:>11.4f}s{:>9.2f}x'.format(
+                name, specialized, operations, infer_time, generic, fast, generic / fast))
+    print('{:.0%} of {} operators specialized'.format(
+        total_specialized / total_operations, total_operations))
+
+
+if __name__ == '__main__':
+    main()
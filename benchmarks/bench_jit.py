@@ -0,0 +1,54 @@
+"""The tree walking evaluator with and without tier-up compilation of hot
+functions (monkey.jit), on recursive programs.
+
+    python -m benchmarks.bench_jit
+"""
+import sys
+import time
+from unittest import mock
+
+from monkey import evaluator, jit
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from .programs import ARITHMETIC, ARRAY, CLOSURE, FIB, STRING, program
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run(source, threshold):
+    jit.reset_stats()
+    with mock.patch.object(evaluator, 'JIT_THRESHOLD', threshold):
+        # a new tree each time, so that nothing is compiled in advance
+        return evaluate(Parser(Lexer(source)).parse_program(), Environment())
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('fib(25)', program(FIB, 25)),
+        ('array 500', program(ARRAY, 500)),
+        ('string 500', program(STRING, 500)),
+        ('closure 500', program(CLOSURE, 500)),
+        ('arithmetic 500', program(ARITHMETIC, 500)),
+    ]
+    print('{:<16}{:>12}{:>12}{:>10}{:>10}{:>8}'.format('', 'evaluate', 'jit', 'speedup', 'tier-ups', 'deopts'))
+    for name, source in cases:
+        interpreted, expected = best(lambda: run(source, None))
+        compiled, result = best(lambda: run(source, evaluator.JIT_THRESHOLD))
+        assert result.inspect() == expected.inspect(), (result.inspect(), expected.inspect())
+        print('{:<16}{:>11.4f}s{:>11.4f}s{:>9.2f}x{:>10}{:>8}'.format(
+            name, interpreted, compiled, interpreted / compiled,
+            jit.stats['tier_ups'], jit.stats['deoptimizations']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Lexer throughput in tokens/sec on generated multi-MB sources.
+
+    python -m benchmarks.bench_lexer [size_in_mb]
+"""
+import sys
+import time
+
+from monkey.lexer import Lexer, TableLexer
+from monkey.token import TokenType
+from .sources import generate_program
+
+
+def run(lexer_class, source):
+    start = time.perf_counter()
+    l = lexer_class(source)
+    count = 0
+    while l.next_token()._type != TokenType.EOF:
+        count += 1
+    return count, time.perf_counter() - start
+
+
+def main():
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    source = generate_program(int(size * 1024 * 1024))
+    print('source: {} chars'.format(len(source)))
+
+    results = {}
+    for lexer_class in (Lexer, TableLexer):
+        count, elapsed = run(lexer_class, source)
+        results[lexer_class] = elapsed
+        print('{:<12} {:>9} tokens {:>8.2f}s {:>12.0f} tokens/sec'.format(
+            lexer_class.__name__, count, elapsed, count / elapsed))
+
+    print('speedup: {:.1f}x'.format(results[Lexer] / results[TableLexer]))
+
+
+if __name__ == '__main__':
+    main()
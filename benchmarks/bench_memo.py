@@ -0,0 +1,62 @@
+"""The evaluator with and without the caches of pure functions
+(monkey.memo), with their hits, misses and skipped calls. Programs that
+call their functions with repeated arguments gain, the others pay for
+looking up the arguments.
+
+    python -m benchmarks.bench_memo
+"""
+import sys
+import time
+
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.lexer import Lexer
+from monkey.memo import memoize
+from monkey.parser import Parser
+from .programs import ARITHMETIC, ARRAY, CLOSURE, FIB, STRING, program
+
+# the same calls over and over, from a loop that is not pure itself
+REPEATED = '''
+let squares = fn(n) { if (n == 0) { 0 } else { n * n + squares(n - 1) } };
+let loop = fn(i, acc) { if (i == 0) { acc } else { loop(i - 1, acc + squares(30) - squares(i - i + 29)) } };
+loop({n}, 0);
+'''
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run(source, memoized):
+    program = Parser(Lexer(source)).parse_program()
+    memoizer = memoize(program) if memoized else None
+    return evaluate(program, Environment()), memoizer
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('fib(22)', program(FIB, 22)),
+        ('repeated 2000', program(REPEATED, 2000)),
+        ('array 500', program(ARRAY, 500)),
+        ('string 500', program(STRING, 500)),
+        ('closure 500', program(CLOSURE, 500)),
+        ('arithmetic 500', program(ARITHMETIC, 500)),
+    ]
+    print('{:<16}{:>12}{:>12}{:>10}{:>8}{:>8}{:>8}'.format(
+        '', 'evaluate', 'memoized', 'speedup', 'hits', 'misses', 'skipped'))
+    for name, source in cases:
+        plain, (expected, _) = best(lambda: run(source, False))
+        fast, (result, memoizer) = best(lambda: run(source, True))
+        assert result.inspect() == expected.inspect(), (result.inspect(), expected.inspect())
+        print('{:<16}{:>11.4f}s{:>11.4f}s{:>9.2f}x{:>8}{:>8}{:>8}'.format(
+            name, plain, fast, plain / fast, memoizer.hits, memoizer.misses, memoizer.skipped))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Memory and speed of runtime objects on an array of a million integers.
+
+    python -m benchmarks.bench_objects [n]
+"""
+import sys
+import time
+import timeit
+import tracemalloc
+
+from monkey.environment import Environment
+from monkey.evaluator import eval_infix_expression
+from monkey.lexer import Lexer
+from monkey.object import Array, Integer
+from monkey.parser import Parser
+from monkey.stack_evaluator import stack_evaluate
+
+SUM = '''
+let sum = fn(i, total) { if (i == n) { total } else { sum(i + 1, total + a[i]) } };
+sum(0, 0);
+'''
+
+
+def build(n):
+    return Array([Integer(i) for i in range(n)])
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    array = build(n)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('build array of {} integers: {:.3f}s, {:.1f} MB ({:.0f} bytes per element)'.format(
+        n, elapsed, size / 1e6, size / n))
+
+    env = Environment()
+    env.set('a', array)
+    env.set('n', Integer(n))
+    program = Parser(Lexer(SUM)).parse_program()
+    start = time.perf_counter()
+    result = stack_evaluate(program, env)
+    print('sum with stack_evaluate: {:.3f}s (= {})'.format(time.perf_counter() - start, result.inspect()))
+
+    left, right = Integer(3), Integer(4)
+    number = 200000
+    for operator in ('+', '<', '=='):
+        t = min(timeit.repeat(lambda: eval_infix_expression(operator, left, right), number=number, repeat=3))
+        print('eval_infix_expression {!r}: {:.0f} ns'.format(operator, t / number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
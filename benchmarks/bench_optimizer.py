@@ -0,0 +1,62 @@
+"""The evaluator on programs before and after the AST optimizations of
+monkey.optimizer, which fold the constant subexpressions, dead branches
+and small helper calls evaluated in their hot functions. The JIT is turned
+off so that every call is evaluated.
+
+    python -m benchmarks.bench_optimizer
+"""
+import sys
+import time
+from unittest import mock
+
+from monkey import evaluator
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.lexer import Lexer
+from monkey.optimizer import optimize
+from monkey.parser import Parser
+from .programs import ARITHMETIC, FIB, program
+
+CONSTANTS = '''
+let double = fn(x) { x * 2 };
+let loop = fn(i, total) {
+    if (i == 0) { return total; }
+    let step = if (!false) { 1 + 2 * 3 - double(3) } else { 0 };
+    loop(i - 1, total + step * (10 - 4 * 2) - -1)
+};
+loop({n}, 0);
+'''
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('constants 500', program(CONSTANTS, 500)),
+        ('arithmetic 500', program(ARITHMETIC, 500)),
+        ('fib(22)', program(FIB, 22)),
+    ]
+    print('{:<16}{:>12}{:>12}{:>12}{:>10}'.format('', 'optimize', 'evaluate', 'optimized', 'speedup'))
+    with mock.patch.object(evaluator, 'JIT_THRESHOLD', None):
+        for name, source in cases:
+            plain_tree = Parser(Lexer(source)).parse_program()
+            tree = Parser(Lexer(source)).parse_program()
+            optimize_time, tree = best(lambda: optimize(tree), repeat=1)
+
+            plain, expected = best(lambda: evaluate(plain_tree, Environment()))
+            fast, result = best(lambda: evaluate(tree, Environment()))
+            assert result.inspect() == expected.inspect(), (result.inspect(), expected.inspect())
+            print('{:<16}{:>11.4f}s{:>11.4f}s{:>11.4f}s{:>9.2f}x'.format(
+                name, optimize_time, plain, fast, plain / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Parse time of Parser versus StackParser on long and deeply nested input.
+
+    python -m benchmarks.bench_parser [terms]
+"""
+import sys
+import time
+
+from monkey.parser import Parser, StackParser
+from monkey.token_stream import tokenize
+from .sources import generate_program
+
+
+class ListLexer:
+    """Hands out tokens lexed up front, so that only parsing is timed."""
+
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.eof = tokens[-1]
+
+    def next_token(self):
+        return next(self.tokens, self.eof)
+
+
+def timed(parser_class, tokens, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            parser_class(ListLexer(tokens)).parse_program()
+        except RecursionError:
+            return None
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cases = [
+        ('left-assoc chain', ' + '.join(['x * 2'] * terms)),
+        ('mixed chain', ' == '.join(['a + b * c - d / e < f'] * (terms // 6))),
+        ('generated program', generate_program(terms * 8)),
+        ('nested groups', '(' * terms + 'x' + ')' * terms),
+        ('nested calls', 'f(' * terms + ')' * terms),
+    ]
+
+    print('{:<20} {:>12} {:>12}'.format('', 'Parser', 'StackParser'))
+    for name, source in cases:
+        stream = tokenize(source)
+        tokens = [stream.token(i) for i in range(len(stream))]
+        results = []
+        for parser_class in (Parser, StackParser):
+            elapsed = timed(parser_class, tokens)
+            results.append('RecursionError' if elapsed is None else '{:.3f}s'.format(elapsed))
+        print('{:<20} {:>12} {:>12}'.format(name, *results))
+
+
+if __name__ == '__main__':
+    main()
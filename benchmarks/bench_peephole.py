@@ -0,0 +1,94 @@
+"""Instructions dispatched by the VM, and run time, with each peephole
+optimization of monkey.peephole alone and with all of them.
+
+    python -m benchmarks.bench_peephole
+"""
+import sys
+import time
+
+from monkey.code import instruction_lengths
+from monkey.compiler import Compiler
+from monkey.lexer import Lexer
+from monkey.object import CompiledFunction
+from monkey.parser import Parser
+from monkey.peephole import optimize
+from monkey.vm import VM
+from .programs import ARITHMETIC, ARRAY, CLOSURE, FIB, STRING, program
+
+PASSES = ('fold_constants', 'thread_jumps', 'remove_dead_code', 'superinstructions')
+
+CONFIGURATIONS = [('none', ())] + [(name, (name,)) for name in PASSES] + [('all', PASSES)]
+
+
+class Counted(bytes):
+    """Instructions counting the reads of their opcodes in `counter[0]`."""
+
+    def __new__(cls, instructions, counter):
+        self = super().__new__(cls, instructions)
+        self.counter = counter
+        self.starts = set()
+        offset = 0
+        while offset < len(instructions):
+            self.starts.add(offset)
+            offset += instruction_lengths[instructions[offset]]
+        return self
+
+    def __getitem__(self, index):
+        if index in self.starts:
+            self.counter[0] += 1
+        return super().__getitem__(index)
+
+
+def compiled(source, passes):
+    compiler = Compiler()
+    compiler.compile(Parser(Lexer(source)).parse_program())
+    return optimize(compiler.bytecode(), **{name: name in passes for name in PASSES})
+
+
+def dispatches(source, passes):
+    bytecode = compiled(source, passes)
+    counter = [0]
+    bytecode['instructions'] = Counted(bytecode['instructions'], counter)
+    for constant in bytecode['constants']:
+        if isinstance(constant, CompiledFunction):
+            constant.instructions = Counted(constant.instructions, counter)
+    VM(bytecode).run()
+    return counter[0]
+
+
+def timed(source, passes, repeat=3):
+    bytecode = compiled(source, passes)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        VM(bytecode).run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('fib(18)', program(FIB, 18)),
+        ('array 1000', program(ARRAY, 1000)),
+        ('string 1000', program(STRING, 1000)),
+        ('closure 1000', program(CLOSURE, 1000)),
+        ('arithmetic 1000', program(ARITHMETIC, 1000)),
+    ]
+    print('dispatched instructions')
+    print('{:<18}'.format('') + ''.join('{:>18}'.format(name) for name, _ in CONFIGURATIONS))
+    for name, source in cases:
+        counts = [dispatches(source, passes) for _, passes in CONFIGURATIONS]
+        print('{:<18}'.format(name) + ''.join('{:>18}'.format(c) for c in counts)
+              + '{:>8.0%} fewer'.format(1 - counts[-1] / counts[0]))
+    print()
+    print('run time{:>18}{:>12}'.format('none', 'all'))
+    for name, source in cases:
+        before = timed(source, ())
+        after = timed(source, PASSES)
+        print('{:<18}{:>7.4f}s{:>11.4f}s{:>9.2f}x'.format(name, before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
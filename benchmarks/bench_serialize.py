@@ -0,0 +1,59 @@
+"""Size and load time of monkey.serialize versus pickle for a parsed program.
+
+    python -m benchmarks.bench_serialize [size_in_kb]
+"""
+import pickle
+import sys
+import time
+
+from monkey import serialize
+from monkey.ast import Node
+from monkey.lexer import TableLexer
+from monkey.parser import Parser
+from .sources import generate_program
+
+
+def walk(node):
+    """Touch every node so that lazily loaded subtrees are decoded."""
+    if isinstance(node, (list, serialize.LazyNodes)):
+        for n in node:
+            walk(n)
+    elif isinstance(node, Node):
+        for cls in type(node).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                walk(getattr(node, name))
+
+
+def timed(function, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 256
+    source = generate_program(int(size * 1024))
+    program = Parser(TableLexer(source)).parse_program()
+    print('source: {} chars, {} statements'.format(len(source), len(program.statements)))
+
+    pickled = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+    encoded = serialize.dumps(program)
+    print('size:   pickle {:>9} bytes   serialize {:>9} bytes ({:.1f}x smaller)'.format(
+        len(pickled), len(encoded), len(pickled) / len(encoded)))
+
+    pickle_load = timed(pickle.loads, pickled)
+    pickle_walk = timed(lambda data: walk(pickle.loads(data)), pickled)
+    lazy_load = timed(serialize.loads, encoded)
+    full_load = timed(lambda data: walk(serialize.loads(data)), encoded)
+    print('load:   pickle                    {:>9.2f} ms'.format(pickle_load * 1000))
+    print('        pickle, every node        {:>9.2f} ms'.format(pickle_walk * 1000))
+    print('        serialize, lazy           {:>9.3f} ms'.format(lazy_load * 1000))
+    print('        serialize, every node     {:>9.2f} ms'.format(full_load * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Memory and time of a columnar TokenStream versus a list of Token objects,
+and of parsing from each.
+
+    python -m benchmarks.bench_token_stream [size_in_mb]
+"""
+import sys
+import time
+import tracemalloc
+
+from monkey.lexer import TableLexer
+from monkey.parser import Parser
+from monkey.token import TokenType
+from monkey.token_stream import tokenize
+from .sources import generate_program
+
+
+def token_list(source):
+    l = TableLexer(source)
+    tokens = []
+    while True:
+        t = l.next_token()
+        tokens.append(t)
+        if t._type == TokenType.EOF:
+            return tokens
+
+
+def measure(function, source):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(source)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    source = generate_program(int(size * 1024 * 1024))
+    print('source: {} chars'.format(len(source)))
+
+    tokens, list_bytes, list_time = measure(token_list, source)
+    count = len(tokens)
+    del tokens
+    _, stream_bytes, stream_time = measure(tokenize, source)
+
+    print('{:<12} {:>12} bytes {:>6.1f} bytes/token {:>7.2f}s'.format(
+        'Token list', list_bytes, list_bytes / count, list_time))
+    print('{:<12} {:>12} bytes {:>6.1f} bytes/token {:>7.2f}s'.format(
+        'TokenStream', stream_bytes, stream_bytes / count, stream_time))
+    print('memory reduction: {:.1f}x'.format(list_bytes / stream_bytes))
+
+    _, lexer_bytes, lexer_time = measure(lambda s: Parser(TableLexer(s)).parse_program(), source)
+    _, parser_bytes, parser_time = measure(lambda s: tokenize(s).parser().parse_program(), source)
+    print('{:<24} {:>12} bytes {:>7.2f}s'.format('Parser(TableLexer)', lexer_bytes, lexer_time))
+    print('{:<24} {:>12} bytes {:>7.2f}s'.format('StreamParser', parser_bytes, parser_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Integer and String objects allocated by each engine on arithmetic-heavy
+loops, and the run time.
+
+    python -m benchmarks.bench_values [n]
+"""
+import sys
+import time
+
+from monkey import object as objects
+from monkey.closure_compiler import execute
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.stack_evaluator import stack_evaluate
+from .programs import ARITHMETIC, FIB, STRING, program
+
+ENGINES = [
+    ('evaluate', evaluate),
+    ('closures', execute),
+    ('stack', stack_evaluate),
+]
+
+
+def count_allocations(engine, tree):
+    counts = {}
+    originals = {}
+    for cls in (objects.Integer, objects.String):
+        originals[cls] = cls.__init__
+
+        def counting(self, *args, cls=cls):
+            counts[cls.__name__] = counts.get(cls.__name__, 0) + 1
+            originals[cls](self, *args)
+        cls.__init__ = counting
+    try:
+        engine(tree, Environment())
+    finally:
+        for cls, init in originals.items():
+            cls.__init__ = init
+    return counts
+
+
+def timed(engine, tree, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine(tree, Environment())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('arithmetic {}'.format(n), program(ARITHMETIC, n)),
+        ('fib(18)', program(FIB, 18)),
+        ('string {}'.format(n), program(STRING, n)),
+    ]
+    print('{:<18} {:<10} {:>10} {:>10} {:>10}'.format('', '', 'Integer', 'String', 'time'))
+    for name, source in cases:
+        tree = Parser(Lexer(source)).parse_program()
+        for engine_name, engine in ENGINES:
+            counts = count_allocations(engine, tree)
+            print('{:<18} {:<10} {:>10} {:>10} {:>9.3f}s'.format(
+                name, engine_name, counts.get('Integer', 0), counts.get('String', 0), timed(engine, tree)))
+
+
+if __name__ == '__main__':
+    main()
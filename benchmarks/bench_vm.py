@@ -0,0 +1,52 @@
+"""The bytecode VM against the tree walking evaluator on fib(25), array
+building and string concatenation. Compilation is timed separately.
+
+    python -m benchmarks.bench_vm
+"""
+import sys
+import time
+
+from monkey.compiler import Compiler
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.vm import VM
+from .programs import ARRAY, FIB, STRING, program
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def compiled(tree):
+    compiler = Compiler()
+    compiler.compile(tree)
+    return compiler.bytecode()
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    cases = [
+        ('fib(25)', program(FIB, 25)),
+        ('array 1000', program(ARRAY, 1000)),
+        ('string 1000', program(STRING, 1000)),
+    ]
+    print('{:<14}{:>12}{:>12}{:>12}{:>10}'.format('', 'evaluate', 'compile', 'vm', 'speedup'))
+    for name, source in cases:
+        tree = Parser(Lexer(source)).parse_program()
+        evaluated, expected = best(lambda: evaluate(tree, Environment()))
+        compile_time, bytecode = best(lambda: compiled(tree))
+        vm_time, result = best(lambda: VM(bytecode).run())
+        assert result.inspect() == expected.inspect(), (result.inspect(), expected.inspect())
+        print('{:<14}{:>11.4f}s{:>11.4f}s{:>11.4f}s{:>9.2f}x'.format(
+            name, evaluated, compile_time, vm_time, evaluated / (compile_time + vm_time)))
+
+
+if __name__ == '__main__':
+    main()
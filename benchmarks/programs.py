@@ -0,0 +1,35 @@
+"""Monkey programs shared by the execution engine benchmarks."""
+
+FIB = '''
+let fib = fn(n) { if (n < 2) { return n; } fib(n - 1) + fib(n - 2) };
+fib({n});
+'''
+
+ARRAY = '''
+let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, [n, acc]) } };
+let sum = fn(pair, total) { if (pair[0] == 0) { total } else { sum(pair[1], total + pair[0]) } };
+sum(build({n}, [0]), 0);
+'''
+
+STRING = '''
+let repeat = fn(s, n) { if (n == 0) { "" } else { s + repeat(s, n - 1) } };
+len(repeat("abc", {n}));
+'''
+
+
+CLOSURE = '''
+let make = fn(a) { fn(b) { fn(c) { fn(d) {
+    let loop = fn(n, total) { if (n == 0) { total } else { loop(n - 1, total + a + b + c + d) } };
+    loop
+} } } };
+make(1)(2)(3)(4)({n}, 0);
+'''
+
+ARITHMETIC = '''
+let loop = fn(i, total) { if (i == 0) { total } else { loop(i - 1, total + (i * 3 - i * 2) - (i - 1) + 7 - 8) } };
+loop({n}, 0);
+'''
+
+
+def program(template, n):
+    return template.replace('{n}', str(n))
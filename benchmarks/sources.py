@@ -0,0 +1,25 @@
+TEMPLATE = '''let value{i} = {i} * (3 + {i}) - 7 / 2;
+let name{i} = "item number {i}";
+let items{i} = [value{i}, {i}, {i} + 1];
+let check{i} = fn(x) {{
+    if (x < {i}) {{
+        return !true;
+    }} else {{
+        return x == {i} != false;
+    }}
+}};
+check{i}(items{i}[0]);
+'''
+
+
+def generate_program(size):
+    """Return a Monkey program of roughly `size` characters."""
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        chunk = TEMPLATE.format(i=i)
+        parts.append(chunk)
+        length += len(chunk)
+        i += 1
+    return ''.join(parts)
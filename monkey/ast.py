@@ -1,17 +1,22 @@
-from abc import ABCMeta, abstractmethod
+class Node:
+    """Base of the AST nodes.
 
+    Nodes use __slots__ and keep only what evaluation needs. Instead of
+    their token they store `position`, the offset of the token in the
+    source, and `token_literal` rebuilds the literal from the node itself.
+    """
+    __slots__ = ()
 
-class Node(metaclass=ABCMeta):
-    @abstractmethod
     def token_literal(self):
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def __str__(self):
-        pass
+        raise NotImplementedError
 
 
 class Program(Node):
+    __slots__ = ('statements',)
+
     def __init__(self):
         self.statements = []
 
@@ -29,13 +34,15 @@ class Program(Node):
 
 
 class LetStatement(Node):
+    __slots__ = ('position', 'name', 'value')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.name = None
         self.value = None
 
     def token_literal(self):
-        return self.token._literal
+        return 'let'
 
     def statement_node(self):
         pass
@@ -46,24 +53,31 @@ class LetStatement(Node):
 
 
 class Identifier(Node):
+    # depth and slot are set by monkey.resolver
+    __slots__ = ('position', 'value', 'depth', 'slot')
+
     def __init__(self, token, value):
-        self.token = token
+        self.position = token.position
         self.value = value
+        self.depth = None
+        self.slot = None
 
     def token_literal(self):
-        return self.token._literal
+        return self.value
 
     def __str__(self):
         return self.value
 
 
-class ReturnStatement:
+class ReturnStatement(Node):
+    __slots__ = ('position', 'value')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.value = None
 
     def token_literal(self):
-        return self.token._literal
+        return 'return'
 
     def statement_node(self):
         pass
@@ -73,13 +87,20 @@ class ReturnStatement:
         return s
 
 
-class ExpressionStatement:
+class ExpressionStatement(Node):
+    __slots__ = ('position', 'expression')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.expression = None
 
     def token_literal(self):
-        return self.token._literal
+        # the literal of the first token of the expression; parentheses
+        # around it are not kept in the tree
+        node = self.expression
+        while isinstance(node, (InfixExpression, IndexExpression, CallExpression)):
+            node = node.function if isinstance(node, CallExpression) else node.left
+        return node.token_literal() if node is not None else ''
 
     def statement_node(self):
         pass
@@ -88,13 +109,17 @@ class ExpressionStatement:
         return str(self.expression)
 
 
-class IntegerLiteral:
+class IntegerLiteral(Node):
+    # constant is the boxed value, set when the literal is first evaluated
+    __slots__ = ('position', 'value', 'constant')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.value = None
+        self.constant = None
 
     def token_literal(self):
-        return self.token._literal
+        return str(self.value)
 
     def statement_node(self):
         pass
@@ -103,14 +128,18 @@ class IntegerLiteral:
         return self.token_literal()
 
 
-class PrefixExpression:
+class PrefixExpression(Node):
+    # specialized is the handler for the operand type, from monkey.inference
+    __slots__ = ('position', 'operator', 'right', 'specialized')
+
     def __init__(self, token, operator):
-        self.token = token
+        self.position = token.position
         self.operator = operator
         self.right = None
+        self.specialized = None
 
     def token_literal(self):
-        return self.token._literal
+        return self.operator
 
     def statement_node(self):
         pass
@@ -120,15 +149,19 @@ class PrefixExpression:
         return s
 
 
-class InfixExpression:
+class InfixExpression(Node):
+    # specialized is the handler for the operand types, from monkey.inference
+    __slots__ = ('position', 'left', 'operator', 'right', 'specialized')
+
     def __init__(self, token, operator, left):
-        self.token = token
+        self.position = token.position
         self.left = left
         self.operator = operator
         self.right = None
+        self.specialized = None
 
     def token_literal(self):
-        return self.token._literal
+        return self.operator
 
     def statement_node(self):
         pass
@@ -138,15 +171,17 @@ class InfixExpression:
         return s
 
 
-class IfExpression:
+class IfExpression(Node):
+    __slots__ = ('position', 'condition', 'consequence', 'alternative')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.condition = None
         self.consequence = None
         self.alternative = None
 
     def token_literal(self):
-        return self.token._literal
+        return 'if'
 
     def __str__(self):
         s = 'if{} {}'.format(str(self.condition), self.consequence)
@@ -155,13 +190,15 @@ class IfExpression:
         return s
 
 
-class BlockStatement:
+class BlockStatement(Node):
+    __slots__ = ('position', 'statements')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.statements = []
 
     def token_literal(self):
-        return self.token._literal
+        return '{'
 
     def __str__(self):
         r = ''
@@ -171,13 +208,15 @@ class BlockStatement:
         return r
 
 
-class Boolean:
+class Boolean(Node):
+    __slots__ = ('position', 'value')
+
     def __init__(self, token, value):
-        self.token = token
+        self.position = token.position
         self.value = value
 
     def token_literal(self):
-        return self.token._literal
+        return 'true' if self.value else 'false'
 
     def statement_node(self):
         pass
@@ -186,14 +225,19 @@ class Boolean:
         return self.token_literal()
 
 
-class FunctionLiteral:
+class FunctionLiteral(Node):
+    # scope is set by monkey.resolver, memo by monkey.memo
+    __slots__ = ('position', 'parameters', 'body', 'scope', 'memo')
+
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.parameters = []
         self.body = None
+        self.scope = None
+        self.memo = None
 
     def token_literal(self):
-        return self.token._literal
+        return 'fn'
 
     def __str__(self):
         params = []
@@ -206,14 +250,16 @@ class FunctionLiteral:
         return s
 
 
-class CallExpression:
+class CallExpression(Node):
+    __slots__ = ('position', 'function', 'arguments')
+
     def __init__(self, token, function):
-        self.token = token
+        self.position = token.position
         self.function = function
         self.arguments = []
 
     def token_literal(self):
-        return self.token._literal
+        return '('
 
     def __str__(self):
         arguments = []
@@ -227,30 +273,36 @@ class CallExpression:
         return s
 
 
-class StringLiteral:
+class StringLiteral(Node):
+    # constant is the boxed value, set when the literal is first evaluated
+    __slots__ = ('position', 'value', 'constant')
+
     def __init__(self, token, value):
-        self.token = token
+        self.position = token.position
         self.value = value
+        self.constant = None
 
     def token_literal(self):
-        return self.token._literal
+        return self.value
 
     def __str__(self):
-        return self.token._literal
+        return self.value
+
 
+class ArrayLiteral(Node):
+    __slots__ = ('position', 'elements')
 
-class ArrayLiteral:
     def __init__(self, token):
-        self.token = token
+        self.position = token.position
         self.elements = None
 
     def token_literal(self):
-        return self.token._literal
+        return '['
 
     def __str__(self):
         elements = []
         for el in self.elements:
-            elements.append(el)
+            elements.append(str(el))
 
         elements_str = ', '.join(elements)
 
@@ -259,15 +311,17 @@ class ArrayLiteral:
         return s
 
 
-class IndexExpression:
+class IndexExpression(Node):
+    __slots__ = ('position', 'left', 'index')
+
     def __init__(self, token, left):
-        self.token = token
+        self.position = token.position
         self.left = left
         self.index = None
 
     def token_literal(self):
-        return self.token._literal
+        return '['
 
     def __str__(self):
         s = '({}[{}])'.format(str(self.left), str(self.index))
-        return s
\ No newline at end of file
+        return s
@@ -0,0 +1,127 @@
+"""Lex and parse many Monkey scripts across a process pool.
+
+    python -m monkey.batch [-j WORKERS] PATH...
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .lexer import TableLexer
+from .parser import StackParser
+
+SUFFIX = '.mk'
+
+FileResult = namedtuple('FileResult', ['path', 'errors', 'statements', 'elapsed'])
+
+
+def collect_files(paths, suffix=SUFFIX):
+    """Expand directories into the `suffix` files below them, sorted.
+    Paths naming a file are kept whatever their suffix."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.endswith(suffix):
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return files
+
+
+def check_file(path):
+    start = time.perf_counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return FileResult(path, ['could not read file: {}'.format(e)], 0, time.perf_counter() - start)
+
+    p = StackParser(TableLexer(source))
+    program = p.parse_program()
+    return FileResult(path, p.errors, len(program.statements), time.perf_counter() - start)
+
+
+def check_chunk(paths):
+    return [check_file(path) for path in paths]
+
+
+def chunk_files(files, chunk_bytes):
+    """Group files into chunks of about `chunk_bytes`, so that a worker gets
+    many small files per round trip but big files still spread out."""
+    chunks = []
+    chunk = []
+    size = 0
+    for path in files:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+        chunk.append(path)
+        if size >= chunk_bytes:
+            chunks.append(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def check_paths(paths, workers=None, chunk_bytes=256 * 1024):
+    """Yield a `FileResult` for every script under `paths` as soon as the
+    chunk holding it is done, so results do not arrive in input order."""
+    files = collect_files(paths)
+    workers = workers or os.cpu_count() or 1
+
+    # keep a few chunks per worker so that a slow chunk does not leave the
+    # rest of the pool idle at the end
+    total = 0
+    for path in files:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    chunk_bytes = max(1, min(chunk_bytes, total // (workers * 4)))
+    chunks = chunk_files(files, chunk_bytes)
+
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from check_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(check_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m monkey.batch', description=__doc__.split('\n')[0])
+    parser.add_argument('paths', nargs='+', help='scripts or directories of *{} scripts'.format(SUFFIX))
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only report files with errors')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    files = 0
+    failed = 0
+    for result in check_paths(args.paths, args.workers):
+        files += 1
+        if result.errors:
+            failed += 1
+            print('{}: {} errors'.format(result.path, len(result.errors)))
+            for e in result.errors:
+                print('\t{}'.format(e))
+        elif not args.quiet:
+            print('{}: ok, {} statements, {:.1f} ms'.format(result.path, result.statements, result.elapsed * 1000))
+
+    print('{} files, {} with errors, {:.2f}s'.format(files, failed, time.perf_counter() - start))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
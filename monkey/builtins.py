@@ -1,12 +1,13 @@
 from .object import (
     Builtin,
     String,
-    Integer,
+    Error,
+    new_integer,
 )
 
 
 def new_error(format_str, *args):
-    return format_str.format(*args)
+    return Error(format_str.format(*args))
 
 
 def __len(args):
@@ -15,7 +16,7 @@ def __len(args):
 
     arg = args[0]
     if isinstance(arg, String):
-        return Integer(int(len(arg.value)))
+        return new_integer(len(arg.value))
 
     return new_error("argument to 'len' not supported, got {}", arg.type_())
 
@@ -0,0 +1,323 @@
+"""Binary file format for the output of `monkey.compiler.Compiler.bytecode`.
+
+Layout, all integers little endian:
+
+    header     b'MKB' + version byte, u32 checksum of the instruction set,
+               u32 offsets of the main code, the constant table, the
+               global names and the string table
+    code       u32 length of the instructions, the instructions, then
+               the positions and lookups tables
+    constants  varint count, then for each a tag byte and its fields
+    globals    varint count, then the string index of each name
+    strings    u32 count, u32 end offset of each string, utf-8 data
+
+Other integers are varints as in `monkey.serialize`; integer constants
+are zigzag encoded. A function constant is the offset of its code, its
+number of locals, its parameter names and the source of its body.
+
+`loads` does not copy instructions: the VM runs them from the buffer,
+which may be an mmap, as memoryviews. Reading a byte from a memoryview
+is slower than from bytes, which is the price of starting without
+copying or decoding the code. The positions and lookups tables, only read
+when a variable is unassigned or an error is raised, are decoded the
+first time they are used.
+"""
+import mmap
+import struct
+import zlib
+from collections.abc import Mapping
+
+from .code import definitions
+from .object import Integer, String, CompiledFunction, new_integer, intern_string
+from .serialize import SerializeError
+
+MAGIC = b'MKB'
+VERSION = 1
+HEADER = struct.Struct('<3sBIIIII')
+U32 = struct.Struct('<I')
+
+# constant tags
+INTEGER = 0
+STRING = 1
+FUNCTION = 2
+
+
+def instruction_set_checksum():
+    # files compiled for other opcodes or operand widths are rejected
+    text = ';'.join('{}={}:{}'.format(op, d['name'], d['operands_widths'])
+                    for op, d in sorted(definitions.items()))
+    return zlib.crc32(text.encode())
+
+
+CHECKSUM = instruction_set_checksum()
+
+
+class Encoder:
+    def __init__(self):
+        self.out = bytearray(HEADER.size)
+        self.strings = {}
+
+    def string(self, s):
+        index = self.strings.get(s)
+        if index is None:
+            index = self.strings[s] = len(self.strings)
+        return index
+
+    def varint(self, n):
+        out = self.out
+        while n > 0x7f:
+            out.append(n & 0x7f | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def code(self, instructions, positions, lookups):
+        offset = len(self.out)
+        self.out += U32.pack(len(instructions))
+        self.out += instructions
+        varint = self.varint
+        varint(len(positions))
+        for at, position in positions.items():
+            varint(at)
+            varint(position)
+        varint(len(lookups))
+        for at, (name, candidates, global_index, position) in lookups.items():
+            varint(at)
+            varint(self.string(name))
+            varint(len(candidates))
+            for depth, slot in candidates:
+                varint(depth)
+                varint(slot)
+            varint(0 if global_index is None else global_index + 1)
+            varint(0 if position is None else position + 1)
+        return offset
+
+    def constant(self, obj, code_offset):
+        if type(obj) is Integer:
+            self.out.append(INTEGER)
+            value = obj.value
+            self.varint(value * 2 if value >= 0 else -value * 2 - 1)
+        elif type(obj) is String:
+            self.out.append(STRING)
+            self.varint(self.string(obj.value))
+        elif type(obj) is CompiledFunction:
+            self.out.append(FUNCTION)
+            self.varint(code_offset)
+            self.varint(obj.num_locals)
+            self.varint(len(obj.parameters))
+            for name in obj.parameters:
+                self.varint(self.string(name))
+            self.varint(self.string(str(obj.body)))
+        else:
+            raise SerializeError('cannot serialize constant {}'.format(obj.type_()))
+
+    def finish(self, bytecode):
+        main = self.code(bytecode['instructions'], bytecode['positions'], bytecode['lookups'])
+
+        constants = bytecode['constants']
+        code_offsets = [None] * len(constants)
+        for i, obj in enumerate(constants):
+            if type(obj) is CompiledFunction:
+                code_offsets[i] = self.code(obj.instructions, obj.positions, obj.lookups)
+
+        constants_offset = len(self.out)
+        self.varint(len(constants))
+        for obj, code_offset in zip(constants, code_offsets):
+            self.constant(obj, code_offset)
+
+        globals_offset = len(self.out)
+        names = bytecode['globals']
+        self.varint(len(names))
+        for name in names:
+            self.varint(self.string(name))
+
+        strings_offset = len(self.out)
+        data = [s.encode('utf-8', 'surrogatepass') for s in self.strings]
+        self.out += U32.pack(len(data))
+        end = 0
+        for d in data:
+            end += len(d)
+            self.out += U32.pack(end)
+        for d in data:
+            self.out += d
+
+        HEADER.pack_into(self.out, 0, MAGIC, VERSION, CHECKSUM, main,
+                         constants_offset, globals_offset, strings_offset)
+        return bytes(self.out)
+
+
+def dumps(bytecode):
+    return Encoder().finish(bytecode)
+
+
+def dump(bytecode, path):
+    with open(path, 'wb') as f:
+        f.write(dumps(bytecode))
+
+
+class Tables:
+    """The positions and lookups tables of one code record, decoded on
+    first use."""
+
+    def __init__(self, decoder, offset):
+        self.decoder = decoder
+        self.offset = offset
+        self.positions = None
+        self.lookups = None
+
+    def decode(self):
+        decoder = self.decoder
+        varint = decoder.varint
+        offset = self.offset
+        positions = {}
+        count, offset = varint(offset)
+        for _ in range(count):
+            at, offset = varint(offset)
+            positions[at], offset = varint(offset)
+        lookups = {}
+        count, offset = varint(offset)
+        for _ in range(count):
+            at, offset = varint(offset)
+            name, offset = varint(offset)
+            n, offset = varint(offset)
+            candidates = []
+            for _ in range(n):
+                depth, offset = varint(offset)
+                slot, offset = varint(offset)
+                candidates.append((depth, slot))
+            global_index, offset = varint(offset)
+            position, offset = varint(offset)
+            lookups[at] = (decoder.string(name), tuple(candidates),
+                           global_index - 1 if global_index else None,
+                           position - 1 if position else None)
+        self.positions = positions
+        self.lookups = lookups
+
+
+class LazyTable(Mapping):
+    def __init__(self, tables, name):
+        self.tables = tables
+        self.name = name
+
+    def table(self):
+        if self.tables.positions is None:
+            self.tables.decode()
+        return getattr(self.tables, self.name)
+
+    def __getitem__(self, key):
+        return self.table()[key]
+
+    def __iter__(self):
+        return iter(self.table())
+
+    def __len__(self):
+        return len(self.table())
+
+
+class Decoder:
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer).cast('B')
+        if len(self.buffer) < HEADER.size:
+            raise SerializeError('not a compiled monkey program')
+        (magic, version, checksum, self.main, self.constants_offset,
+         self.globals_offset, self.strings_offset) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise SerializeError('not a compiled monkey program')
+        if version != VERSION:
+            raise SerializeError('unsupported format version {}'.format(version))
+        if checksum != CHECKSUM:
+            raise SerializeError('compiled for a different instruction set')
+        self.strings_count, = U32.unpack_from(self.buffer, self.strings_offset)
+        self.strings = [None] * self.strings_count
+
+    def string(self, index):
+        s = self.strings[index]
+        if s is None:
+            ends_offset = self.strings_offset + U32.size
+            data_offset = ends_offset + U32.size * self.strings_count
+            start = U32.unpack_from(self.buffer, ends_offset + U32.size * (index - 1))[0] if index else 0
+            end, = U32.unpack_from(self.buffer, ends_offset + U32.size * index)
+            s = self.strings[index] = str(self.buffer[data_offset + start:data_offset + end], 'utf-8', 'surrogatepass')
+        return s
+
+    def varint(self, offset):
+        buffer = self.buffer
+        n = 0
+        shift = 0
+        while True:
+            b = buffer[offset]
+            offset += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n, offset
+            shift += 7
+
+    def code(self, offset):
+        # instructions, positions, lookups
+        length, = U32.unpack_from(self.buffer, offset)
+        start = offset + U32.size
+        tables = Tables(self, start + length)
+        return self.buffer[start:start + length], LazyTable(tables, 'positions'), LazyTable(tables, 'lookups')
+
+    def constant(self, offset):
+        tag = self.buffer[offset]
+        varint = self.varint
+        value, offset = varint(offset + 1)
+        if tag == INTEGER:
+            return new_integer(value >> 1 if value & 1 == 0 else -(value >> 1) - 1), offset
+        elif tag == STRING:
+            return intern_string(self.string(value)), offset
+        elif tag == FUNCTION:
+            instructions, positions, lookups = self.code(value)
+            num_locals, offset = varint(offset)
+            count, offset = varint(offset)
+            parameters = []
+            for _ in range(count):
+                name, offset = varint(offset)
+                parameters.append(self.string(name))
+            body, offset = varint(offset)
+            fn = CompiledFunction(instructions, num_locals, parameters, self.string(body), positions, lookups)
+            return fn, offset
+        raise SerializeError('unknown constant tag {}'.format(tag))
+
+    def bytecode(self):
+        constants = []
+        count, offset = self.varint(self.constants_offset)
+        for _ in range(count):
+            obj, offset = self.constant(offset)
+            constants.append(obj)
+
+        names = []
+        count, offset = self.varint(self.globals_offset)
+        for _ in range(count):
+            name, offset = self.varint(offset)
+            names.append(self.string(name))
+
+        instructions, positions, lookups = self.code(self.main)
+        return {
+            'instructions': instructions,
+            'constants': constants,
+            'positions': positions,
+            'lookups': lookups,
+            'globals': names,
+        }
+
+
+def loads(buffer):
+    """Load bytecode from `buffer` (bytes, memoryview or mmap).
+
+    The instructions reference the buffer, so an mmap must stay open while
+    the bytecode is in use.
+    """
+    return Decoder(buffer).bytecode()
+
+
+def load(path):
+    """Memory-map the file at `path` and load the bytecode in it."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(buffer)
+
+
+def is_bytecode_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
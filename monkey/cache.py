@@ -0,0 +1,197 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from collections import OrderedDict
+
+from . import ast, lexer, parser, serialize, token
+from .lexer import TableLexer
+from .parser import Parser
+
+# bump when the layout of the cache files changes
+FORMAT_VERSION = 4
+CACHE_SUFFIX = '.mkast'
+
+
+LENGTH = struct.Struct('<I')
+
+
+def interpreter_fingerprint():
+    """Hash of everything that decides what a cached parse looks like: the
+    cache format, the Python version and the source of the modules that
+    build the AST. Editing the lexer or parser invalidates old entries.
+    """
+    h = hashlib.sha256()
+    h.update('{}:{}'.format(FORMAT_VERSION, sys.implementation.cache_tag).encode())
+    for module in (token, lexer, ast, parser, serialize):
+        with open(module.__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class ParseCache:
+    """Cache of parsed programs keyed by a hash of the source.
+
+    An in-process LRU of `memory_entries` programs sits in front of a
+    directory of programs in the `monkey.serialize` format, trimmed back under
+    `max_disk_bytes` by dropping the least recently used files. Cached
+    `Program` objects are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, directory, memory_entries=128, max_disk_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.version = interpreter_fingerprint()
+        self.memory = OrderedDict()
+        self.disk_bytes = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source):
+        h = hashlib.sha256(self.version.encode())
+        h.update(source.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def parse(self, source):
+        """Return `(program, errors)` for `source`, parsing it on a miss."""
+        key = self.key(source)
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return entry
+
+        entry = self.load(key)
+        if entry is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            p = Parser(TableLexer(source))
+            program = p.parse_program()
+            entry = (program, p.errors)
+            self.store(key, entry)
+
+        self.memory[key] = entry
+        if len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+        return entry
+
+    def load(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = self.loads(f.read())
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # a truncated or foreign file is dropped and parsed again
+            self.remove(path)
+            return None
+        return entry
+
+    def store(self, key, entry):
+        data = self.dumps(entry)
+        path = self.path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        stored = False
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            stored = True
+        except OSError:
+            # a cache that cannot be written, as on a full disk, is skipped
+            pass
+        finally:
+            if not stored and tmp_path is not None:
+                # without CACHE_SUFFIX, eviction would never find it
+                self.remove(tmp_path)
+        if not stored:
+            return
+
+        if self.disk_bytes is None:
+            self.disk_bytes = self.total_disk_bytes()
+        else:
+            self.disk_bytes += len(data) - replaced
+        if self.disk_bytes > self.max_disk_bytes:
+            self.evict()
+
+    @staticmethod
+    def dumps(entry):
+        # the crc32 of the rest, then the program in the format of
+        # monkey.serialize and each error message in utf-8, all after their
+        # lengths; nothing in a cache file is run when it is loaded
+        program, errors = entry
+        data = serialize.dumps(program)
+        out = bytearray(LENGTH.pack(0))
+        out += LENGTH.pack(len(data))
+        out += data
+        for e in errors:
+            message = e.encode('utf-8', 'surrogatepass')
+            out += LENGTH.pack(len(message))
+            out += message
+        LENGTH.pack_into(out, 0, zlib.crc32(memoryview(out)[LENGTH.size:]))
+        return bytes(out)
+
+    @staticmethod
+    def loads(data):
+        # the program is decoded lazily, so a corrupt body would only fail
+        # once it runs
+        checksum, = LENGTH.unpack_from(data)
+        if zlib.crc32(memoryview(data)[LENGTH.size:]) != checksum:
+            raise serialize.SerializeError('corrupt cache file')
+        size, = LENGTH.unpack_from(data, LENGTH.size)
+        start = 2 * LENGTH.size
+        end = start + size
+        program = serialize.loads(memoryview(data)[start:end])
+        errors = []
+        while end < len(data):
+            size, = LENGTH.unpack_from(data, end)
+            start = end + LENGTH.size
+            end = start + size
+            if end > len(data):
+                raise serialize.SerializeError('truncated cache file')
+            errors.append(str(data[start:end], 'utf-8', 'surrogatepass'))
+        return program, errors
+
+    def entries(self):
+        for e in os.scandir(self.directory):
+            if e.name.endswith(CACHE_SUFFIX):
+                yield e
+
+    def total_disk_bytes(self):
+        return sum(e.stat().st_size for e in self.entries())
+
+    def evict(self):
+        # trim to 3/4 of the limit so that eviction is not run on every store
+        target = self.max_disk_bytes * 3 // 4
+        files = sorted(self.entries(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in files)
+        for e in files:
+            if total <= target:
+                break
+            total -= e.stat().st_size
+            self.remove(e.path)
+        self.disk_bytes = total
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,459 @@
+"""Execution engine that compiles the AST into nested Python closures.
+
+`compile_node` walks a node once and returns a function(env) that
+evaluates it. Node types, operators and the shape of each node are
+resolved while compiling, so running the result, and calling a Monkey
+function repeatedly, only invokes closures that were built up front.
+The body of a function is resolved and compiled the first time its
+literal is evaluated. The results are the same as those of
+`monkey.evaluator.evaluate`, and errors and return statements raise
+the same exceptions.
+"""
+from .ast import (
+    IntegerLiteral,
+    Program,
+    ExpressionStatement,
+    Boolean,
+    PrefixExpression,
+    InfixExpression,
+    BlockStatement,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+    FunctionLiteral,
+    CallExpression,
+    StringLiteral,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .object import (
+    Integer,
+    Function,
+    Builtin,
+    Array,
+    Error,
+    new_integer,
+)
+from .environment import Environment, shadowed_builtins
+from .builtins import builtins
+from .resolver import BUILTIN, BUILTIN_VALUES, resolve, resolve_function
+from .evaluator import (
+    NULL,
+    TRUE,
+    FALSE,
+    EvaluationError,
+    Return,
+    locate,
+    apply_function,
+    call_builtin,
+    eval_integer_literal,
+    eval_string_literal,
+    eval_bang_operator_expression,
+    eval_prefix_expression,
+    eval_infix_expression,
+    eval_index_expression,
+)
+
+
+class CompiledFunction(Function):
+    """A Function that also carries its compiled body.
+
+    `parameters`, `body` and `env` are those of Function, so the tree
+    walking evaluator can call it too.
+    """
+    __slots__ = ('code', 'padding')
+
+    def __init__(self, params, body, env, scope, code, padding):
+        super().__init__(params, body, env, scope)
+        self.code = code
+        # None for the slots of the scope after the parameters
+        self.padding = padding
+
+
+def compile_program(program):
+    statements = [compile_node(s) for s in program.statements]
+
+    def run(env):
+        resolve(program, env)
+        result = None
+        try:
+            for statement in statements:
+                result = statement(env)
+        except Return as r:
+            return r.value
+        except EvaluationError as e:
+            return e.error
+        return result
+    return run
+
+
+def sequence(statements):
+    # run compiled statements in order, giving the value of the last
+    if len(statements) == 1:
+        return statements[0]
+
+    def run(env):
+        result = None
+        for statement in statements:
+            result = statement(env)
+        return result
+    return run
+
+
+def compile_block_statement(block):
+    return sequence([compile_node(s) for s in block.statements])
+
+
+def returns(statement):
+    # `if (...) { ...; return x; }` with no else
+    if type(statement) is not ExpressionStatement or type(statement.expression) is not IfExpression:
+        return False
+    expression = statement.expression
+    statements = expression.consequence.statements
+    return (expression.alternative is None and len(statements) > 0
+            and type(statements[-1]) is ReturnStatement)
+
+
+def compile_tail(node):
+    """Compile `node`, whose value is the value of the function call it
+    runs in, so that its return statements need not raise Return."""
+    node_type = type(node)
+    if node_type is ReturnStatement:
+        return compile_node(node.value)
+    elif node_type is BlockStatement:
+        return compile_tail_statements(node.statements)
+    elif node_type is ExpressionStatement and type(node.expression) is IfExpression:
+        expression = node.expression
+        return if_expression(
+            compile_node(expression.condition),
+            compile_tail(expression.consequence),
+            compile_tail(expression.alternative) if expression.alternative is not None else None)
+    return compile_node(node)
+
+
+def compile_tail_statements(statements):
+    compiled = []
+    for i, statement in enumerate(statements):
+        if i == len(statements) - 1:
+            compiled.append(compile_tail(statement))
+        elif returns(statement):
+            # `if (c) { ...; return x; } rest` runs as
+            # `if (c) { ...; return x; } else { rest }`
+            expression = statement.expression
+            compiled.append(if_expression(
+                compile_node(expression.condition),
+                compile_tail(expression.consequence),
+                compile_tail_statements(statements[i + 1:])))
+            break
+        else:
+            compiled.append(compile_node(statement))
+    if len(compiled) == 0:
+        return lambda env: None
+    return sequence(compiled)
+
+
+def compile_expression_statement(node):
+    return compile_node(node.expression)
+
+
+def compile_integer_literal(node):
+    value = eval_integer_literal(node, None)
+    return lambda env: value
+
+
+def compile_string_literal(node):
+    value = eval_string_literal(node, None)
+    return lambda env: value
+
+
+def compile_boolean(node):
+    value = TRUE if node.value else FALSE
+    return lambda env: value
+
+
+def compile_prefix_expression(node):
+    operator = node.operator
+    position = node.position
+    right = compile_node(node.right)
+
+    if operator == '!':
+        return lambda env: eval_bang_operator_expression(right(env))
+
+    def run(env):
+        value = right(env)
+        if type(value) is Integer and operator == '-':
+            return new_integer(-value.value)
+        try:
+            return eval_prefix_expression(operator, value)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+    return run
+
+
+def integer_operation(operator):
+    # the result of `operator` on two Integer values, or None for the
+    # operators left to eval_infix_expression
+    if operator == '+':
+        return lambda l, r: new_integer(l + r)
+    elif operator == '-':
+        return lambda l, r: new_integer(l - r)
+    elif operator == '*':
+        return lambda l, r: new_integer(l * r)
+    elif operator == '<':
+        return lambda l, r: TRUE if l < r else FALSE
+    elif operator == '>':
+        return lambda l, r: TRUE if l > r else FALSE
+    elif operator == '==':
+        return lambda l, r: TRUE if l == r else FALSE
+    elif operator == '!=':
+        return lambda l, r: TRUE if l != r else FALSE
+    return None
+
+
+def compile_infix_expression(node):
+    operator = node.operator
+    position = node.position
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    operation = integer_operation(operator)
+
+    def fallback(l, r):
+        try:
+            return eval_infix_expression(operator, l, r)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+
+    if operation is None:
+        return lambda env: fallback(left(env), right(env))
+
+    def run(env):
+        l = left(env)
+        r = right(env)
+        if type(l) is Integer and type(r) is Integer:
+            return operation(l.value, r.value)
+        return fallback(l, r)
+    return run
+
+
+def compile_if_expression(node):
+    return if_expression(
+        compile_node(node.condition),
+        compile_node(node.consequence),
+        compile_node(node.alternative) if node.alternative is not None else None)
+
+
+def if_expression(condition, consequence, alternative):
+    def run(env):
+        value = condition(env)
+        if value is FALSE or value is NULL:
+            if alternative is not None:
+                return alternative(env)
+            return None
+        return consequence(env)
+    return run
+
+
+def compile_return_statement(node):
+    value = compile_node(node.value)
+
+    def run(env):
+        raise Return(value(env))
+    return run
+
+
+def compile_let_statement(node):
+    name = node.name.value
+    slot = node.name.slot
+    value = compile_node(node.value)
+
+    if slot is not None:
+        def run(env):
+            env.values[slot] = value(env)
+        return run
+
+    def run(env):
+        env.set(name, value(env))
+    return run
+
+
+def lookup(env, name, position):
+    value = env.get(name)
+    if value is not None:
+        return value
+    builtin = builtins.get(name)
+    if builtin is not None:
+        return builtin
+    raise EvaluationError(Error('identifier not found: {}'.format(name), position))
+
+
+def compile_identifier(node):
+    name = node.value
+    position = node.position
+    depth = node.depth
+    slot = node.slot
+
+    if depth is None:
+        return lambda env: lookup(env, name, position)
+    elif depth == BUILTIN:
+        builtin = BUILTIN_VALUES[slot]
+
+        def run(env):
+            if name not in shadowed_builtins:
+                return builtin
+            return lookup(env, name, position)
+    elif slot is None:
+        def run(env):
+            scope = env
+            for _ in range(depth):
+                scope = scope.outer
+            value = scope.get(name)
+            if value is not None:
+                return value
+            return lookup(env, name, position)
+    elif depth == 0:
+        def run(env):
+            value = env.values[slot]
+            if value is not None:
+                return value
+            return lookup(env, name, position)
+    elif depth == 1:
+        def run(env):
+            value = env.outer.values[slot]
+            if value is not None:
+                return value
+            return lookup(env, name, position)
+    else:
+        def run(env):
+            scope = env
+            for _ in range(depth):
+                scope = scope.outer
+            value = scope.values[slot]
+            if value is not None:
+                return value
+            return lookup(env, name, position)
+    return run
+
+
+def compile_function_literal(node):
+    params = node.parameters
+    body = node.body
+    compiled = None
+
+    def run(env):
+        nonlocal compiled
+        if compiled is None:
+            scope = node.scope
+            if scope is None:
+                scope = resolve_function(node, env)
+            compiled = (scope, compile_tail(body), [None] * (len(scope) - len(params)))
+        scope, code, padding = compiled
+        return CompiledFunction(params, body, env, scope, code, padding)
+    return run
+
+
+def compile_expressions(nodes):
+    # a function(env) returning the list of values
+    expressions = [compile_node(n) for n in nodes]
+
+    def run(env):
+        values = []
+        for expression in expressions:
+            values.append(expression(env))
+        return values
+    return run
+
+
+def compile_call_expression(node):
+    function = compile_node(node.function)
+    arguments = compile_expressions(node.arguments)
+    position = node.position
+
+    def run(env):
+        fn = function(env)
+        args = arguments(env)
+        if type(fn) is CompiledFunction and len(args) == len(fn.parameters):
+            # the arguments are the first slots of the call environment
+            if fn.padding:
+                args.extend(fn.padding)
+            try:
+                return fn.code(Environment(fn.scope, fn.env, args))
+            except Return as r:
+                return r.value
+        try:
+            if type(fn) is Builtin:
+                return call_builtin(fn, args)
+            # functions created by the evaluator
+            return apply_function(fn, args)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+    return run
+
+
+def compile_array_literal(node):
+    elements = compile_expressions(node.elements)
+
+    return lambda env: Array(elements(env))
+
+
+def compile_index_expression(node):
+    left = compile_node(node.left)
+    index = compile_node(node.index)
+    position = node.position
+
+    def run(env):
+        l = left(env)
+        i = index(env)
+        if type(l) is Array and type(i) is Integer:
+            elements = l.elements
+            i = i.value
+            if 0 <= i < len(elements):
+                return elements[i]
+            return NULL
+        try:
+            return eval_index_expression(l, i)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+    return run
+
+
+def compile_unknown_node(node):
+    return lambda env: None
+
+
+# node type -> function(node) returning the compiled function(env)
+compilers = {
+    Program: compile_program,
+    IntegerLiteral: compile_integer_literal,
+    ExpressionStatement: compile_expression_statement,
+    Boolean: compile_boolean,
+    PrefixExpression: compile_prefix_expression,
+    InfixExpression: compile_infix_expression,
+    BlockStatement: compile_block_statement,
+    IfExpression: compile_if_expression,
+    ReturnStatement: compile_return_statement,
+    LetStatement: compile_let_statement,
+    Identifier: compile_identifier,
+    FunctionLiteral: compile_function_literal,
+    CallExpression: compile_call_expression,
+    StringLiteral: compile_string_literal,
+    ArrayLiteral: compile_array_literal,
+    IndexExpression: compile_index_expression,
+}
+
+
+def compile_node(node):
+    for cls in type(node).__mro__:
+        compiler = compilers.get(cls)
+        if compiler is not None:
+            return compiler(node)
+    return compile_unknown_node(node)
+
+
+def execute(node, env):
+    """Compile `node` and run it in `env`, like evaluate(node, env)."""
+    return compile_node(node)(env)
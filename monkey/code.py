@@ -1,55 +1,143 @@
+import struct
 from enum import Enum, unique
 
 
 @unique
 class DefinitionType(Enum):
     op_constant = 0
+    op_pop = 1
+    op_add = 2
+    op_sub = 3
+    op_mul = 4
+    op_div = 5
+    op_true = 6
+    op_false = 7
+    # the value of a statement that has none, such as `let`
+    op_null = 8
+    op_equal = 9
+    op_not_equal = 10
+    op_greater_than = 11
+    op_less_than = 12
+    op_minus = 13
+    op_bang = 14
+    op_jump_not_truthy = 15
+    op_jump = 16
+    op_get_global = 17
+    op_set_global = 18
+    op_get_local = 19
+    op_set_local = 20
+    op_get_builtin = 21
+    op_get_free = 22
+    op_array = 23
+    op_index = 24
+    op_call = 25
+    op_return_value = 26
+    op_closure = 27
+    # superinstructions, emitted by monkey.peephole for common sequences
+    op_get_local_constant = 28
+    op_add_local_constant = 29
+    op_sub_local_constant = 30
+    op_compare_jump = 31
+    op_return_local = 32
 
     def __int__(self):
         return self.value
 
 
+# operand widths in bytes; operands are unsigned big endian
+_widths = {
+    DefinitionType.op_constant: [2],
+    DefinitionType.op_jump_not_truthy: [2],
+    DefinitionType.op_jump: [2],
+    DefinitionType.op_get_global: [2],
+    DefinitionType.op_set_global: [2],
+    DefinitionType.op_get_local: [1],
+    DefinitionType.op_set_local: [1],
+    DefinitionType.op_get_builtin: [1],
+    # number of scopes out, slot in that scope
+    DefinitionType.op_get_free: [1, 1],
+    DefinitionType.op_array: [2],
+    DefinitionType.op_call: [1],
+    DefinitionType.op_closure: [2],
+    # local, constant
+    DefinitionType.op_get_local_constant: [1, 2],
+    DefinitionType.op_add_local_constant: [1, 2],
+    DefinitionType.op_sub_local_constant: [1, 2],
+    # comparison opcode, jump target if the comparison is false
+    DefinitionType.op_compare_jump: [1, 2],
+    DefinitionType.op_return_local: [1],
+}
+
 definitions = {
-    int(DefinitionType.op_constant): {
-        'name': 'op_constant',
-        'operands_widths': [2],
+    int(op): {
+        'name': op.name,
+        'operands_widths': _widths.get(op, []),
     }
+    for op in DefinitionType
+}
+
+_formats = {1: 'B', 2: 'H'}
+
+# op -> struct packing the opcode and its operands
+layouts = {
+    op: struct.Struct('>B' + ''.join(_formats[w] for w in d['operands_widths']))
+    for op, d in definitions.items()
 }
 
+# op -> struct of its operands alone, for reading them in place
+operand_layouts = {
+    op: struct.Struct('>' + ''.join(_formats[w] for w in d['operands_widths']))
+    for op, d in definitions.items()
+}
+
+# op -> length of the whole instruction
+instruction_lengths = {op: layout.size for op, layout in layouts.items()}
+
+_packers = {op: layout.pack for op, layout in layouts.items()}
+
 
 def lookup(op):
     definition = definitions.get(op)
     return definition
 
 
-def make(op, operands):
-    definition = definitions.get(op)
-    if definition is None:
-        return bytearray()
-    instruction_len = 1
-    for i in definition['operands_widths']:
-        instruction_len += i
+def make(op, operands=()):
+    """The bytes of instruction `op` with `operands`, or b'' for an
+    unknown opcode."""
+    try:
+        return _packers[op](op, *operands)
+    except KeyError:
+        return b''
+
 
-    instruction = bytearray()
-    instruction.append(op)
+def read_operands(op, instructions, offset):
+    """Operands of the instruction `op` whose opcode is at `offset`.
 
-    offset = 1
-    for i in range(len(operands)):
-        width = definition['operands_widths'][i]
-        operand = operands[i].to_bytes(2, byteorder="big")
-        if width == 2:
-            instruction += bytearray(operand)
-        offset += width
+    `instructions` may be bytes, a bytearray or a memoryview; the operands
+    are decoded in place, without copying.
+    """
+    return operand_layouts[op].unpack_from(instructions, offset + 1)
 
-    return instruction
 
+def read_uint16(instructions, offset):
+    return (instructions[offset] << 8) | instructions[offset + 1]
 
-def test_make():
-    op = int(DefinitionType.op_constant)
-    operands = [65534]
-    instruction = make(op, operands)
-    print(instruction)
 
+class Instructions(bytearray):
+    """Bytecode; str() disassembles it, one instruction per line."""
 
-if __name__ == '__main__':
-    test_make()
+    def __str__(self):
+        lines = []
+        view = memoryview(self)
+        offset = 0
+        while offset < len(view):
+            op = view[offset]
+            definition = definitions.get(op)
+            if definition is None:
+                lines.append('{:04d} ERROR: unknown opcode {}'.format(offset, op))
+                offset += 1
+                continue
+            operands = read_operands(op, view, offset)
+            lines.append(' '.join(['{:04d}'.format(offset), definition['name']] + [str(o) for o in operands]))
+            offset += instruction_lengths[op]
+        return '\n'.join(lines) + '\n' if lines else ''
@@ -1,13 +1,434 @@
-class Compiler:
-    def __init__(self):
-        self.instructions = []
-        self.constants = []
+"""Compiler from the AST to the bytecode of monkey.code.
+
+The compiler walks a program once. Variables are resolved with the same
+rules as monkey.resolver: only functions create scopes, the scope of a
+function holds its parameters and every `let` in its body outside nested
+functions, and the `let`s of a program are declared before it runs, so a
+function can use a variable defined after it. Top level variables are
+globals, read by index, and a name that is never defined becomes a global
+that is never assigned, which fails when it is read.
+
+A variable of an enclosing function is read through the closure, which
+keeps the locals of the enclosing calls themselves, not copies. The value
+of a variable that has not been assigned yet is looked up in the scopes
+further out, as `evaluate` does; `CompiledFunction.lookups` records where.
+
+Every statement has a value, as in `evaluate`: blocks leave the value of
+their last statement on the stack, and `let` leaves None.
+
+Operands have the fixed widths of monkey.code. A program with more of
+something than an operand can count, such as more than 65535 constants
+or 255 arguments in a call, raises CompileError naming the limit.
+"""
+import struct
+
+from .ast import (
+    IntegerLiteral,
+    Program,
+    ExpressionStatement,
+    Boolean,
+    PrefixExpression,
+    InfixExpression,
+    BlockStatement,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+    FunctionLiteral,
+    CallExpression,
+    StringLiteral,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .code import DefinitionType, Instructions, definitions, layouts, make
+from .object import Integer, String, CompiledFunction
+from .resolver import BUILTIN_SLOTS, declarations
+from .evaluator import eval_integer_literal, eval_string_literal
+
+GLOBAL_SCOPE = 'GLOBAL'
+LOCAL_SCOPE = 'LOCAL'
+BUILTIN_SCOPE = 'BUILTIN'
+FREE_SCOPE = 'FREE'
+
+INFIX_OPERATORS = {
+    '+': DefinitionType.op_add,
+    '-': DefinitionType.op_sub,
+    '*': DefinitionType.op_mul,
+    '/': DefinitionType.op_div,
+    '==': DefinitionType.op_equal,
+    '!=': DefinitionType.op_not_equal,
+    '>': DefinitionType.op_greater_than,
+    '<': DefinitionType.op_less_than,
+}
+
+PREFIX_OPERATORS = {
+    '-': DefinitionType.op_minus,
+    '!': DefinitionType.op_bang,
+}
+
+# what the operands of each instruction are, for CompileError
+OPERANDS = {
+    DefinitionType.op_constant: ('constant index',),
+    DefinitionType.op_jump_not_truthy: ('jump target',),
+    DefinitionType.op_jump: ('jump target',),
+    DefinitionType.op_get_global: ('global index',),
+    DefinitionType.op_set_global: ('global index',),
+    DefinitionType.op_get_local: ('local index',),
+    DefinitionType.op_set_local: ('local index',),
+    DefinitionType.op_get_builtin: ('builtin index',),
+    DefinitionType.op_get_free: ('enclosing function depth', 'free variable index'),
+    DefinitionType.op_array: ('array length',),
+    DefinitionType.op_call: ('number of arguments',),
+    DefinitionType.op_closure: ('constant index',),
+}
+
+
+class CompileError(Exception):
+    pass
+
+
+def operand_error(op, operands):
+    """The CompileError for `operands` of `op` that do not fit its
+    operand widths."""
+    op = DefinitionType(int(op))
+    widths = definitions[int(op)]['operands_widths']
+    names = OPERANDS.get(op, ())
+    for i, (operand, width) in enumerate(zip(operands, widths)):
+        limit = (1 << (8 * width)) - 1
+        if not 0 <= operand <= limit:
+            name = names[i] if i < len(names) else 'operand'
+            return CompileError('{} {} is over the limit of {} for {}'.format(name, operand, limit, op.name))
+    return CompileError('bad operands {} for {}'.format(list(operands), op.name))
+
+
+class Symbol:
+    __slots__ = ('name', 'scope', 'index', 'depth')
 
-    def compile(self):
+    def __init__(self, name, scope, index, depth=0):
+        self.name = name
+        self.scope = scope
+        self.index = index
+        # for FREE_SCOPE, how many functions out the variable is
+        self.depth = depth
+
+    def __eq__(self, other):
+        return (type(other) is Symbol and self.name == other.name and self.scope == other.scope
+                and self.index == other.index and self.depth == other.depth)
+
+    def __repr__(self):
+        return 'Symbol({!r}, {}, {}, {})'.format(self.name, self.scope, self.index, self.depth)
+
+
+class SymbolTable:
+    """Names of one scope: the globals if `outer` is None, else the
+    locals of a function."""
+
+    def __init__(self, outer=None):
+        self.outer = outer
+        self.store = {}
+        self.num_definitions = 0
+
+    def define(self, name):
+        symbol = self.store.get(name)
+        if symbol is not None and symbol.scope != BUILTIN_SCOPE:
+            # `let` of a name already in the scope assigns the same variable
+            return symbol
+        scope = GLOBAL_SCOPE if self.outer is None else LOCAL_SCOPE
+        symbol = self.store[name] = Symbol(name, scope, self.num_definitions)
+        self.num_definitions += 1
+        return symbol
+
+    def define_builtin(self, index, name):
+        symbol = self.store[name] = Symbol(name, BUILTIN_SCOPE, index)
+        return symbol
+
+    def resolve(self, name):
+        table = self
+        depth = 0
+        while table is not None:
+            symbol = table.store.get(name)
+            if symbol is not None:
+                if depth == 0 or symbol.scope != LOCAL_SCOPE:
+                    return symbol
+                return Symbol(name, FREE_SCOPE, symbol.index, depth)
+            table = table.outer
+            depth += 1
         return None
 
+    def globals(self):
+        table = self
+        while table.outer is not None:
+            table = table.outer
+        return table
+
+    def fallbacks(self, name, depth):
+        """Where to look for `name` when its variable `depth` functions out
+        is not assigned: the (depth, index) of the same name in the
+        functions further out, and its global index or None."""
+        candidates = []
+        table = self
+        for _ in range(depth + 1):
+            table = table.outer
+        depth += 1
+        while table.outer is not None:
+            symbol = table.store.get(name)
+            if symbol is not None:
+                candidates.append((depth, symbol.index))
+            table = table.outer
+            depth += 1
+        symbol = table.store.get(name)
+        if symbol is not None and symbol.scope == GLOBAL_SCOPE:
+            return tuple(candidates), symbol.index
+        return tuple(candidates), None
+
+
+def new_symbol_table():
+    """A global symbol table with the builtins defined."""
+    table = SymbolTable()
+    for name, index in BUILTIN_SLOTS.items():
+        table.define_builtin(index, name)
+    return table
+
+
+class CompilationScope:
+    __slots__ = ('instructions', 'positions', 'lookups')
+
+    def __init__(self):
+        self.instructions = Instructions()
+        self.positions = {}
+        self.lookups = {}
+
+
+class Compiler:
+    def __init__(self, symbol_table=None, constants=None):
+        # pass the symbol table and constants of a previous compiler to
+        # compile programs that run in the same globals, as in the REPL
+        self.symbol_table = symbol_table if symbol_table is not None else new_symbol_table()
+        self.constants = constants if constants is not None else []
+        self.constant_indices = {}
+        for i, constant in enumerate(self.constants):
+            if type(constant) is Integer or type(constant) is String:
+                self.constant_indices[type(constant), constant.value] = i
+        self.scopes = [CompilationScope()]
+
+    @property
+    def instructions(self):
+        return self.scopes[-1].instructions
+
+    def compile(self, node):
+        """Emit the instructions leaving the value of `node` on the stack."""
+        for cls in type(node).__mro__:
+            compiler = compilers.get(cls)
+            if compiler is not None:
+                compiler(self, node)
+                return
+        # like evaluate, nodes without a compiler have no value
+        self.emit(DefinitionType.op_null)
+
     def bytecode(self):
+        scope = self.scopes[-1]
+        table = self.symbol_table.globals()
+        names = [None] * table.num_definitions
+        for symbol in table.store.values():
+            if symbol.scope == GLOBAL_SCOPE:
+                names[symbol.index] = symbol.name
         return {
-            'instructions': self.instructions,
+            'instructions': scope.instructions,
             'constants': self.constants,
-        }
\ No newline at end of file
+            'positions': scope.positions,
+            'lookups': scope.lookups,
+            # names of the globals, by index
+            'globals': names,
+        }
+
+    def emit(self, op, operands=(), position=None):
+        scope = self.scopes[-1]
+        offset = len(scope.instructions)
+        try:
+            scope.instructions += make(int(op), operands)
+        except struct.error:
+            raise operand_error(op, operands) from None
+        if position is not None:
+            scope.positions[offset] = position
+        return offset
+
+    def change_operand(self, offset, operand):
+        instructions = self.scopes[-1].instructions
+        op = instructions[offset]
+        try:
+            layouts[op].pack_into(instructions, offset, op, operand)
+        except struct.error:
+            raise operand_error(op, (operand,)) from None
+
+    def add_constant(self, obj):
+        key = None
+        if type(obj) is Integer or type(obj) is String:
+            key = (type(obj), obj.value)
+            index = self.constant_indices.get(key)
+            if index is not None:
+                return index
+        self.constants.append(obj)
+        index = len(self.constants) - 1
+        if key is not None:
+            self.constant_indices[key] = index
+        return index
+
+    def enter_scope(self):
+        self.scopes.append(CompilationScope())
+        self.symbol_table = SymbolTable(self.symbol_table)
+
+    def leave_scope(self):
+        self.symbol_table = self.symbol_table.outer
+        return self.scopes.pop()
+
+    def compile_statements(self, statements):
+        if len(statements) == 0:
+            self.emit(DefinitionType.op_null)
+            return
+        last = len(statements) - 1
+        for i, statement in enumerate(statements):
+            if type(statement) is LetStatement:
+                self.compile_let(statement)
+                if i == last:
+                    self.emit(DefinitionType.op_null)
+            else:
+                self.compile(statement)
+                if i < last:
+                    self.emit(DefinitionType.op_pop)
+
+    def compile_program(self, program):
+        names = []
+        declarations(program, names)
+        table = self.symbol_table
+        for name in names:
+            table.define(name)
+        self.compile_statements(program.statements)
+        self.emit(DefinitionType.op_return_value)
+
+    def compile_block_statement(self, block):
+        self.compile_statements(block.statements)
+
+    def compile_expression_statement(self, statement):
+        self.compile(statement.expression)
+
+    def compile_let(self, statement):
+        symbol = self.symbol_table.define(statement.name.value)
+        self.compile(statement.value)
+        if symbol.scope == GLOBAL_SCOPE:
+            self.emit(DefinitionType.op_set_global, (symbol.index,))
+        else:
+            self.emit(DefinitionType.op_set_local, (symbol.index,))
+
+    def compile_let_statement(self, statement):
+        self.compile_let(statement)
+        self.emit(DefinitionType.op_null)
+
+    def compile_return_statement(self, statement):
+        self.compile(statement.value)
+        self.emit(DefinitionType.op_return_value)
+
+    def compile_integer_literal(self, node):
+        index = self.add_constant(eval_integer_literal(node, None))
+        self.emit(DefinitionType.op_constant, (index,))
+
+    def compile_string_literal(self, node):
+        index = self.add_constant(eval_string_literal(node, None))
+        self.emit(DefinitionType.op_constant, (index,))
+
+    def compile_boolean(self, node):
+        self.emit(DefinitionType.op_true if node.value else DefinitionType.op_false)
+
+    def compile_prefix_expression(self, node):
+        self.compile(node.right)
+        self.emit(PREFIX_OPERATORS[node.operator], (), node.position)
+
+    def compile_infix_expression(self, node):
+        self.compile(node.left)
+        self.compile(node.right)
+        self.emit(INFIX_OPERATORS[node.operator], (), node.position)
+
+    def compile_if_expression(self, node):
+        self.compile(node.condition)
+        jump_not_truthy = self.emit(DefinitionType.op_jump_not_truthy, (0,))
+        self.compile(node.consequence)
+        jump = self.emit(DefinitionType.op_jump, (0,))
+        self.change_operand(jump_not_truthy, len(self.instructions))
+        if node.alternative is None:
+            self.emit(DefinitionType.op_null)
+        else:
+            self.compile(node.alternative)
+        self.change_operand(jump, len(self.instructions))
+
+    def compile_identifier(self, node):
+        name = node.value
+        symbol = self.symbol_table.resolve(name)
+        if symbol is None:
+            symbol = self.symbol_table.globals().define(name)
+
+        if symbol.scope == BUILTIN_SCOPE:
+            self.emit(DefinitionType.op_get_builtin, (symbol.index,))
+            return
+        if symbol.scope == GLOBAL_SCOPE:
+            offset = self.emit(DefinitionType.op_get_global, (symbol.index,))
+            candidates, global_index = (), None
+        elif symbol.scope == LOCAL_SCOPE:
+            offset = self.emit(DefinitionType.op_get_local, (symbol.index,))
+            candidates, global_index = self.symbol_table.fallbacks(name, 0)
+        else:
+            offset = self.emit(DefinitionType.op_get_free, (symbol.depth, symbol.index))
+            candidates, global_index = self.symbol_table.fallbacks(name, symbol.depth)
+        self.scopes[-1].lookups[offset] = (name, candidates, global_index, node.position)
+
+    def compile_function_literal(self, node):
+        parameters = [p.value for p in node.parameters]
+        names = list(parameters)
+        declarations(node.body, names)
+
+        self.enter_scope()
+        for name in names:
+            self.symbol_table.define(name)
+        self.compile_statements(node.body.statements)
+        self.emit(DefinitionType.op_return_value)
+        num_locals = self.symbol_table.num_definitions
+        scope = self.leave_scope()
+
+        fn = CompiledFunction(scope.instructions, num_locals, parameters, node.body,
+                              scope.positions, scope.lookups)
+        self.emit(DefinitionType.op_closure, (self.add_constant(fn),))
+
+    def compile_call_expression(self, node):
+        self.compile(node.function)
+        for argument in node.arguments:
+            self.compile(argument)
+        self.emit(DefinitionType.op_call, (len(node.arguments),), node.position)
+
+    def compile_array_literal(self, node):
+        for element in node.elements:
+            self.compile(element)
+        self.emit(DefinitionType.op_array, (len(node.elements),))
+
+    def compile_index_expression(self, node):
+        self.compile(node.left)
+        self.compile(node.index)
+        self.emit(DefinitionType.op_index, (), node.position)
+
+
+# node type -> Compiler method emitting its instructions
+compilers = {
+    Program: Compiler.compile_program,
+    IntegerLiteral: Compiler.compile_integer_literal,
+    ExpressionStatement: Compiler.compile_expression_statement,
+    Boolean: Compiler.compile_boolean,
+    PrefixExpression: Compiler.compile_prefix_expression,
+    InfixExpression: Compiler.compile_infix_expression,
+    BlockStatement: Compiler.compile_block_statement,
+    IfExpression: Compiler.compile_if_expression,
+    ReturnStatement: Compiler.compile_return_statement,
+    LetStatement: Compiler.compile_let_statement,
+    Identifier: Compiler.compile_identifier,
+    FunctionLiteral: Compiler.compile_function_literal,
+    CallExpression: Compiler.compile_call_expression,
+    StringLiteral: Compiler.compile_string_literal,
+    ArrayLiteral: Compiler.compile_array_literal,
+    IndexExpression: Compiler.compile_index_expression,
+}
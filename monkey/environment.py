@@ -1,23 +1,61 @@
+from .builtins import builtins
+
+# names of builtins some environment has declared as a variable: identifiers
+# monkey.resolver bound to these builtins look them up by name instead, as
+# the AST, and so the binding, may be shared by other environments
+shadowed_builtins = set()
+
+
 class Environment:
-    def __init__(self):
-        self.map = dict()
-        self.outer = None
+    """Variables of one scope, stored in the `values` list.
+
+    `names` maps a name to its index in `values`. The environments of a
+    function call share the names of the function's scope, computed by
+    `monkey.resolver`, so resolved identifiers are read by index. The
+    top level environment owns its names and grows as variables are set.
+    """
+    __slots__ = ('names', 'values', 'outer', 'shared')
+
+    def __init__(self, names=None, outer=None, values=None):
+        if names is None:
+            self.names = dict()
+            self.values = []
+            self.shared = False
+        else:
+            self.names = names
+            self.values = values if values is not None else [None] * len(names)
+            self.shared = True
+        self.outer = outer
 
     def get(self, name):
-        obj = self.map.get(name)
-        if obj is None and self.outer is not None:
-            obj = self.outer.get(name)
+        env = self
+        while env is not None:
+            slot = env.names.get(name)
+            if slot is not None:
+                obj = env.values[slot]
+                if obj is not None:
+                    return obj
+            env = env.outer
+
+        return None
 
-        return obj
+    def declare(self, name):
+        slot = self.names.get(name)
+        if slot is None:
+            if self.shared:
+                # never add to the names of a function scope
+                self.names = dict(self.names)
+                self.shared = False
+            slot = self.names[name] = len(self.values)
+            self.values.append(None)
+            if name in builtins:
+                shadowed_builtins.add(name)
+        return slot
 
     def set(self, name, val):
-        self.map[name] = val
+        self.values[self.declare(name)] = val
         return val
 
 
-def new_enclosed_environment(outer):
-    env = Environment()
-    env.outer = outer
-    return env
-
-
+def new_enclosed_environment(outer, names=None, values=None):
+    return Environment(names, outer, values)
@@ -19,55 +19,71 @@ from .ast import (
 from .object import (
     Integer,
     Boolean as BooleanObject,
-    Null,
-    ObjectType,
-    ReturnValue,
     Function,
     String,
     Builtin,
     Array,
+    Error,
+    NULL,
+    TRUE,
+    FALSE,
+    new_integer,
+    intern_string,
 )
-from .environment import new_enclosed_environment
+from .environment import new_enclosed_environment, shadowed_builtins
 from .builtins import builtins
+from .jit import DEOPTIMIZED, tier_up, deoptimize
+from .memo import MISSING
+from .resolver import BUILTIN, BUILTIN_VALUES, resolve, resolve_function
 
-NULL = Null()
-TRUE = BooleanObject(True)
-FALSE = BooleanObject(False)
+
+class EvaluationError(Exception):
+    """Raised with the Error object that stops the evaluation."""
+
+    def __init__(self, error):
+        super().__init__(error.message)
+        self.error = error
+
+
+class Return(Exception):
+    """Raised by a return statement, caught by the enclosing call or program."""
+
+    def __init__(self, value):
+        self.value = value
 
 
 def eval_program(program, env):
+    resolve(program, env)
     result = None
-    for s in program.statements:
-        result = evaluate(s, env)
-        if result is None:
-            continue
-        if result.type_() == ObjectType.RETURN_VALUE_OBJ:
-            return result.value
-        elif result.type_() == ObjectType.ERROR_OBJ:
-            return result
+    try:
+        for s in program.statements:
+            result = evaluate(s, env)
+    except Return as r:
+        return r.value
+    except EvaluationError as e:
+        return e.error
     return result
 
 
 def eval_expressions(exps, env):
     result = []
     for e in exps:
-        evaluated = evaluate(e, env)
-        if is_error(evaluated):
-            errs = list()
-            errs.append(evaluated)
-            return errs
-        result.append(evaluated)
+        result.append(evaluate(e, env))
     return result
 
 
 def new_error(format_str, *args):
-    return format_str.format(*args)
+    return Error(format_str.format(*args))
+
+
+def locate(error, position):
+    # errors are reported at the innermost node that failed
+    if error.position is None:
+        error.position = position
 
 
 def is_error(obj):
-    if obj is not None:
-        return obj.type_() == ObjectType.ERROR_OBJ
-    return False
+    return type(obj) is Error
 
 
 def native_bool_to_bool_lean_object(input):
@@ -76,12 +92,6 @@ def native_bool_to_bool_lean_object(input):
     return FALSE
 
 
-def native_double_bool_to_bool_lean_object(left, right):
-    if left is right:
-        return TRUE
-    return FALSE
-
-
 def eval_bang_operator_expression(right):
     if right is TRUE:
         return FALSE
@@ -94,11 +104,11 @@ def eval_bang_operator_expression(right):
 
 
 def eval_minus_prefix_operator_expression(right):
-    if right.type_() != ObjectType.INTEGER_OBJ:
-        return new_error('unknown operator: -{}', right.type_())
+    if type(right) is not Integer:
+        raise EvaluationError(new_error('unknown operator: -{}', right.type_()))
 
     value = right.value
-    return Integer(-value)
+    return new_integer(-value)
 
 
 def eval_prefix_expression(operator, right):
@@ -107,21 +117,19 @@ def eval_prefix_expression(operator, right):
     elif operator == '-':
         return eval_minus_prefix_operator_expression(right)
     else:
-        return new_error('unknown operator: {}{}', operator, right.type_())
+        raise EvaluationError(new_error('unknown operator: {}{}', operator, right.type_()))
 
 
 def eval_integer_infix_expression(operator, left, right):
     left_value = left.value
     right_value = right.value
-    left_type = left.type_()
-    right_type = right.type_()
 
     if operator == '+':
-        return Integer(left_value + right_value)
+        return new_integer(left_value + right_value)
     elif operator == '-':
-        return Integer(left_value - right_value)
+        return new_integer(left_value - right_value)
     elif operator == '*':
-        return Integer(left_value * right_value)
+        return new_integer(left_value * right_value)
     elif operator == '/':
         return Integer(left_value / right_value)
     elif operator == '<':
@@ -129,34 +137,127 @@ def eval_integer_infix_expression(operator, left, right):
     elif operator == '>':
         return native_bool_to_bool_lean_object(left_value > right_value)
     elif operator == '==':
-        if left_type == ObjectType.BOOLEAN_OBJ and right_type == ObjectType.BOOLEAN_OBJ:
-            return native_double_bool_to_bool_lean_object(left, right)
         return native_bool_to_bool_lean_object(left_value == right_value)
     elif operator == '!=':
-        if left_type == ObjectType.BOOLEAN_OBJ and right_type == ObjectType.BOOLEAN_OBJ:
-            return native_double_bool_to_bool_lean_object(left, right)
         return native_bool_to_bool_lean_object(left_value != right_value)
     else:
-        return new_error('unknown operator: {} {} {}', left.type_(), operator, right.type_())
+        raise EvaluationError(new_error('unknown operator: {} {} {}', left.type_(), operator, right.type_()))
 
 
 def eval_string_infix_expression(operator, left, right):
     if operator != '+':
-        return new_error('unknown operator: {} {} {}', left.type_(), operator, right.type_())
+        raise EvaluationError(new_error('unknown operator: {} {} {}', left.type_(), operator, right.type_()))
     left_value = left.value
     right_value = right.value
     return String(left_value + right_value)
 
 
 def eval_infix_expression(operator, left, right):
-    if left.type_() == ObjectType.INTEGER_OBJ and right.type_() == ObjectType.INTEGER_OBJ:
+    left_type = type(left)
+    right_type = type(right)
+    if left_type is Integer and right_type is Integer:
         return eval_integer_infix_expression(operator, left, right)
-    if left.type_() != right.type_():
-        return new_error('type mismatch: {} {} {}', left.type_(), operator, right.type_())
-    if left.type_() == ObjectType.STRING_OBJ and right.type_() == ObjectType.STRING_OBJ:
+    if left_type is String and right_type is String:
         return eval_string_infix_expression(operator, left, right)
+    if operator == '==':
+        return native_bool_to_bool_lean_object(left is right)
+    if operator == '!=':
+        return native_bool_to_bool_lean_object(left is not right)
+    if left_type is not right_type:
+        raise EvaluationError(new_error('type mismatch: {} {} {}', left.type_(), operator, right.type_()))
     else:
-        return new_error('unknown operator: {} {} {}', left.type_(), operator, right.type_())
+        raise EvaluationError(new_error('unknown operator: {} {} {}', left.type_(), operator, right.type_()))
+
+
+# Operators specialized for the operand types inferred by monkey.inference.
+# Each checks the types and falls back to the generic path otherwise.
+
+def add_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return new_integer(left.value + right.value)
+    return eval_infix_expression('+', left, right)
+
+
+def subtract_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return new_integer(left.value - right.value)
+    return eval_infix_expression('-', left, right)
+
+
+def multiply_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return new_integer(left.value * right.value)
+    return eval_infix_expression('*', left, right)
+
+
+def less_than_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return TRUE if left.value < right.value else FALSE
+    return eval_infix_expression('<', left, right)
+
+
+def greater_than_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return TRUE if left.value > right.value else FALSE
+    return eval_infix_expression('>', left, right)
+
+
+def equal_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return TRUE if left.value == right.value else FALSE
+    return eval_infix_expression('==', left, right)
+
+
+def not_equal_integers(left, right):
+    if type(left) is Integer and type(right) is Integer:
+        return TRUE if left.value != right.value else FALSE
+    return eval_infix_expression('!=', left, right)
+
+
+def concatenate_strings(left, right):
+    if type(left) is String and type(right) is String:
+        return String(left.value + right.value)
+    return eval_infix_expression('+', left, right)
+
+
+def equal_booleans(left, right):
+    if type(left) is BooleanObject and type(right) is BooleanObject:
+        return TRUE if left is right else FALSE
+    return eval_infix_expression('==', left, right)
+
+
+def not_equal_booleans(left, right):
+    if type(left) is BooleanObject and type(right) is BooleanObject:
+        return TRUE if left is not right else FALSE
+    return eval_infix_expression('!=', left, right)
+
+
+def negate_integer(right):
+    if type(right) is Integer:
+        return new_integer(-right.value)
+    return eval_prefix_expression('-', right)
+
+
+# (left type, operator, right type) -> specialized handler(left, right)
+specialized_infix = {
+    (Integer, '+', Integer): add_integers,
+    (Integer, '-', Integer): subtract_integers,
+    (Integer, '*', Integer): multiply_integers,
+    (Integer, '<', Integer): less_than_integers,
+    (Integer, '>', Integer): greater_than_integers,
+    (Integer, '==', Integer): equal_integers,
+    (Integer, '!=', Integer): not_equal_integers,
+    (String, '+', String): concatenate_strings,
+    (BooleanObject, '==', BooleanObject): equal_booleans,
+    (BooleanObject, '!=', BooleanObject): not_equal_booleans,
+}
+
+# (operator, operand type) -> specialized handler(right)
+specialized_prefix = {
+    ('-', Integer): negate_integer,
+    ('!', BooleanObject): eval_bang_operator_expression,
+    ('!', Integer): eval_bang_operator_expression,
+}
 
 
 def eval_array_index_expression(array, index):
@@ -170,10 +271,10 @@ def eval_array_index_expression(array, index):
 
 
 def eval_index_expression(left, index):
-    if left.type_() == ObjectType.ARRAY_OBJ and index.type_() == ObjectType.INTEGER_OBJ:
+    if type(left) is Array and type(index) is Integer:
         return eval_array_index_expression(left, index)
     else:
-        return new_error('index operator not supported: {}'.format(left.type_()))
+        raise EvaluationError(new_error('index operator not supported: {}', left.type_()))
 
 
 def is_truthy(obj):
@@ -190,9 +291,7 @@ def is_truthy(obj):
 def eval_if_expression(ie, env):
     condition = evaluate(ie.condition, env)
 
-    if is_error(condition):
-        return condition
-    elif is_truthy(condition):
+    if is_truthy(condition):
         return evaluate(ie.consequence, env)
     elif ie.alternative is not None:
         return evaluate(ie.alternative, env)
@@ -205,15 +304,32 @@ def eval_block_statement(block, env):
 
     for s in block.statements:
         result = evaluate(s, env)
-        if result is not None:
-            rt = result.type_()
-            if rt == ObjectType.RETURN_VALUE_OBJ or rt == ObjectType.ERROR_OBJ:
-                return result
 
     return result
 
 
 def eval_identifier(node, env):
+    depth = node.depth
+    slot = node.slot
+    if depth == 0 and slot is not None:
+        val = env.values[slot]
+        if val is not None:
+            return val
+    elif depth == BUILTIN:
+        if node.value not in shadowed_builtins:
+            return BUILTIN_VALUES[slot]
+    elif depth is not None:
+        scope = env
+        for _ in range(depth):
+            scope = scope.outer
+        if slot is not None:
+            val = scope.values[slot]
+        else:
+            val = scope.get(node.value)
+        if val is not None:
+            return val
+
+    # not resolved, or a variable that has not been assigned yet
     val = env.get(node.value)
     if val is not None:
         return val
@@ -222,100 +338,227 @@ def eval_identifier(node, env):
     if builtin is not None:
         return builtin
 
-    return new_error('identifier not found: {}'.format(node.value))
+    raise EvaluationError(Error('identifier not found: {}'.format(node.value), node.position))
+
+
+# calls after which monkey.jit compiles a function; None turns it off
+JIT_THRESHOLD = 50
 
 
 def apply_function(fn, args):
     if isinstance(fn, Function):
-        extended_env = extend_function_env(fn, args)
-        evaluated = evaluate(fn.body, extended_env)
-        return unwrap_return_value(evaluated)
+        memo = fn.memo
+        key = None
+        if memo is not None:
+            key = memo.key(args)
+            if key is not None:
+                result = memo.get(key)
+                if result is not MISSING:
+                    return result
+        jitted = fn.jitted
+        result = DEOPTIMIZED
+        if jitted is not None:
+            result = jitted(fn.env, args)
+            if result is DEOPTIMIZED:
+                deoptimize(fn)
+        else:
+            fn.calls += 1
+            if fn.calls == JIT_THRESHOLD:
+                tier_up(fn, args)
+        if result is DEOPTIMIZED:
+            extended_env = extend_function_env(fn, args)
+            try:
+                result = evaluate(fn.body, extended_env)
+            except Return as r:
+                result = r.value
+        if key is not None:
+            memo.put(key, result)
+        return result
     elif isinstance(fn, Builtin):
-        return fn.fn(args)
+        return call_builtin(fn, args)
 
-    return new_error('not a function: {}', fn.type_())
+    raise EvaluationError(new_error('not a function: {}', fn.type_()))
 
 
-def extend_function_env(fn, args):
-    env = new_enclosed_environment(fn.env)
+def call_builtin(fn, args):
+    # builtins return their errors
+    result = fn.fn(args)
+    if type(result) is Error:
+        raise EvaluationError(result)
+    return result
+
 
+def extend_function_env(fn, args):
+    if fn.scope is None:
+        env = new_enclosed_environment(fn.env)
+        for i in range(len(fn.parameters)):
+            env.set(fn.parameters[i].value, args[i])
+        return env
+
+    # the parameters are the first slots of the scope
+    env = new_enclosed_environment(fn.env, fn.scope)
+    values = env.values
     for i in range(len(fn.parameters)):
-        param = fn.parameters[i]
-        env.set(param.value, args[i])
+        values[i] = args[i]
 
     return env
 
 
-def unwrap_return_value(obj):
-    if isinstance(obj, ReturnValue):
-        return obj.value
+def eval_integer_literal(node, env):
+    value = node.constant
+    if value is None:
+        value = node.constant = new_integer(node.value)
+    return value
 
-    return obj
 
+def eval_expression_statement(node, env):
+    return evaluate(node.expression, env)
 
-def evaluate(node, env):
-    if isinstance(node, Program):
-        return eval_program(node, env)
-    elif isinstance(node, IntegerLiteral):
-        return Integer(node.value)
-    elif isinstance(node, ExpressionStatement):
-        return evaluate(node.expression, env)
-    elif isinstance(node, Boolean):
-        return native_bool_to_bool_lean_object(node.value)
-    elif isinstance(node, PrefixExpression):
-        right = evaluate(node.right, env)
-        if is_error(right):
-            return right
+
+def eval_boolean(node, env):
+    return native_bool_to_bool_lean_object(node.value)
+
+
+def eval_prefix_expression_node(node, env):
+    right = evaluate(node.right, env)
+    try:
+        specialized = node.specialized
+        if specialized is not None:
+            return specialized(right)
         return eval_prefix_expression(node.operator, right)
-    elif isinstance(node, InfixExpression):
-        left = evaluate(node.left, env)
-        if is_error(left):
-            return left
-        right = evaluate(node.right, env)
-        if is_error(right):
-            return right
+    except EvaluationError as e:
+        locate(e.error, node.position)
+        raise
+
+
+def eval_infix_expression_node(node, env):
+    left = evaluate(node.left, env)
+    right = evaluate(node.right, env)
+    try:
+        specialized = node.specialized
+        if specialized is not None:
+            return specialized(left, right)
         return eval_infix_expression(node.operator, left, right)
-    elif isinstance(node, BlockStatement):
-        return eval_block_statement(node, env)
-    elif isinstance(node, IfExpression):
-        return eval_if_expression(node, env)
-    elif isinstance(node, ReturnStatement):
-        val = evaluate(node.value, env)
-        if is_error(val):
-            return val
-        return ReturnValue(val)
-    elif isinstance(node, LetStatement):
-        val = evaluate(node.value, env)
-        if is_error(val):
-            return val
+    except EvaluationError as e:
+        locate(e.error, node.position)
+        raise
+
+
+def eval_return_statement(node, env):
+    raise Return(evaluate(node.value, env))
+
+
+def eval_let_statement(node, env):
+    val = evaluate(node.value, env)
+    slot = node.name.slot
+    if slot is not None:
+        env.values[slot] = val
+    else:
         env.set(node.name.value, val)
-    elif isinstance(node, Identifier):
-        return eval_identifier(node, env)
-    elif isinstance(node, FunctionLiteral):
-        params = node.parameters
-        body = node.body
-        return Function(params, body, env)
-    elif isinstance(node, CallExpression):
-        func = evaluate(node.function, env)
-        if is_error(func):
-            return func
-        args = eval_expressions(node.arguments, env)
-        if len(args) == 1 and is_error(args[0]):
-            return args[0]
+
+
+def eval_function_literal(node, env):
+    scope = node.scope
+    if scope is None:
+        scope = resolve_function(node, env)
+    return Function(node.parameters, node.body, env, scope, node.memo)
+
+
+def eval_call_expression(node, env):
+    func = evaluate(node.function, env)
+    args = eval_expressions(node.arguments, env)
+    try:
         return apply_function(func, args)
-    elif isinstance(node, StringLiteral):
-        return String(node.value)
-    elif isinstance(node, ArrayLiteral):
-        elements = eval_expressions(node.elements, env)
-        if len(elements) == 1 and is_error(elements[0]):
-            return elements[0]
-        return Array(elements)
-    elif isinstance(node, IndexExpression):
-        left = evaluate(node.left, env)
-        if is_error(left):
-            return left
-        index = evaluate(node.index, env)
-        if is_error(index):
-            return index
+    except EvaluationError as e:
+        locate(e.error, node.position)
+        raise
+
+
+def eval_string_literal(node, env):
+    value = node.constant
+    if value is None:
+        value = node.constant = intern_string(node.value)
+    return value
+
+
+def eval_array_literal(node, env):
+    return Array(eval_expressions(node.elements, env))
+
+
+def eval_index_expression_node(node, env):
+    left = evaluate(node.left, env)
+    index = evaluate(node.index, env)
+    try:
         return eval_index_expression(left, index)
+    except EvaluationError as e:
+        locate(e.error, node.position)
+        raise
+
+
+def eval_unknown_node(node, env):
     return None
+
+
+# node type -> function(node, env) that evaluates it
+handlers = {
+    Program: eval_program,
+    IntegerLiteral: eval_integer_literal,
+    ExpressionStatement: eval_expression_statement,
+    Boolean: eval_boolean,
+    PrefixExpression: eval_prefix_expression_node,
+    InfixExpression: eval_infix_expression_node,
+    BlockStatement: eval_block_statement,
+    IfExpression: eval_if_expression,
+    ReturnStatement: eval_return_statement,
+    LetStatement: eval_let_statement,
+    Identifier: eval_identifier,
+    FunctionLiteral: eval_function_literal,
+    CallExpression: eval_call_expression,
+    StringLiteral: eval_string_literal,
+    ArrayLiteral: eval_array_literal,
+    IndexExpression: eval_index_expression_node,
+}
+
+
+# types whose entry in handlers was looked up through their bases
+inherited_handlers = set()
+
+
+def register(node_type):
+    """Decorator registering a function(node, env) as the evaluation of
+    `node_type`, replacing any earlier handler for it."""
+    def decorator(function):
+        handlers[node_type] = function
+        inherited_handlers.discard(node_type)
+        for cls in [c for c in inherited_handlers if issubclass(c, node_type)]:
+            inherited_handlers.discard(cls)
+            del handlers[cls]
+        return function
+    return decorator
+
+
+def find_handler(node_type):
+    # subclasses of a registered type use its handler; the result is stored
+    # so that the next node of this type takes the fast path in evaluate
+    for cls in node_type.__mro__:
+        handler = handlers.get(cls)
+        if handler is not None:
+            break
+    else:
+        handler = eval_unknown_node
+    handlers[node_type] = handler
+    inherited_handlers.add(node_type)
+    return handler
+
+
+def evaluate(node, env):
+    """Evaluate `node` in `env`.
+
+    Errors raise EvaluationError, and a return statement raises Return,
+    unless `node` is a Program, whose evaluation returns the value of a
+    return statement or the Error object.
+    """
+    handler = handlers.get(type(node))
+    if handler is None:
+        handler = find_handler(type(node))
+    return handler(node, env)
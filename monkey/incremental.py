@@ -0,0 +1,159 @@
+from bisect import bisect_left
+
+from .ast import Program
+from .lexer import TableLexer
+from .parser import Parser
+from .token import TokenType
+
+
+class UnitParser(Parser):
+    """Parser that starts at a character offset and yields the top-level
+    statements of `Parser.parse_program` one at a time, with their spans.
+    """
+
+    def __init__(self, source, start=0):
+        lexer = TableLexer(source)
+        lexer.position = start
+        self.cur_start = self.cur_end = start
+        self.peek_start = self.peek_end = start
+        super().__init__(lexer)
+
+    def next_token(self):
+        super().next_token()
+        self.cur_start, self.cur_end = self.peek_start, self.peek_end
+        self.peek_start, self.peek_end = self.lexer.token_start, self.lexer.position
+
+    def parse_units(self):
+        while self.cur_token._type != TokenType.EOF:
+            start = self.cur_start
+            errors_count = len(self.errors)
+            statement = self.parse_statement()
+            yield start, self.cur_end, statement, self.errors[errors_count:]
+
+            self.next_token()
+
+
+class Offsets:
+    """A sorted list of ints whose items from index `shifted` on are
+    stored less `shift`, so that an edit moves all the items after it by
+    changing `shift` alone."""
+    __slots__ = ('items', 'shifted', 'shift')
+
+    def __init__(self):
+        self.items = []
+        self.shifted = 0
+        self.shift = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i] + (self.shift if i >= self.shifted else 0)
+
+    def bisect(self, x, lo=0):
+        """bisect_left on the values of the items."""
+        items = self.items
+        k = self.shifted
+        if k < len(items) and (k == 0 or x > items[k - 1]):
+            return bisect_left(items, x - self.shift, max(lo, k))
+        return bisect_left(items, x, lo, max(min(k, len(items)), lo))
+
+    def replace(self, first, resume, values, delta):
+        """Replace the items from `first` to `resume` by `values`, and move
+        the items after them by `delta`."""
+        items = self.items
+        k = self.shifted
+        shift = self.shift
+        if shift != 0:
+            # only the items between this replacement and the one before
+            # are stored again
+            for i in range(k, first):
+                items[i] += shift
+            for i in range(resume, k):
+                items[i] -= shift
+        items[first:resume] = values
+        self.shifted = first + len(values)
+        self.shift = shift + delta
+
+
+class IncrementalParser:
+    """Keeps a parsed buffer up to date under text edits.
+
+    The buffer is split into the units of the top-level loop in
+    `Parser.parse_program`: a statement (or a failed attempt at one), its
+    span in the source and the errors it reported. After an edit only the
+    units from the one before the damaged region are parsed again, and
+    parsing stops as soon as a unit starts where an old unit past the edit
+    started; from there on the source is unchanged, so the old units and
+    their AST nodes are reused. Reused nodes keep the `position` they were
+    parsed with; `starts` and `ends` hold the current span of every unit.
+
+    An edit replaces the units it parsed again, in `program` as well, in
+    place; the units after it keep their spans, moved by the Offsets.
+    """
+
+    def __init__(self, source):
+        self.source = ''
+        self.starts = Offsets()
+        self.ends = Offsets()
+        self.statements = []
+        self.unit_errors = []
+        # indices of the units without a statement, which are not in program
+        self.failed = Offsets()
+        self.program = Program()
+        self.program.statements = []
+        self.edit(0, 0, source)
+
+    @property
+    def errors(self):
+        errors = []
+        for e in self.unit_errors:
+            errors.extend(e)
+        return errors
+
+    def edit(self, offset, removed, inserted):
+        source = self.source[:offset] + inserted + self.source[offset + removed:]
+        delta = len(inserted) - removed
+        starts = self.starts
+        ends = self.ends
+
+        # a unit's parse depends on the first token after it, so the unit
+        # before the first damaged one is parsed again as well
+        first = max(ends.bisect(offset) - 1, 0)
+        start = min(starts[first], offset) if len(starts) else 0
+        edit_end = offset + len(inserted)
+
+        new_starts = []
+        new_ends = []
+        new_statements = []
+        new_errors = []
+        resume = len(starts)
+        for unit in UnitParser(source, start).parse_units():
+            unit_start = unit[0]
+            if unit_start >= edit_end:
+                k = starts.bisect(unit_start - delta, first)
+                if k < len(starts) and starts[k] == unit_start - delta:
+                    resume = k
+                    break
+            new_starts.append(unit_start)
+            new_ends.append(unit[1])
+            new_statements.append(unit[2])
+            new_errors.append(unit[3])
+
+        starts.replace(first, resume, new_starts, delta)
+        ends.replace(first, resume, new_ends, delta)
+        self.statements[first:resume] = new_statements
+        self.unit_errors[first:resume] = new_errors
+        self.source = source
+
+        # statements are in the program at their unit's index less the
+        # failed units before it
+        failed = self.failed
+        failed_first = failed.bisect(first)
+        failed_resume = failed.bisect(resume)
+        program_first = first - failed_first
+        program_resume = resume - failed_resume
+        self.program.statements[program_first:program_resume] = [s for s in new_statements if s is not None]
+        new_failed = [first + j for j, s in enumerate(new_statements) if s is None]
+        failed.replace(failed_first, failed_resume, new_failed, len(new_starts) - (resume - first))
+        return self.program
@@ -0,0 +1,311 @@
+"""Static type inference, specializing the operators of a program.
+
+`specialize(program)` sets the `specialized` field of each InfixExpression
+and PrefixExpression whose operand types are known.
+"""
+from .ast import (
+    ExpressionStatement,
+    IntegerLiteral,
+    StringLiteral,
+    Boolean,
+    PrefixExpression,
+    InfixExpression,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+    FunctionLiteral,
+    CallExpression,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .builtins import builtins
+from .evaluator import specialized_infix, specialized_prefix
+from .object import Integer, String, Boolean as BooleanObject, Array, Function, Builtin
+from .resolver import declarations
+
+# types are the classes of monkey.object, or this for an expression whose
+# values cannot be told statically
+UNKNOWN = object()
+# a variable bound to more than one function literal
+MANY = object()
+
+# builtin name -> type of its result
+BUILTIN_RESULTS = {'len': Integer}
+
+
+def join(a, b):
+    # a variable has the join of the types of everything bound to it, and
+    # types are joined until nothing changes.
+    # None is the type of an expression with no value yet
+    if a is None:
+        return b
+    if b is None or a is b:
+        return a
+    return UNKNOWN
+
+
+# Variables are scoped as in monkey.resolver. A parameter of a function
+# that is bound by `let` and only ever called by name is bound to the
+# arguments of those calls, and such a call has the type of the results of
+# the function; any other function escapes and its parameters are UNKNOWN.
+class Variable:
+    __slots__ = ('type', 'function')
+
+    def __init__(self):
+        self.type = None
+        # the function literal bound to the variable, MANY if several are
+        self.function = None
+
+
+class FunctionInfo:
+    __slots__ = ('scope', 'parameters', 'result')
+
+    def __init__(self, literal):
+        names = [p.value for p in literal.parameters]
+        self.parameters = names
+        declarations(literal.body, names)
+        self.scope = {}
+        for name in names:
+            if name not in self.scope:
+                self.scope[name] = Variable()
+        self.result = None
+
+
+class Inference:
+    def __init__(self):
+        # id of a function literal -> its FunctionInfo
+        self.functions = {}
+        # the variables of the program
+        self.top = None
+        # functions whose parameters are bound to unknown values
+        self.escaped = set()
+        self.changed = False
+        # the FunctionInfo of the function being visited, for returns
+        self.current = None
+        self.specialized = 0
+        self.operations = 0
+
+    def info(self, literal):
+        info = self.functions.get(id(literal))
+        if info is None:
+            info = self.functions[id(literal)] = FunctionInfo(literal)
+        return info
+
+    def bind(self, variable, type_):
+        new = join(variable.type, type_)
+        if new is not variable.type:
+            variable.type = new
+            self.changed = True
+
+    def escape(self, literal):
+        # called from where the inference cannot see the arguments
+        info = self.info(literal)
+        if id(literal) not in self.escaped:
+            self.escaped.add(id(literal))
+            self.changed = True
+        for name in info.parameters:
+            self.bind(info.scope[name], UNKNOWN)
+
+    def lookup(self, name, scopes):
+        for scope in scopes:
+            variable = scope.get(name)
+            if variable is not None:
+                return variable
+        return None
+
+    def program(self, program):
+        if self.top is None:
+            names = []
+            declarations(program, names)
+            self.top = {}
+            for name in names:
+                self.top[name] = Variable()
+        self.current = None
+        self.statements(program.statements, (self.top,))
+
+    def statements(self, statements, scopes):
+        # the type of the value of a block
+        result = UNKNOWN
+        for s in statements:
+            result = self.statement(s, scopes)
+        return result
+
+    def statement(self, node, scopes):
+        node_type = type(node)
+        if node_type is ExpressionStatement:
+            return self.expression(node.expression, scopes)
+        elif node_type is LetStatement:
+            variable = self.lookup(node.name.value, scopes)
+            value = node.value
+            if type(value) is FunctionLiteral:
+                if variable.function is None:
+                    variable.function = value
+                elif variable.function is not value:
+                    self.rebind(variable)
+                if variable.function is MANY:
+                    self.escape(value)
+                self.bind(variable, Function)
+                self.function(value, scopes)
+            else:
+                self.rebind(variable)
+                self.bind(variable, self.expression(value, scopes))
+            return UNKNOWN
+        elif node_type is ReturnStatement:
+            result = self.expression(node.value, scopes)
+            if self.current is not None:
+                self.result(self.current, result)
+            return result
+        return UNKNOWN
+
+    def rebind(self, variable):
+        # the variable is bound to something else than its function literal
+        if variable.function is not MANY:
+            if variable.function is not None:
+                self.escape(variable.function)
+            variable.function = MANY
+
+    def result(self, info, type_):
+        new = join(info.result, type_)
+        if new is not info.result:
+            info.result = new
+            self.changed = True
+
+    def function(self, literal, scopes):
+        info = self.info(literal)
+        current = self.current
+        self.current = info
+        self.result(info, self.block(literal.body, (info.scope,) + scopes))
+        self.current = current
+        return Function
+
+    def block(self, block, scopes):
+        if block is None:
+            return UNKNOWN
+        return self.statements(block.statements, scopes)
+
+    def call_target(self, node, scopes):
+        # the literal of a function called by name, if the name is only
+        # ever bound to it
+        if type(node) is not Identifier:
+            return None
+        variable = self.lookup(node.value, scopes)
+        if variable is None or variable.function is None or variable.function is MANY:
+            return None
+        return variable.function
+
+    def expression(self, node, scopes):
+        node_type = type(node)
+        if node_type is IntegerLiteral:
+            return Integer
+        elif node_type is StringLiteral:
+            return String
+        elif node_type is Boolean:
+            return BooleanObject
+        elif node_type is Identifier:
+            variable = self.lookup(node.value, scopes)
+            if variable is None:
+                return Builtin if node.value in builtins else UNKNOWN
+            if variable.function is not None and variable.function is not MANY:
+                # the function is used as a value
+                self.escape(variable.function)
+            return variable.type
+        elif node_type is PrefixExpression:
+            return self.prefix(node, self.expression(node.right, scopes))
+        elif node_type is InfixExpression:
+            left = self.expression(node.left, scopes)
+            right = self.expression(node.right, scopes)
+            return self.infix(node, left, right)
+        elif node_type is IfExpression:
+            self.expression(node.condition, scopes)
+            consequence = self.block(node.consequence, scopes)
+            alternative = self.block(node.alternative, scopes)
+            return join(consequence, alternative)
+        elif node_type is FunctionLiteral:
+            # not bound by let, so called from anywhere
+            self.escape(node)
+            return self.function(node, scopes)
+        elif node_type is CallExpression:
+            return self.call(node, scopes)
+        elif node_type is ArrayLiteral:
+            for e in node.elements:
+                self.expression(e, scopes)
+            return Array
+        elif node_type is IndexExpression:
+            self.expression(node.left, scopes)
+            self.expression(node.index, scopes)
+            return UNKNOWN
+        return UNKNOWN
+
+    def call(self, node, scopes):
+        function = node.function
+        literal = self.call_target(function, scopes)
+        if literal is None:
+            callee = self.expression(function, scopes)
+            for a in node.arguments:
+                self.expression(a, scopes)
+            if callee is Builtin and type(function) is Identifier:
+                return BUILTIN_RESULTS.get(function.value, UNKNOWN)
+            return UNKNOWN
+
+        info = self.info(literal)
+        for i, a in enumerate(node.arguments):
+            type_ = self.expression(a, scopes)
+            if i < len(info.parameters):
+                self.bind(info.scope[info.parameters[i]], type_)
+        return info.result
+
+    def infix(self, node, left, right):
+        operator = node.operator
+        self.operations += 1
+        # the evaluator calls the handler instead of the generic dispatch.
+        # Handlers check the types of their operands and fall back to the
+        # generic path, so an inference that turns out wrong at run time
+        # costs a check, never a wrong result
+        handler = node.specialized = specialized_infix.get((left, operator, right))
+        if handler is not None:
+            self.specialized += 1
+        if left is None or right is None:
+            return None
+        if left is Integer and right is Integer:
+            if operator in ('+', '-', '*'):
+                return Integer
+            if operator in ('<', '>', '==', '!='):
+                return BooleanObject
+            return UNKNOWN
+        if left is String and right is String and operator == '+':
+            return String
+        if operator in ('==', '!='):
+            return BooleanObject
+        return UNKNOWN
+
+    def prefix(self, node, right):
+        operator = node.operator
+        self.operations += 1
+        handler = node.specialized = specialized_prefix.get((operator, right))
+        if handler is not None:
+            self.specialized += 1
+        if right is None:
+            return None
+        if operator == '-' and right is Integer:
+            return Integer
+        if operator == '!':
+            return BooleanObject
+        return UNKNOWN
+
+
+def specialize(program):
+    """Specialize the operators of `program` for their inferred operand
+    types. Returns the number of operators specialized and the number of
+    operators."""
+    # the pass walks the program a few times, so it pays off on programs
+    # that evaluate their operators many times
+    inference = Inference()
+    inference.changed = True
+    # every pass marks the operators; the last one, which changes nothing,
+    # marks them for the final types
+    while inference.changed:
+        inference.changed = False
+        inference.specialized = inference.operations = 0
+        inference.program(program)
+    return inference.specialized, inference.operations
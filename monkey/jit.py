@@ -0,0 +1,462 @@
+"""Tier-up compilation of hot functions to Python.
+
+monkey.evaluator calls `tier_up` at the JIT_THRESHOLD-th call of a
+Function, which stores the compiled body in `Function.jitted`.
+"""
+from collections import OrderedDict
+
+from .ast import (
+    IntegerLiteral,
+    ExpressionStatement,
+    Boolean,
+    PrefixExpression,
+    InfixExpression,
+    BlockStatement,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+    CallExpression,
+    StringLiteral,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .builtins import builtins
+from .environment import shadowed_builtins
+from .object import Integer, Array, Error, TRUE, FALSE, new_integer
+from .resolver import BUILTIN, BUILTIN_VALUES, children
+
+
+# returned by a translation whose assumptions do not hold for its arguments:
+# the evaluator then runs the call itself and calls `deoptimize`
+DEOPTIMIZED = object()
+
+stats = {
+    'tier_ups': 0,
+    'deoptimizations': 0,
+    'translations': 0,
+    'unsupported': 0,
+}
+
+# (function body, specialization) -> Python function, or None if the body
+# cannot be translated, least recently used first; keyed by body, so the
+# closures created from one function literal share them
+translations = OrderedDict()
+TRANSLATIONS = 256
+
+# node type -> name of its handler in monkey.evaluator
+HANDLERS = {
+    IntegerLiteral: 'eval_integer_literal',
+    ExpressionStatement: 'eval_expression_statement',
+    Boolean: 'eval_boolean',
+    PrefixExpression: 'eval_prefix_expression_node',
+    InfixExpression: 'eval_infix_expression_node',
+    BlockStatement: 'eval_block_statement',
+    IfExpression: 'eval_if_expression',
+    ReturnStatement: 'eval_return_statement',
+    LetStatement: 'eval_let_statement',
+    Identifier: 'eval_identifier',
+    CallExpression: 'eval_call_expression',
+    StringLiteral: 'eval_string_literal',
+    ArrayLiteral: 'eval_array_literal',
+    IndexExpression: 'eval_index_expression_node',
+}
+
+ARITHMETIC = ('+', '-', '*')
+COMPARISONS = ('<', '>', '==', '!=')
+
+# how the value of a statement is used
+RETURN = 'return'
+DISCARD = None
+
+_runtime = None
+
+
+def runtime():
+    """The names the translations use, besides their constants."""
+    global _runtime
+    if _runtime is not None:
+        return _runtime
+    # imported here: monkey.evaluator imports this module
+    from .evaluator import (
+        EvaluationError,
+        apply_function,
+        eval_infix_expression,
+        eval_prefix_expression,
+        eval_index_expression,
+        is_truthy,
+        locate,
+    )
+
+    def lookup(outer, name, position):
+        # a variable that has not been assigned yet, looked up by name
+        value = outer.get(name)
+        if value is not None:
+            return value
+        builtin = builtins.get(name)
+        if builtin is not None:
+            return builtin
+        raise EvaluationError(Error('identifier not found: {}'.format(name), position))
+
+    def get_slot(scope, slot, outer, name, position):
+        value = scope.values[slot]
+        if value is not None:
+            return value
+        return lookup(outer, name, position)
+
+    def get_name(scope, outer, name, position):
+        value = scope.get(name)
+        if value is not None:
+            return value
+        return lookup(outer, name, position)
+
+    def call(fn, args, position):
+        try:
+            return apply_function(fn, args)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+
+    def infix(operator, left, right, position):
+        try:
+            return eval_infix_expression(operator, left, right)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+
+    def prefix(operator, right, position):
+        try:
+            return eval_prefix_expression(operator, right)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+
+    def index(left, index, position):
+        try:
+            return eval_index_expression(left, index)
+        except EvaluationError as e:
+            locate(e.error, position)
+            raise
+
+    _runtime = {
+        'DEOPTIMIZED': DEOPTIMIZED,
+        'Integer': Integer,
+        'Array': Array,
+        'TRUE': TRUE,
+        'FALSE': FALSE,
+        'new_integer': new_integer,
+        'truthy': is_truthy,
+        'lookup': lookup,
+        'shadowed_builtins': shadowed_builtins,
+        'get_slot': get_slot,
+        'get_name': get_name,
+        'call': call,
+        'infix': infix,
+        'prefix': prefix,
+        'index': index,
+    }
+    return _runtime
+
+
+# Bodies are translated statement for statement. Bodies with function
+# literals, or node types whose handlers were replaced through
+# monkey.evaluator.register, stay interpreted, and so do bodies with an if
+# expression that has several statements, `let` or `return` in a branch,
+# unless that if is a statement, the value of a `let` or a returned value.
+class Unsupported(Exception):
+    """Raised for a function body that is not translated."""
+
+
+class Translator:
+    def __init__(self, fn, specialize):
+        from . import evaluator
+
+        self.params = [p.value for p in fn.parameters]
+        if fn.scope is None or len(set(self.params)) != len(self.params):
+            raise Unsupported()
+        self.scope = fn.scope
+        self.handlers = evaluator.handlers
+        self.evaluator = evaluator
+        # slots set by `let`
+        self.assigned = set()
+        self.check(fn.body)
+        # parameters read as Python ints, checked on entry, so arithmetic
+        # and comparisons on them create no objects
+        self.ints = set()
+        for i, integer in enumerate(specialize):
+            if integer and i not in self.assigned:
+                self.ints.add(i)
+        self.constants = {}
+        # constant object id -> its name in the translation
+        self.constant_names = {}
+        self.int_codes = {}
+        self.depth = 0
+        self.lines = []
+
+    def check(self, node):
+        node_type = type(node)
+        name = HANDLERS.get(node_type)
+        if name is None or self.handlers.get(node_type) is not getattr(self.evaluator, name):
+            raise Unsupported()
+        if node_type is LetStatement:
+            if node.name.slot is None:
+                raise Unsupported()
+            self.assigned.add(node.name.slot)
+        for child in children(node):
+            self.check(child)
+
+    def emit(self, line, indent):
+        self.lines.append('    ' * indent + line)
+
+    def constant(self, value):
+        name = self.constant_names.get(id(value))
+        if name is None:
+            name = self.constant_names[id(value)] = 'c{}'.format(len(self.constants))
+            self.constants[name] = value
+        return name
+
+    def int(self, node):
+        """Code for the value of `node` as a Python int, or None if it is
+        not known to be an integer."""
+        key = id(node)
+        if key in self.int_codes:
+            return self.int_codes[key]
+        code = None
+        node_type = type(node)
+        if node_type is IntegerLiteral:
+            code = repr(node.value)
+        elif node_type is Identifier:
+            if node.depth == 0 and node.slot in self.ints:
+                code = 'i{}'.format(node.slot)
+        elif node_type is InfixExpression:
+            if node.operator in ARITHMETIC:
+                left = self.int(node.left)
+                right = self.int(node.right)
+                if left is not None and right is not None:
+                    code = '({} {} {})'.format(left, node.operator, right)
+        elif node_type is PrefixExpression:
+            if node.operator == '-':
+                right = self.int(node.right)
+                if right is not None:
+                    code = '(-{})'.format(right)
+        self.int_codes[key] = code
+        return code
+
+    def test(self, node):
+        """Code for whether the value of `node` is truthy, as a Python bool."""
+        node_type = type(node)
+        if node_type is Boolean:
+            return 'True' if node.value else 'False'
+        if node_type is InfixExpression and node.operator in COMPARISONS:
+            left = self.int(node.left)
+            right = self.int(node.right)
+            if left is not None and right is not None:
+                return '({} {} {})'.format(left, node.operator, right)
+        if node_type is PrefixExpression and node.operator == '!':
+            return '(not {})'.format(self.test(node.right))
+        return 'truthy({})'.format(self.obj(node))
+
+    def obj(self, node):
+        """Code for the value of `node`, an object as the evaluator makes."""
+        node_type = type(node)
+        evaluator = self.evaluator
+        if node_type is IntegerLiteral:
+            return self.constant(evaluator.eval_integer_literal(node, None))
+        elif node_type is StringLiteral:
+            return self.constant(evaluator.eval_string_literal(node, None))
+        elif node_type is Boolean:
+            return 'TRUE' if node.value else 'FALSE'
+        elif node_type is Identifier:
+            return self.identifier(node)
+        elif node_type is InfixExpression:
+            code = self.int(node)
+            if code is not None:
+                return 'new_integer({})'.format(code)
+            if node.operator in COMPARISONS and self.int(node.left) is not None and self.int(node.right) is not None:
+                return '(TRUE if {} else FALSE)'.format(self.test(node))
+            return 'infix({!r}, {}, {}, {})'.format(
+                node.operator, self.obj(node.left), self.obj(node.right), node.position)
+        elif node_type is PrefixExpression:
+            code = self.int(node)
+            if code is not None:
+                return 'new_integer({})'.format(code)
+            if node.operator == '!':
+                return '(FALSE if {} else TRUE)'.format(self.test(node.right))
+            return 'prefix({!r}, {}, {})'.format(node.operator, self.obj(node.right), node.position)
+        elif node_type is CallExpression:
+            function = self.obj(node.function)
+            args = ', '.join(self.obj(a) for a in node.arguments)
+            return 'call({}, [{}], {})'.format(function, args, node.position)
+        elif node_type is ArrayLiteral:
+            return 'Array([{}])'.format(', '.join(self.obj(e) for e in node.elements))
+        elif node_type is IndexExpression:
+            return 'index({}, {}, {})'.format(self.obj(node.left), self.obj(node.index), node.position)
+        elif node_type is IfExpression:
+            return '({} if {} else {})'.format(
+                self.branch(node.consequence), self.test(node.condition), self.branch(node.alternative))
+        raise Unsupported()
+
+    def branch(self, block):
+        # the value of a branch of an if expression inside an expression
+        if block is None or len(block.statements) == 0:
+            return 'None'
+        if len(block.statements) == 1 and type(block.statements[0]) is ExpressionStatement:
+            return self.obj(block.statements[0].expression)
+        raise Unsupported()
+
+    def identifier(self, node):
+        depth = node.depth
+        slot = node.slot
+        name = node.value
+        if depth == 0 and slot is not None:
+            if slot < len(self.params) and slot not in self.assigned:
+                # checked not to be None on entry
+                return 'v{}'.format(slot)
+            return '(v{0} if v{0} is not None else lookup(outer, {1!r}, {2}))'.format(slot, name, node.position)
+        if depth == BUILTIN:
+            return '({} if {!r} not in shadowed_builtins else lookup(outer, {!r}, {}))'.format(
+                self.constant(BUILTIN_VALUES[slot]), name, name, node.position)
+        if depth is None or depth <= 0:
+            raise Unsupported()
+        self.depth = max(self.depth, depth)
+        if slot is not None:
+            return 'get_slot(e{}, {}, outer, {!r}, {})'.format(depth, slot, name, node.position)
+        return 'get_name(e{}, outer, {!r}, {})'.format(depth, name, node.position)
+
+    def result(self, code, mode, indent):
+        if mode is RETURN:
+            self.emit('return {}'.format(code), indent)
+        elif mode is DISCARD:
+            if code != 'None':
+                self.emit(code, indent)
+        else:
+            self.emit('{} = {}'.format(mode, code), indent)
+
+    def block(self, block, mode, indent):
+        start = len(self.lines)
+        statements = block.statements if block is not None else []
+        if len(statements) == 0:
+            self.result('None', mode, indent)
+        else:
+            for s in statements[:-1]:
+                self.statement(s, DISCARD, indent)
+            self.statement(statements[-1], mode, indent)
+        if len(self.lines) == start:
+            self.emit('pass', indent)
+
+    def statement(self, node, mode, indent):
+        node_type = type(node)
+        if node_type is ExpressionStatement:
+            if type(node.expression) is IfExpression:
+                self.if_statement(node.expression, mode, indent)
+            else:
+                self.result(self.obj(node.expression), mode, indent)
+        elif node_type is LetStatement:
+            target = 'v{}'.format(node.name.slot)
+            if type(node.value) is IfExpression:
+                self.if_statement(node.value, target, indent)
+            else:
+                self.emit('{} = {}'.format(target, self.obj(node.value)), indent)
+            self.result('None', mode, indent)
+        elif node_type is ReturnStatement:
+            if type(node.value) is IfExpression:
+                self.if_statement(node.value, RETURN, indent)
+            else:
+                self.emit('return {}'.format(self.obj(node.value)), indent)
+        else:
+            raise Unsupported()
+
+    def if_statement(self, node, mode, indent):
+        self.emit('if {}:'.format(self.test(node.condition)), indent)
+        self.block(node.consequence, mode, indent + 1)
+        self.emit('else:', indent)
+        self.block(node.alternative, mode, indent + 1)
+
+    def source(self, body):
+        self.block(body, RETURN, 1)
+        body_lines = self.lines
+
+        self.lines = []
+        self.emit('def jitted(outer, args):', 0)
+        n = len(self.params)
+        self.emit('if len(args) < {}:'.format(n), 1)
+        self.emit('return DEOPTIMIZED', 2)
+        guards = []
+        for i in range(n):
+            self.emit('v{0} = args[{0}]'.format(i), 1)
+            if i in self.ints:
+                guards.append('type(v{}) is not Integer'.format(i))
+            elif i not in self.assigned:
+                guards.append('v{} is None'.format(i))
+        if guards:
+            self.emit('if {}:'.format(' or '.join(guards)), 1)
+            self.emit('return DEOPTIMIZED', 2)
+        for i in sorted(self.ints):
+            self.emit('i{0} = v{0}.value'.format(i), 1)
+        for slot in range(n, len(self.scope)):
+            self.emit('v{} = None'.format(slot), 1)
+        if self.depth >= 1:
+            self.emit('e1 = outer', 1)
+        for depth in range(2, self.depth + 1):
+            self.emit('e{} = e{}.outer'.format(depth, depth - 1), 1)
+        return '\n'.join(self.lines + body_lines) + '\n'
+
+
+def translate(fn, specialize):
+    """The Python function running `fn` for the specialization, a tuple
+    telling which parameters are integers, or None if `fn` cannot be
+    translated."""
+    key = (fn.body, specialize)
+    try:
+        jitted = translations[key]
+    except KeyError:
+        pass
+    else:
+        translations.move_to_end(key)
+        return jitted
+    try:
+        translator = Translator(fn, specialize)
+        source = translator.source(fn.body)
+        code = compile(source, '<monkey jit>', 'exec')
+    except (Unsupported, SyntaxError, RecursionError, MemoryError):
+        stats['unsupported'] += 1
+        cache(key, None)
+        return None
+    namespace = dict(runtime())
+    namespace.update(translator.constants)
+    exec(code, namespace)
+    jitted = namespace['jitted']
+    jitted.source = source
+    stats['translations'] += 1
+    cache(key, jitted)
+    return jitted
+
+
+def cache(key, jitted):
+    translations[key] = jitted
+    if len(translations) > TRANSLATIONS:
+        translations.popitem(last=False)
+
+
+def tier_up(fn, args):
+    """Compile `fn`, specialized for `args`, if it can be translated."""
+    n = len(fn.parameters)
+    specialize = []
+    for i in range(n):
+        specialize.append(i < len(args) and type(args[i]) is Integer)
+    jitted = translate(fn, tuple(specialize))
+    if jitted is not None:
+        fn.jitted = jitted
+        stats['tier_ups'] += 1
+
+
+def deoptimize(fn):
+    """Switch `fn`, whose translation returned DEOPTIMIZED, to the generic
+    translation."""
+    stats['deoptimizations'] += 1
+    fn.jitted = translate(fn, (False,) * len(fn.parameters))
+
+
+def reset_stats():
+    for key in stats:
+        stats[key] = 0
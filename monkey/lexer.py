@@ -1,5 +1,57 @@
+import codecs
+import re
+
 from .token import Token, TokenType
 
+KEYWORDS = {
+    'fn': TokenType.FUNCTION,
+    'let': TokenType.LET,
+    'true': TokenType.TRUE,
+    'false': TokenType.FALSE,
+    'if': TokenType.IF,
+    'else': TokenType.ELSE,
+    'return': TokenType.RETURN
+}
+
+OPERATORS = {
+    '==': TokenType.EQ,
+    '!=': TokenType.NOT_EQ,
+    '=': TokenType.ASSIGN,
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '!': TokenType.BANG,
+    '/': TokenType.SLASH,
+    '*': TokenType.ASTERISK,
+    '<': TokenType.LT,
+    '>': TokenType.GT,
+    ',': TokenType.COMMA,
+    ';': TokenType.SEMICOLON,
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    '{': TokenType.LBRACE,
+    '}': TokenType.RBRACE,
+    '[': TokenType.LBRACKET,
+    ']': TokenType.RBRACKET,
+}
+
+# group numbers of TOKEN_PATTERN, used as the dispatch key for a match
+IDENT_GROUP = 1
+INT_GROUP = 2
+STRING_GROUP = 3
+OPERATOR_GROUP = 4
+
+# one match skips leading white space and scans a whole token; the groups are
+# tried in order, so two-char operators win over their one-char prefixes
+TOKEN_PATTERN = re.compile(r"""
+    [ \t\n\r]*
+    (?:
+        ([A-Za-z_]+)
+      | ([0-9]+)
+      | "([^"]*)"?
+      | (==|!=|[-=+!/*<>,;(){}\[\]])
+    )?
+""", re.VERBOSE)
+
 
 class Lexer:
     def __init__(self, input_str):
@@ -7,19 +59,12 @@ class Lexer:
         self.position = 0
         self.read_position = 0
         self.input_str = input_str
-        self._keyword_map = {
-            'fn': TokenType.FUNCTION,
-            'let': TokenType.LET,
-            'true': TokenType.TRUE,
-            'false': TokenType.FALSE,
-            'if': TokenType.IF,
-            'else': TokenType.ELSE,
-            'return': TokenType.RETURN
-        }
+        self._keyword_map = KEYWORDS
         self.read_char()
 
     def next_token(self):
         self.skip_white_space()
+        position = self.position
 
         if self.ch == '=':
             if self.peek_char() == '=':
@@ -62,11 +107,11 @@ class Lexer:
         elif self.is_letter(self.ch):
             token_literal = self.read_identifier()
             token_type = self.look_up_ident_type(token_literal)
-            return Token(token_type, token_literal)
+            return Token(token_type, token_literal, position)
         elif self.ch.isdigit():
             token_literal = self.read_number()
             token_type = TokenType.INT
-            return Token(token_type, token_literal)
+            return Token(token_type, token_literal, position)
         elif self.ch == '':
             tk = Token(TokenType.EOF, self.ch)
         elif self.ch == '"':
@@ -78,6 +123,7 @@ class Lexer:
         else:
             tk = Token(TokenType.ILLEGAL, self.ch)
 
+        tk.position = position
         self.read_char()
         return tk
 
@@ -85,7 +131,7 @@ class Lexer:
         position = self.position + 1
         while True:
             self.read_char()
-            if self.ch == '"':
+            if self.ch == '"' or self.ch == '':
                 break
         return self.input_str[position: self.position]
 
@@ -135,3 +181,106 @@ class Lexer:
             return ''
 
         return self.input_str[self.read_position]
+
+
+class TableLexer:
+    """Drop-in replacement for `Lexer` that scans a token per regex match.
+
+    Tokens are looked up in the precomputed `KEYWORDS` and `OPERATORS`
+    tables instead of an if/elif chain, and identifiers, numbers and strings
+    are sliced out of the input in one step rather than char by char.
+    """
+
+    def __init__(self, input_str):
+        self.input_str = input_str
+        self.position = 0
+        self.token_start = 0
+
+    def next_token(self):
+        input_str = self.input_str
+        m = TOKEN_PATTERN.match(input_str, self.position)
+        group = m.lastindex
+        self.token_start = start = m.start(group) if group else m.end()
+
+        if group == IDENT_GROUP:
+            literal = m.group(group)
+            self.position = m.end()
+            return Token(KEYWORDS.get(literal, TokenType.IDENT), literal, start)
+        elif group == OPERATOR_GROUP:
+            literal = m.group(group)
+            self.position = m.end()
+            return Token(OPERATORS[literal], literal, start)
+        elif group == INT_GROUP:
+            end = m.end()
+            # Lexer reads numbers with str.isdigit, which accepts non-ascii digits
+            while end < len(input_str) and input_str[end].isdigit():
+                end += 1
+            self.position = end
+            return Token(TokenType.INT, input_str[start:end], start)
+        elif group == STRING_GROUP:
+            self.token_start = start - 1
+            self.position = m.end()
+            return Token(TokenType.STRING, m.group(group), start - 1)
+
+        if start >= len(input_str):
+            self.position = start
+            return Token(TokenType.EOF, '', start)
+
+        ch = input_str[start]
+        end = start + 1
+        if ch.isdigit():
+            while end < len(input_str) and input_str[end].isdigit():
+                end += 1
+            self.position = end
+            return Token(TokenType.INT, input_str[start:end], start)
+
+        self.position = end
+        return Token(TokenType.ILLEGAL, ch, start)
+
+
+class StreamingLexer(TableLexer):
+    """`TableLexer` over a file object or `mmap`, read `chunk_size` at a time.
+
+    Only the unread tail of the current chunk is kept, so memory stays
+    bounded by the chunk size plus the longest token. A token that runs into
+    the end of the buffer is lexed again once the next chunk is appended.
+    Bytes are decoded incrementally with `encoding`.
+    """
+
+    def __init__(self, source, chunk_size=64 * 1024, encoding='utf-8'):
+        super().__init__('')
+        self.source = source
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.decoder = None
+        self.offset = 0
+        self.exhausted = False
+
+    def next_token(self):
+        while True:
+            position = self.position
+            token = TableLexer.next_token(self)
+            if self.position < len(self.input_str) or self.exhausted:
+                break
+            self.position = position
+            self.read_chunk()
+
+        self.token_start += self.offset
+        token.position = self.token_start
+        return token
+
+    def read_chunk(self):
+        data = self.source.read(self.chunk_size)
+        if not data:
+            self.exhausted = True
+
+        if isinstance(data, str):
+            text = data
+        else:
+            if self.decoder is None:
+                self.decoder = codecs.getincrementaldecoder(self.encoding)()
+            text = self.decoder.decode(data, final=self.exhausted)
+
+        self.offset += self.position
+        self.input_str = self.input_str[self.position:] + text
+        self.position = 0
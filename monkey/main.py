@@ -1,12 +1,82 @@
+import argparse
 import getpass
-from .repl import start
+import os
+import sys
+from . import bytecode_file
+from .compiler import CompileError, Compiler
+from .lexer import Lexer
+from .object import Error
+from .parser import Parser
+from .peephole import optimize
+from .repl import ENGINES, new_runner, print_parse_errors, start
+from .vm import VM
 
 
-def main():
+def parse_script(path):
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    p = Parser(Lexer(source))
+    program = p.parse_program()
+    if len(p.errors) != 0:
+        print_parse_errors(p.errors)
+        return None
+    return program
+
+
+def compile_script(path, output=None):
+    """Compile the script at `path` to a bytecode file, by default next
+    to it with the extension .mkc."""
+    program = parse_script(path)
+    if program is None:
+        return 1
+    compiler = Compiler()
+    try:
+        compiler.compile(program)
+    except CompileError as e:
+        print('compile error: {}'.format(e))
+        return 1
+    if output is None:
+        output = os.path.splitext(path)[0] + '.mkc'
+    bytecode_file.dump(optimize(compiler.bytecode()), output)
+    return 0
+
+
+def run_script(path, engine):
+    # compiled files always run on the VM
+    if bytecode_file.is_bytecode_file(path):
+        evaluated = VM(bytecode_file.load(path)).run()
+    else:
+        program = parse_script(path)
+        if program is None:
+            return 1
+        evaluated = new_runner(engine)(program)
+    if evaluated is not None:
+        print(evaluated.inspect())
+    return 1 if type(evaluated) is Error else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='monkey', description='The Monkey programming language.')
+    parser.add_argument('script', nargs='?', help='run this file instead of starting the REPL')
+    parser.add_argument('--engine', choices=ENGINES, default='evaluate',
+                        help='execution engine (default: evaluate)')
+    parser.add_argument('--compile', action='store_true',
+                        help='compile the script to a bytecode file instead of running it')
+    parser.add_argument('-o', '--output', help='where --compile writes the bytecode file')
+    args = parser.parse_args(argv)
+
+    if args.compile:
+        if args.script is None:
+            parser.error('--compile needs a script')
+        return compile_script(args.script, args.output)
+    if args.script is not None:
+        return run_script(args.script, args.engine)
+
     username = getpass.getuser()
     print("Hello {}! This is the Monkey programming language!".format(username))
-    start()
+    start(args.engine)
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
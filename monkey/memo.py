@@ -0,0 +1,348 @@
+"""Memoization of pure functions, for the evaluator.
+
+`memoize(program)` gives each pure function literal of `program` a cache of
+its results, which monkey.evaluator looks up before calling it. The program
+must be evaluated in an environment that does not bind the names it uses.
+"""
+from collections import OrderedDict
+
+from .ast import (
+    IntegerLiteral,
+    StringLiteral,
+    Boolean,
+    PrefixExpression,
+    InfixExpression,
+    LetStatement,
+    Identifier,
+    FunctionLiteral,
+    CallExpression,
+)
+from .builtins import builtins
+from .object import Integer, String, Boolean as BooleanObject, Array
+from .resolver import children, declarations
+
+# what Memo.get returns for arguments it has no result for
+MISSING = object()
+
+# builtins whose result depends only on their arguments
+PURE_BUILTINS = frozenset(['len'])
+
+# most values, counting array elements, in the arguments of a cached call;
+# calls with more are evaluated as usual and counted as skipped
+KEY_SIZE = 64
+
+# skipped calls after which a function that has had no hits stops looking
+# at its arguments
+GIVE_UP = 64
+
+# results cached for each function, and the size of the keys and results
+# cached for all of them, counting each value and each character of a
+# string as one; once that is reached, a function caches a new result only
+# in place of its own least recently used ones
+LIMIT = 256
+CAPACITY = 1 << 20
+
+# expressions whose values are integers, strings or booleans, if anything
+VALUES = (IntegerLiteral, StringLiteral, Boolean, PrefixExpression, InfixExpression)
+
+
+def values_key(values, budget):
+    # a tuple of `values` that tells them apart by value, or None if one is
+    # not an int integer, string, boolean or array of those, or there are
+    # more than `budget`; and the budget left
+    key = []
+    for v in values:
+        budget -= 1
+        if budget < 0:
+            return None, budget
+        v_type = type(v)
+        if v_type is Integer:
+            value = v.value
+            if type(value) is not int:
+                # division makes floats, equal to the ints of the same value
+                return None, budget
+            key.append(value)
+        elif v_type is String:
+            key.append(v.value)
+        elif v_type is BooleanObject:
+            # TRUE and FALSE, unlike True and False, are not equal to 1 and 0
+            key.append(v)
+        elif v_type is Array:
+            element_key, budget = values_key(v.elements, budget)
+            if element_key is None:
+                return None, budget
+            key.append(element_key)
+        else:
+            return None, budget
+    return tuple(key), budget
+
+
+def size(value):
+    # the size of a key or of a result: one for each value and one for each
+    # character of a string
+    value_type = type(value)
+    if value_type is tuple:
+        n = 1
+        for v in value:
+            n += size(v)
+        return n
+    elif value_type is str:
+        return 1 + len(value)
+    elif value_type is String:
+        return 1 + len(value.value)
+    return 1
+
+
+class Memo:
+    """The results of a pure function, least recently used first."""
+    __slots__ = ('memoizer', 'name', 'results', 'hits', 'misses', 'skipped', 'evictions')
+
+    def __init__(self, memoizer, name):
+        self.memoizer = memoizer
+        # the name the function is bound to, None if it is not
+        self.name = name
+        # key -> (result, size of the key and result)
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def key(self, args):
+        """The key of the results for `args`, or None if they are not
+        cached."""
+        if self.skipped >= GIVE_UP and self.hits == 0:
+            self.skipped += 1
+            return None
+        key, _ = values_key(args, KEY_SIZE)
+        if key is None:
+            self.skipped += 1
+        return key
+
+    def get(self, key):
+        results = self.results
+        entry = results.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        results.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, result):
+        # integer, string, boolean and null results are cached. Errors are
+        # raised again on every call, and arrays are not cached so that
+        # each call still gets an array of its own
+        result_type = type(result)
+        if result is not None and result_type is not Integer and result_type is not String \
+                and result_type is not BooleanObject:
+            return
+        results = self.results
+        memoizer = self.memoizer
+        if key in results:
+            return
+        n = size(key) + size(result)
+        if len(results) >= memoizer.limit:
+            self.evict()
+        while memoizer.size + n > memoizer.capacity:
+            if len(results) == 0:
+                return
+            self.evict()
+        results[key] = (result, n)
+        memoizer.entries += 1
+        memoizer.size += n
+
+    def evict(self):
+        _, (_, n) = self.results.popitem(last=False)
+        self.evictions += 1
+        memoizer = self.memoizer
+        memoizer.entries -= 1
+        memoizer.size -= n
+
+    def clear(self):
+        memoizer = self.memoizer
+        for _, n in self.results.values():
+            memoizer.size -= n
+        memoizer.entries -= len(self.results)
+        self.results.clear()
+
+
+class Memoizer:
+    """The caches of the pure functions of a program."""
+
+    def __init__(self, limit=LIMIT, capacity=CAPACITY):
+        self.limit = limit
+        self.capacity = capacity
+        self.memos = []
+        # results cached in all the memos, and the size of their keys and
+        # results, as size() counts it
+        self.entries = 0
+        self.size = 0
+
+    def memo(self, name):
+        memo = Memo(self, name)
+        self.memos.append(memo)
+        return memo
+
+    @property
+    def hits(self):
+        return sum(m.hits for m in self.memos)
+
+    @property
+    def misses(self):
+        return sum(m.misses for m in self.memos)
+
+    @property
+    def skipped(self):
+        return sum(m.skipped for m in self.memos)
+
+    @property
+    def evictions(self):
+        return sum(m.evictions for m in self.memos)
+
+    def clear(self):
+        for m in self.memos:
+            m.clear()
+
+
+class Scope:
+    __slots__ = ('names', 'parameters', 'functions', 'outer')
+
+    def __init__(self, names, parameters, outer):
+        # name -> number of parameters and lets declaring it
+        self.names = {}
+        for name in names:
+            self.names[name] = self.names.get(name, 0) + 1
+        self.parameters = parameters
+        # name -> the function literal of its only let
+        self.functions = {}
+        self.outer = outer
+
+    def declares(self, name):
+        # whether the name is declared here or further out
+        scope = self
+        while scope is not None:
+            if name in scope.names:
+                return True
+            scope = scope.outer
+        return False
+
+
+# A function is pure when its result depends on nothing but its arguments:
+# its body reads only its parameters and its own variables, defines no
+# functions, and calls only its parameters, its variables, the builtins in
+# PURE_BUILTINS and pure functions bound once by `let` in an enclosing
+# scope.
+class Purity:
+    def __init__(self):
+        # the literals that are pure if the functions they call are, with
+        # the (scope, name) of the functions they call
+        self.candidates = []
+        # id of a literal -> the name it is bound to
+        self.names = {}
+
+    def walk(self, node, scope):
+        node_type = type(node)
+        if node_type is FunctionLiteral:
+            self.function(node, scope)
+            return
+        if node_type is LetStatement and type(node.value) is FunctionLiteral:
+            name = node.name.value
+            if scope.names[name] == 1:
+                scope.functions[name] = node.value
+            self.names[id(node.value)] = name
+        for child in children(node):
+            self.walk(child, scope)
+
+    def function(self, literal, outer):
+        parameters = [p.value for p in literal.parameters]
+        names = list(parameters)
+        declarations(literal.body, names)
+        scope = Scope(names, set(parameters), outer)
+        calls = []
+        if self.pure(literal.body, scope, calls):
+            self.candidates.append((literal, calls))
+        self.walk(literal.body, scope)
+
+    def pure(self, node, scope, calls):
+        node_type = type(node)
+        if node_type is Identifier:
+            return self.variable(node.value, scope)
+        elif node_type is FunctionLiteral:
+            return False
+        elif node_type is CallExpression:
+            function = node.function
+            if type(function) is Identifier and function.value not in scope.names:
+                if not self.callee(function.value, scope, calls):
+                    return False
+            elif not self.pure(function, scope, calls):
+                return False
+            for a in node.arguments:
+                if not self.pure(a, scope, calls):
+                    return False
+            return True
+        elif node_type is InfixExpression and node.operator in ('==', '!='):
+            # arrays are equal only to themselves, and arguments equal in
+            # value do not share them: only compare what is not an array
+            if type(node.left) not in VALUES and type(node.right) not in VALUES:
+                return False
+        for child in children(node):
+            if not self.pure(child, scope, calls):
+                return False
+        return True
+
+    def variable(self, name, scope):
+        # reading a variable that has not been assigned yet looks it up by
+        # name further out, so it must not be declared there nor name a
+        # builtin
+        count = scope.names.get(name)
+        if count is None:
+            return False
+        if count == 1 and name in scope.parameters:
+            # cached calls have no null arguments, so it is assigned
+            return True
+        return not (name in builtins or scope.outer is not None and scope.outer.declares(name))
+
+    def callee(self, name, scope, calls):
+        # as for variables, a function called by name must be the only
+        # binding of that name, with none further out
+        outer = scope.outer
+        while outer is not None and name not in outer.names:
+            outer = outer.outer
+        if outer is None:
+            return name in PURE_BUILTINS
+        if outer.names[name] != 1 or name in builtins \
+                or outer.outer is not None and outer.outer.declares(name):
+            return False
+        calls.append((outer, name))
+        return True
+
+    def pure_literals(self):
+        pure = {id(literal) for literal, _ in self.candidates}
+        changed = True
+        while changed:
+            changed = False
+            for literal, calls in self.candidates:
+                if id(literal) not in pure:
+                    continue
+                for scope, name in calls:
+                    target = scope.functions.get(name)
+                    if target is None or id(target) not in pure:
+                        pure.discard(id(literal))
+                        changed = True
+                        break
+        return [literal for literal, _ in self.candidates if id(literal) in pure]
+
+
+def memoize(program, limit=LIMIT, capacity=CAPACITY):
+    """Cache the results of the pure functions of `program`, at most
+    `limit` for each and of a size of at most `capacity` in all. Returns
+    the Memoizer of the caches."""
+    names = []
+    declarations(program, names)
+    purity = Purity()
+    purity.walk(program, Scope(names, set(), None))
+    memoizer = Memoizer(limit, capacity)
+    for literal in purity.pure_literals():
+        literal.memo = memoizer.memo(purity.names.get(id(literal)))
+    return memoizer
@@ -1,3 +1,9 @@
+from weakref import WeakValueDictionary
+
+
+# The type of an object is its class: engines test it with
+# `type(obj) is Integer`, which needs no method call. ObjectType names the
+# types in messages, and type_() returns that name.
 class ObjectType:
     INTEGER_OBJ = 'INTEGER'
     BOOLEAN_OBJ = 'BOOLEAN'
@@ -8,9 +14,12 @@ class ObjectType:
     STRING_OBJ = 'STRING'
     BUILTIN_OBJ = 'BUILTIN'
     ARRAY_OBJ = 'ARRAY'
+    COMPILED_FUNCTION_OBJ = 'COMPILED_FUNCTION'
 
 
 class Integer:
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -23,6 +32,8 @@ class Integer:
 
 
 class Boolean:
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -35,6 +46,8 @@ class Boolean:
 
 
 class Null:
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -43,11 +56,13 @@ class Null:
         return ObjectType.NULL_OBJ
 
     @staticmethod
-    def inspect(self):
+    def inspect():
         return 'null'
 
 
 class ReturnValue:
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -60,10 +75,20 @@ class ReturnValue:
 
 
 class Function:
-    def __init__(self, params, body, env):
+    __slots__ = ('parameters', 'body', 'env', 'scope', 'calls', 'jitted', 'memo')
+
+    def __init__(self, params, body, env, scope=None, memo=None):
         self.parameters = params
         self.body = body
         self.env = env
+        # names of the variables of a call, from monkey.resolver
+        self.scope = scope
+        # calls counted by monkey.evaluator, and the Python function
+        # monkey.jit compiled the body to once it became hot
+        self.calls = 0
+        self.jitted = None
+        # the cache of results from monkey.memo, for a pure function
+        self.memo = memo
 
     @staticmethod
     def type_():
@@ -79,10 +104,53 @@ class Function:
         return s
 
 
+class CompiledFunction:
+    """The bytecode of a function literal, from monkey.compiler.
+
+    `positions` maps the offset of each instruction that can fail to the
+    position of its node in the source. `lookups` maps the offset of each
+    instruction reading a variable to what monkey.vm reads instead when the
+    variable has not been assigned yet.
+    """
+    __slots__ = ('instructions', 'num_locals', 'parameters', 'body', 'positions', 'lookups')
+
+    def __init__(self, instructions, num_locals, parameters, body, positions, lookups):
+        self.instructions = instructions
+        self.num_locals = num_locals
+        # names of the parameters, the first locals
+        self.parameters = parameters
+        self.body = body
+        self.positions = positions
+        self.lookups = lookups
+
+    @staticmethod
+    def type_():
+        return ObjectType.COMPILED_FUNCTION_OBJ
+
+    def inspect(self):
+        return 'CompiledFunction[{}]'.format(id(self))
+
+
+class Closure(Function):
+    """A function created by monkey.vm.
+
+    `free` holds the locals of the enclosing calls, innermost first, by
+    reference: a closure sees the variables of its scopes as they are
+    when it reads them.
+    """
+    __slots__ = ('fn', 'free')
+
+    def __init__(self, fn, free):
+        super().__init__(fn.parameters, fn.body, None)
+        self.fn = fn
+        self.free = free
+
+
 class String:
+    __slots__ = ('value', '__weakref__')
+
     def __init__(self, value):
         self.value = value
-        pass
 
     @staticmethod
     def type_():
@@ -93,6 +161,8 @@ class String:
 
 
 class Builtin:
+    __slots__ = ('fn',)
+
     def __init__(self, fn):
         self.fn = fn
 
@@ -106,6 +176,8 @@ class Builtin:
 
 
 class Array:
+    __slots__ = ('elements',)
+
     def __init__(self, elements):
         self.elements = elements
 
@@ -126,12 +198,43 @@ class Array:
 
 
 class Error:
-    def __init__(self, message):
+    __slots__ = ('message', 'position')
+
+    def __init__(self, message, position=None):
         self.message = message
+        # offset in the source of the node that failed
+        self.position = position
 
     @staticmethod
     def type_():
         return ObjectType.ERROR_OBJ
 
     def inspect(self):
-        return 'ERROR: {}'.format(self.message)
\ No newline at end of file
+        return 'ERROR: {}'.format(self.message)
+
+
+# Values are immutable, so the same object can stand for every occurrence
+# of a value. There is one null, one true and one false, integers in
+# SMALL_INTEGERS are preallocated, and string literals are interned for as
+# long as they are in use.
+NULL = Null()
+TRUE = Boolean(True)
+FALSE = Boolean(False)
+
+SMALL_INTEGERS = range(-256, 1025)
+small_integers = [Integer(i) for i in SMALL_INTEGERS]
+strings = WeakValueDictionary()
+
+
+def new_integer(value):
+    # division makes floats, which are never shared
+    if type(value) is int and -256 <= value <= 1024:
+        return small_integers[value + 256]
+    return Integer(value)
+
+
+def intern_string(value):
+    string = strings.get(value)
+    if string is None:
+        string = strings[value] = String(value)
+    return string
@@ -0,0 +1,325 @@
+"""Optimizations of the AST, for every execution engine.
+
+`optimize(program)` folds constants, drops dead branches and unreachable
+statements and inlines small functions, in place, and returns `program`.
+"""
+from .ast import (
+    Node,
+    ExpressionStatement,
+    IntegerLiteral,
+    StringLiteral,
+    Boolean,
+    PrefixExpression,
+    InfixExpression,
+    BlockStatement,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+    FunctionLiteral,
+    CallExpression,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .evaluator import (
+    EvaluationError,
+    eval_integer_literal,
+    eval_string_literal,
+    eval_prefix_expression,
+    eval_infix_expression,
+    native_bool_to_bool_lean_object,
+)
+from .object import Integer, String, Boolean as BooleanObject, TRUE
+from .resolver import children, declarations
+from .token import Token, TokenType
+
+# most nodes an inlined function body may have
+INLINE_SIZE = 16
+
+LITERALS = (IntegerLiteral, StringLiteral, Boolean)
+
+# fields of the nodes set by the engines, not copied with the node
+CACHES = ('constant', 'specialized', 'depth', 'slot', 'scope', 'memo')
+
+
+def literal_value(node):
+    # the object a literal node evaluates to
+    node_type = type(node)
+    if node_type is IntegerLiteral:
+        return eval_integer_literal(node, None)
+    elif node_type is StringLiteral:
+        return eval_string_literal(node, None)
+    return native_bool_to_bool_lean_object(node.value)
+
+
+def literal(obj, position):
+    """The literal node for `obj` at `position`, or None if there is none."""
+    obj_type = type(obj)
+    if obj_type is Integer and type(obj.value) is int:
+        node = IntegerLiteral(Token(TokenType.INT, str(obj.value), position))
+        node.value = obj.value
+        return node
+    elif obj_type is String:
+        return StringLiteral(Token(TokenType.STRING, obj.value, position), obj.value)
+    elif obj_type is BooleanObject:
+        token_type = TokenType.TRUE if obj is TRUE else TokenType.FALSE
+        return Boolean(Token(token_type, str(obj.value).lower(), position), obj.value)
+    return None
+
+
+def size(node):
+    n = 1
+    for child in children(node):
+        n += size(child)
+    return n
+
+
+# fields of identifiers that name a variable, not read it
+BINDINGS = {LetStatement: 'name', FunctionLiteral: 'parameters'}
+
+
+def copy(node, arguments):
+    """A copy of the expression `node` with the parameters in `arguments`,
+    a dict name -> literal node, replaced by copies of their literal where
+    they are read."""
+    node_type = type(node)
+    if node_type is Identifier and node.value in arguments:
+        return copy(arguments[node.value], {})
+    clone = node_type.__new__(node_type)
+    binding = BINDINGS.get(node_type)
+    for cls in node_type.__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            value = getattr(node, name)
+            replaced = {} if name == binding else arguments
+            if name in CACHES:
+                value = None
+            elif isinstance(value, Node):
+                value = copy(value, replaced)
+            elif type(value) is list:
+                value = [copy(v, replaced) if isinstance(v, Node) else v for v in value]
+            setattr(clone, name, value)
+    return clone
+
+
+def only_parameters(node, parameters):
+    # whether `node` is an expression of the parameters alone, with no
+    # statements that would act in the caller once inlined
+    node_type = type(node)
+    if node_type is Identifier:
+        return node.value in parameters
+    if node_type in (FunctionLiteral, BlockStatement, ReturnStatement, LetStatement):
+        return False
+    for child in children(node):
+        if not only_parameters(child, parameters):
+            return False
+    return True
+
+
+def inline_body(literal):
+    """The expression `literal` can be inlined as, or None: a body that is a
+    single small expression of the parameters alone, without blocks."""
+    parameters = [p.value for p in literal.parameters]
+    if len(set(parameters)) != len(parameters):
+        return None
+    statements = literal.body.statements
+    if len(statements) != 1:
+        return None
+    statement = statements[0]
+    if type(statement) is ExpressionStatement:
+        expression = statement.expression
+    elif type(statement) is ReturnStatement:
+        expression = statement.value
+    else:
+        return None
+    if expression is None or size(expression) > INLINE_SIZE or not only_parameters(expression, set(parameters)):
+        return None
+    return expression
+
+
+def truthy(node):
+    # the truth of a literal, as monkey.evaluator.is_truthy
+    if type(node) is Boolean:
+        return node.value
+    return True
+
+
+# Every engine gives the same results for the optimized program, errors
+# and their positions included: folded and inlined nodes keep the positions
+# of the nodes they come from, and nothing that can fail is removed.
+class Optimizer:
+    def statements(self, statements, inlinable):
+        """Optimize a list of statements. `inlinable` maps the names of the
+        functions that can be inlined to their literal and inline body."""
+        result = []
+        last = len(statements) - 1
+        for i, s in enumerate(statements):
+            s_type = type(s)
+            if s_type is ExpressionStatement and type(s.expression) is IfExpression:
+                node = s.expression
+                self.if_parts(node, inlinable)
+                if type(node.condition) in LITERALS:
+                    # the statements of the branch taken replace the if
+                    branch = node.consequence if truthy(node.condition) else node.alternative
+                    if branch is not None and len(branch.statements) > 0:
+                        result.extend(branch.statements)
+                    elif i < last:
+                        # no value and no effect
+                        pass
+                    else:
+                        self.drop_dead_branch(node)
+                        result.append(s)
+                else:
+                    result.append(s)
+            elif s_type is LetStatement:
+                s.value = self.expression(s.value, inlinable)
+                name = s.name.value
+                if name in inlinable:
+                    # bound again, or shadowing the function of the same name
+                    del inlinable[name]
+                if type(s.value) is FunctionLiteral and name in self.bound_once:
+                    body = inline_body(s.value)
+                    if body is not None:
+                        inlinable[name] = (s.value, body)
+                result.append(s)
+            elif s_type is ExpressionStatement:
+                s.expression = self.expression(s.expression, inlinable)
+                result.append(s)
+            elif s_type is ReturnStatement:
+                s.value = self.expression(s.value, inlinable)
+                result.append(s)
+            else:
+                result.append(s)
+            if len(result) > 0 and type(result[-1]) is ReturnStatement:
+                # the rest is unreachable. A variable whose only `let` is
+                # dropped here or with a dead branch was never assigned, and
+                # reading it looked it up further out, where it now
+                # resolves directly
+                break
+        return result
+
+    def block(self, block, inlinable):
+        if block is not None:
+            # lets in a branch only bind for the rest of the branch
+            block.statements = self.statements(block.statements, dict(inlinable))
+
+    def if_parts(self, node, inlinable):
+        node.condition = self.expression(node.condition, inlinable)
+        self.block(node.consequence, inlinable)
+        self.block(node.alternative, inlinable)
+
+    def drop_dead_branch(self, node):
+        if truthy(node.condition):
+            node.alternative = None
+        else:
+            empty = BlockStatement(Token(TokenType.LBRACE, '{', node.consequence.position))
+            node.consequence = empty
+
+    def function(self, node, inlinable):
+        # the names the function declares hide the outer functions
+        names = [p.value for p in node.parameters]
+        declarations(node.body, names)
+        inner = dict(inlinable)
+        for name in names:
+            inner.pop(name, None)
+        bound_once = self.bound_once
+        self.bound_once = once(names)
+        self.block(node.body, inner)
+        self.bound_once = bound_once
+
+    def expression(self, node, inlinable):
+        node_type = type(node)
+        if node_type is PrefixExpression:
+            node.right = self.expression(node.right, inlinable)
+            return self.fold_prefix(node)
+        elif node_type is InfixExpression:
+            node.left = self.expression(node.left, inlinable)
+            node.right = self.expression(node.right, inlinable)
+            return self.fold_infix(node)
+        elif node_type is IfExpression:
+            self.if_parts(node, inlinable)
+            if type(node.condition) in LITERALS:
+                branch = node.consequence if truthy(node.condition) else node.alternative
+                if (branch is not None and len(branch.statements) == 1
+                        and type(branch.statements[0]) is ExpressionStatement):
+                    return branch.statements[0].expression
+                self.drop_dead_branch(node)
+            return node
+        elif node_type is FunctionLiteral:
+            self.function(node, inlinable)
+            return node
+        elif node_type is CallExpression:
+            node.function = self.expression(node.function, inlinable)
+            arguments = []
+            for a in node.arguments:
+                arguments.append(self.expression(a, inlinable))
+            node.arguments = arguments
+            return self.inline(node, inlinable)
+        elif node_type is ArrayLiteral:
+            elements = []
+            for e in node.elements:
+                elements.append(self.expression(e, inlinable))
+            node.elements = elements
+            return node
+        elif node_type is IndexExpression:
+            node.left = self.expression(node.left, inlinable)
+            node.index = self.expression(node.index, inlinable)
+            return node
+        return node
+
+    # An expression whose evaluation is an error is not folded, so the
+    # error still happens at run time.
+    def fold_prefix(self, node):
+        if type(node.right) not in LITERALS:
+            return node
+        try:
+            value = eval_prefix_expression(node.operator, literal_value(node.right))
+        except EvaluationError:
+            return node
+        folded = literal(value, node.position)
+        return node if folded is None else folded
+
+    def fold_infix(self, node):
+        # division is never folded
+        if node.operator == '/' or type(node.left) not in LITERALS or type(node.right) not in LITERALS:
+            return node
+        try:
+            value = eval_infix_expression(node.operator, literal_value(node.left), literal_value(node.right))
+        except EvaluationError:
+            return node
+        folded = literal(value, node.position)
+        return node if folded is None else folded
+
+    def inline(self, node, inlinable):
+        function = node.function
+        if type(function) is not Identifier or function.value not in inlinable:
+            return node
+        literal_node, body = inlinable[function.value]
+        if len(node.arguments) != len(literal_node.parameters):
+            return node
+        arguments = {}
+        for p, a in zip(literal_node.parameters, node.arguments):
+            if type(a) not in LITERALS:
+                return node
+            arguments[p.value] = a
+        # the inlined body is folded with its literal arguments
+        return self.expression(copy(body, arguments), {})
+
+    def program(self, program):
+        names = []
+        declarations(program, names)
+        self.bound_once = once(names)
+        program.statements = self.statements(list(program.statements), {})
+        return program
+
+
+def once(names):
+    # the names declared exactly once
+    counts = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    return {name for name, count in counts.items() if count == 1}
+
+
+def optimize(program):
+    """Optimize `program` in place and return it."""
+    return Optimizer().program(program)
@@ -185,9 +185,9 @@ class Parser:
     def parse_integer_literal(self):
         integer = IntegerLiteral(self.cur_token)
         try:
-            value = int(integer.token_literal())
+            value = int(self.cur_token._literal)
         except Exception as e:
-            print('{}: Could not parse {} as integer'.format(e, integer.token_literal()))
+            print('{}: Could not parse {} as integer'.format(e, self.cur_token._literal))
             return None
         integer.value = value
 
@@ -269,7 +269,7 @@ class Parser:
 
         self.next_token()
 
-        while not self.cur_token_is(TokenType.RBRACE):
+        while not self.cur_token_is(TokenType.RBRACE) and not self.cur_token_is(TokenType.EOF):
             statement = self.parse_statement()
             if not statement is None:
                 block.statements.append(statement)
@@ -304,6 +304,12 @@ class Parser:
         identifier = Identifier(self.cur_token, self.cur_token._literal)
         identifiers.append(identifier)
 
+        while self.peek_token_is(TokenType.COMMA):
+            self.next_token()
+            self.next_token()
+            identifier = Identifier(self.cur_token, self.cur_token._literal)
+            identifiers.append(identifier)
+
         if not self.expect_peek(TokenType.RPAREN):
             return None
 
@@ -367,9 +373,315 @@ class Parser:
         exp = IndexExpression(self.cur_token, left)
 
         self.next_token()
-        exp.index = self.parse_expression_list(LOWEST)
+        exp.index = self.parse_expression(LOWEST)
 
         if not self.expect_peek(TokenType.RBRACKET):
             return None
 
-        return exp
\ No newline at end of file
+        return exp
+
+
+# what StackParser starts parsing next
+STATEMENT = 0
+EXPRESSION = 1
+BLOCK = 2
+LIST = 3
+
+# StackParser frames waiting for a parsed value, one per recursive call of
+# Parser that would be on the Python stack
+EXPRESSION_LOOP = 0
+LET_VALUE = 1
+RETURN_VALUE = 2
+EXPRESSION_STATEMENT = 3
+PREFIX_RIGHT = 4
+INFIX_RIGHT = 5
+GROUPED = 6
+IF_CONDITION = 7
+IF_CONSEQUENCE = 8
+IF_ALTERNATIVE = 9
+FUNCTION_BODY = 10
+BLOCK_STATEMENT = 11
+LIST_ELEMENT = 12
+ARRAY_ELEMENTS = 13
+CALL_ARGUMENTS = 14
+INDEX_VALUE = 15
+
+# looking up members on TokenType is slow, so the loop uses these instead
+IDENT = TokenType.IDENT
+INT = TokenType.INT
+STRING = TokenType.STRING
+TRUE = TokenType.TRUE
+FALSE = TokenType.FALSE
+BANG = TokenType.BANG
+MINUS = TokenType.MINUS
+LPAREN = TokenType.LPAREN
+RPAREN = TokenType.RPAREN
+LBRACE = TokenType.LBRACE
+RBRACE = TokenType.RBRACE
+LBRACKET = TokenType.LBRACKET
+RBRACKET = TokenType.RBRACKET
+COMMA = TokenType.COMMA
+SEMICOLON = TokenType.SEMICOLON
+IF = TokenType.IF
+ELSE = TokenType.ELSE
+FUNCTION = TokenType.FUNCTION
+LET = TokenType.LET
+RETURN = TokenType.RETURN
+ASSIGN = TokenType.ASSIGN
+EOF = TokenType.EOF
+
+
+class StackParser(Parser):
+    """Parser that keeps its pending work on an explicit stack.
+
+    It builds the same trees and reports the same errors as `Parser`, using
+    the same `precedences`, but one loop replaces the mutual recursion of
+    the parse functions. Nesting depth is limited only by memory, and no
+    Python frame is spent per nested expression.
+    """
+
+    def parse_statement(self):
+        return self.run(STATEMENT)
+
+    def parse_expression(self, precedence):
+        return self.run(EXPRESSION, precedence)
+
+    def parse_block_statement(self):
+        return self.run(BLOCK)
+
+    def parse_expression_list(self, end):
+        return self.run(LIST, end)
+
+    def run(self, start, arg=None):
+        # frames are pushed as two entries, the node (or precedence) waiting
+        # for a value and then the frame kind
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        next_token = self.next_token
+        expect_peek = self.expect_peek
+        get_precedence = precedences.get
+        value = None
+
+        while True:
+            if start == EXPRESSION:
+                start = None
+                cur = self.cur_token
+                cur_type = cur._type
+
+                if cur_type is IDENT:
+                    value = Identifier(cur, cur._literal)
+                elif cur_type is INT:
+                    value = self.parse_integer_literal()
+                elif cur_type is STRING:
+                    value = StringLiteral(cur, cur._literal)
+                elif cur_type is TRUE or cur_type is FALSE:
+                    value = Boolean(cur, cur_type is TRUE)
+                else:
+                    push(arg)
+                    push(EXPRESSION_LOOP)
+                    if cur_type is BANG or cur_type is MINUS:
+                        push(PrefixExpression(cur, cur._literal))
+                        push(PREFIX_RIGHT)
+                        next_token()
+                        start, arg = EXPRESSION, PREFIX
+                    elif cur_type is LPAREN:
+                        push(None)
+                        push(GROUPED)
+                        next_token()
+                        start, arg = EXPRESSION, LOWEST
+                    elif cur_type is IF:
+                        expression = IfExpression(cur)
+                        if expect_peek(LPAREN):
+                            push(expression)
+                            push(IF_CONDITION)
+                            next_token()
+                            start, arg = EXPRESSION, LOWEST
+                    elif cur_type is FUNCTION:
+                        literal = FunctionLiteral(cur)
+                        if expect_peek(LPAREN):
+                            literal.parameters = self.parse_function_parameters()
+                            if expect_peek(LBRACE):
+                                push(literal)
+                                push(FUNCTION_BODY)
+                                start = BLOCK
+                    elif cur_type is LBRACKET:
+                        push(ArrayLiteral(cur))
+                        push(ARRAY_ELEMENTS)
+                        start, arg = LIST, RBRACKET
+                    else:
+                        del stack[-2:]
+                        self.no_prefix_parse_function_error(cur_type)
+                    value = None
+                    continue
+
+                # an atom: only keep a frame for the infix loop of
+                # parse_expression when an operator follows
+                peek_type = self.peek_token._type
+                if arg >= get_precedence(peek_type, LOWEST) or peek_type is SEMICOLON:
+                    continue
+                push(arg)
+                push(EXPRESSION_LOOP)
+
+            elif start is not None:
+                cur = self.cur_token
+                cur_type = cur._type
+
+                if start == STATEMENT:
+                    if cur_type is LET:
+                        statement = LetStatement(cur)
+                        start = None
+                        value = None
+                        if expect_peek(IDENT):
+                            statement.name = Identifier(self.cur_token, self.cur_token._literal)
+                            if expect_peek(ASSIGN):
+                                next_token()
+                                push(statement)
+                                push(LET_VALUE)
+                                start, arg = EXPRESSION, LOWEST
+                    elif cur_type is RETURN:
+                        push(ReturnStatement(cur))
+                        push(RETURN_VALUE)
+                        next_token()
+                        start, arg = EXPRESSION, LOWEST
+                    else:
+                        push(ExpressionStatement(cur))
+                        push(EXPRESSION_STATEMENT)
+                        start, arg = EXPRESSION, LOWEST
+                elif start == BLOCK:
+                    block = BlockStatement(cur)
+                    next_token()
+                    cur_type = self.cur_token._type
+                    if cur_type is RBRACE or cur_type is EOF:
+                        start = None
+                        value = block
+                    else:
+                        push(block)
+                        push(BLOCK_STATEMENT)
+                        start = STATEMENT
+                else:
+                    # LIST
+                    if self.peek_token._type is arg:
+                        next_token()
+                        start = None
+                        value = []
+                    else:
+                        next_token()
+                        push(([], arg))
+                        push(LIST_ELEMENT)
+                        start, arg = EXPRESSION, LOWEST
+                continue
+
+            # hand value to the innermost frame waiting for one
+            if not stack:
+                return value
+
+            kind = stack[-1]
+
+            if kind == INFIX_RIGHT or kind == PREFIX_RIGHT:
+                pop()
+                node = pop()
+                node.right = value
+                value = node
+                # the frame below is always the infix loop, run it right away
+                kind = EXPRESSION_LOOP
+
+            if kind == EXPRESSION_LOOP:
+                peek_type = self.peek_token._type
+                precedence = get_precedence(peek_type, LOWEST)
+                if stack[-2] < precedence and peek_type is not SEMICOLON:
+                    next_token()
+                    cur = self.cur_token
+                    if peek_type is LPAREN:
+                        push(CallExpression(cur, value))
+                        push(CALL_ARGUMENTS)
+                        start, arg = LIST, RPAREN
+                    elif peek_type is LBRACKET:
+                        push(IndexExpression(cur, value))
+                        push(INDEX_VALUE)
+                        next_token()
+                        start, arg = EXPRESSION, LOWEST
+                    else:
+                        push(InfixExpression(cur, cur._literal, value))
+                        push(INFIX_RIGHT)
+                        next_token()
+                        start, arg = EXPRESSION, precedence
+                else:
+                    del stack[-2:]
+                continue
+
+            node = stack[-2]
+            if kind == LIST_ELEMENT:
+                node[0].append(value)
+                if self.peek_token._type is COMMA:
+                    next_token()
+                    next_token()
+                    start, arg = EXPRESSION, LOWEST
+                else:
+                    del stack[-2:]
+                    value = node[0] if expect_peek(node[1]) else None
+            elif kind == BLOCK_STATEMENT:
+                if value is not None:
+                    node.statements.append(value)
+                next_token()
+                cur_type = self.cur_token._type
+                if cur_type is RBRACE or cur_type is EOF:
+                    del stack[-2:]
+                    value = node
+                else:
+                    start = STATEMENT
+            elif kind == LET_VALUE or kind == RETURN_VALUE or kind == EXPRESSION_STATEMENT:
+                del stack[-2:]
+                if kind == EXPRESSION_STATEMENT:
+                    node.expression = value
+                else:
+                    node.value = value
+                if self.peek_token._type is SEMICOLON:
+                    next_token()
+                value = node
+            elif kind == GROUPED:
+                del stack[-2:]
+                if not expect_peek(RPAREN):
+                    value = None
+            elif kind == CALL_ARGUMENTS:
+                del stack[-2:]
+                node.arguments = value
+                value = node
+            elif kind == INDEX_VALUE:
+                del stack[-2:]
+                node.index = value
+                value = node if expect_peek(RBRACKET) else None
+            elif kind == ARRAY_ELEMENTS:
+                del stack[-2:]
+                node.elements = value
+                value = node
+            elif kind == FUNCTION_BODY:
+                del stack[-2:]
+                node.body = value
+                value = node
+            elif kind == IF_CONDITION:
+                node.condition = value
+                if expect_peek(RPAREN) and expect_peek(LBRACE):
+                    stack[-1] = IF_CONSEQUENCE
+                    start = BLOCK
+                else:
+                    del stack[-2:]
+                    value = None
+            elif kind == IF_CONSEQUENCE:
+                node.consequence = value
+                if self.peek_token._type is not ELSE:
+                    del stack[-2:]
+                    value = node
+                else:
+                    next_token()
+                    if expect_peek(LBRACE):
+                        stack[-1] = IF_ALTERNATIVE
+                        start = BLOCK
+                    else:
+                        del stack[-2:]
+                        value = None
+            else:
+                # IF_ALTERNATIVE
+                del stack[-2:]
+                node.alternative = value
+                value = node
@@ -0,0 +1,375 @@
+"""Peephole optimization of the bytecode of monkey.compiler.
+
+`optimize` rewrites the instructions of a program, and of the functions
+it creates, so that monkey.vm dispatches fewer instructions. The passes,
+each of which can be turned off, run in this order:
+
+    fold_constants      arithmetic, comparisons, `-` and `!` on constants
+                        become a single constant, and conditional jumps
+                        on a constant are made unconditional or removed
+    thread_jumps        a jump to a jump goes to the final target, a jump
+                        to a return returns, and a jump to the next
+                        instruction is removed
+    remove_dead_code    instructions no path reaches are removed, such as
+                        those after a return, and so are constants and
+                        variables pushed only to be popped
+    superinstructions   common sequences are fused into the instructions
+                        defined after op_closure in monkey.code
+
+Only operations that cannot fail are folded, so errors and their
+positions are unchanged.
+"""
+from bisect import bisect_left
+
+from .code import DefinitionType, Instructions, instruction_lengths, make, read_operands
+from .object import Integer, String, new_integer, intern_string
+
+OP_CONSTANT = int(DefinitionType.op_constant)
+OP_POP = int(DefinitionType.op_pop)
+OP_ADD = int(DefinitionType.op_add)
+OP_SUB = int(DefinitionType.op_sub)
+OP_MUL = int(DefinitionType.op_mul)
+OP_TRUE = int(DefinitionType.op_true)
+OP_FALSE = int(DefinitionType.op_false)
+OP_NULL = int(DefinitionType.op_null)
+OP_EQUAL = int(DefinitionType.op_equal)
+OP_NOT_EQUAL = int(DefinitionType.op_not_equal)
+OP_GREATER_THAN = int(DefinitionType.op_greater_than)
+OP_LESS_THAN = int(DefinitionType.op_less_than)
+OP_MINUS = int(DefinitionType.op_minus)
+OP_BANG = int(DefinitionType.op_bang)
+OP_JUMP_NOT_TRUTHY = int(DefinitionType.op_jump_not_truthy)
+OP_JUMP = int(DefinitionType.op_jump)
+OP_GET_GLOBAL = int(DefinitionType.op_get_global)
+OP_GET_LOCAL = int(DefinitionType.op_get_local)
+OP_GET_BUILTIN = int(DefinitionType.op_get_builtin)
+OP_RETURN_VALUE = int(DefinitionType.op_return_value)
+OP_CLOSURE = int(DefinitionType.op_closure)
+OP_GET_LOCAL_CONSTANT = int(DefinitionType.op_get_local_constant)
+OP_ADD_LOCAL_CONSTANT = int(DefinitionType.op_add_local_constant)
+OP_SUB_LOCAL_CONSTANT = int(DefinitionType.op_sub_local_constant)
+OP_COMPARE_JUMP = int(DefinitionType.op_compare_jump)
+OP_RETURN_LOCAL = int(DefinitionType.op_return_local)
+
+# opcode -> index of its jump target among its operands
+JUMP_OPERANDS = {
+    OP_JUMP: 0,
+    OP_JUMP_NOT_TRUTHY: 0,
+    OP_COMPARE_JUMP: 1,
+}
+
+# instructions after which the next one does not run
+TERMINATORS = {OP_JUMP, OP_RETURN_VALUE, OP_RETURN_LOCAL}
+
+COMPARISONS = {OP_EQUAL, OP_NOT_EQUAL, OP_GREATER_THAN, OP_LESS_THAN}
+
+BOOLEANS = {OP_TRUE, OP_FALSE}
+
+# instructions that push a constant, whose value is always truthy but for
+# op_false
+CONSTANTS = {OP_CONSTANT, OP_TRUE, OP_FALSE}
+
+# instructions that push a value and cannot fail, removed with an op_pop
+# that follows them; reading a variable can fail, so it is kept
+PURE = {OP_CONSTANT, OP_TRUE, OP_FALSE, OP_NULL, OP_GET_BUILTIN, OP_CLOSURE}
+
+INTEGER_OPERATIONS = {
+    OP_ADD: lambda l, r: new_integer(l + r),
+    OP_SUB: lambda l, r: new_integer(l - r),
+    OP_MUL: lambda l, r: new_integer(l * r),
+    OP_EQUAL: lambda l, r: l == r,
+    OP_NOT_EQUAL: lambda l, r: l != r,
+    OP_GREATER_THAN: lambda l, r: l > r,
+    OP_LESS_THAN: lambda l, r: l < r,
+}
+
+
+class Instruction:
+    __slots__ = ('op', 'operands', 'label', 'position', 'lookup')
+
+    def __init__(self, op, operands, label, position=None, lookup=None):
+        self.op = op
+        self.operands = operands
+        # offset before optimization; jump operands refer to labels
+        self.label = label
+        self.position = position
+        self.lookup = lookup
+
+
+def decode(instructions, positions, lookups):
+    decoded = []
+    offset = 0
+    while offset < len(instructions):
+        op = instructions[offset]
+        operands = list(read_operands(op, instructions, offset))
+        decoded.append(Instruction(op, operands, offset, positions.get(offset), lookups.get(offset)))
+        offset += instruction_lengths[op]
+    return decoded
+
+
+def encode(decoded, labels):
+    """The instructions, positions and lookups of `decoded`. `labels` are
+    all the labels of the original code: a jump to an instruction that was
+    removed goes to the next one kept."""
+    offsets = {}
+    offset = 0
+    for instruction in decoded:
+        offsets[instruction.label] = offset
+        offset += instruction_lengths[instruction.op]
+    following = offset
+    for label in reversed(labels):
+        if label in offsets:
+            following = offsets[label]
+        else:
+            offsets[label] = following
+
+    instructions = Instructions()
+    positions = {}
+    lookups = {}
+    for instruction in decoded:
+        offset = len(instructions)
+        operands = instruction.operands
+        jump = JUMP_OPERANDS.get(instruction.op)
+        if jump is not None:
+            operands = list(operands)
+            operands[jump] = offsets.get(operands[jump], following)
+        instructions += make(instruction.op, operands)
+        if instruction.position is not None:
+            positions[offset] = instruction.position
+        if instruction.lookup is not None:
+            lookups[offset] = instruction.lookup
+    return instructions, positions, lookups
+
+
+def label_index(decoded):
+    """A function(label) giving the index in `decoded` of the instruction a
+    jump to the label runs: the one of that label or, if it was removed,
+    the next one kept, and len(decoded) past the end."""
+    labels = [instruction.label for instruction in decoded]
+    return lambda label: bisect_left(labels, label)
+
+
+def jump_targets(decoded):
+    targets = set()
+    for instruction in decoded:
+        jump = JUMP_OPERANDS.get(instruction.op)
+        if jump is not None:
+            targets.add(instruction.operands[jump])
+    return targets
+
+
+class ConstantPool:
+    def __init__(self, constants):
+        self.constants = constants
+        self.indices = {}
+        for i, constant in enumerate(constants):
+            if type(constant) is Integer or type(constant) is String:
+                self.indices.setdefault((type(constant), constant.value), i)
+
+    def add(self, obj):
+        key = (type(obj), obj.value)
+        index = self.indices.get(key)
+        if index is None:
+            index = self.indices[key] = len(self.constants)
+            self.constants.append(obj)
+        return index
+
+
+def fold_constants(decoded, pool):
+    targets = jump_targets(decoded)
+    constants = pool.constants
+    result = []
+    for instruction in decoded:
+        result.append(instruction)
+        while True:
+            # fold the end of `result` until nothing changes
+            last = result[-1]
+            if len(result) >= 2 and result[-2].op == OP_CONSTANT and last.label not in targets:
+                value = constants[result[-2].operands[0]]
+                if last.op == OP_MINUS and type(value) is Integer:
+                    folded = Instruction(OP_CONSTANT, [pool.add(new_integer(-value.value))], result[-2].label)
+                    result[-2:] = [folded]
+                    continue
+                if last.op == OP_BANG:
+                    # constants are neither false nor null
+                    result[-2:] = [Instruction(OP_FALSE, [], result[-2].label)]
+                    continue
+            if (last.op == OP_BANG and len(result) >= 2 and last.label not in targets
+                    and result[-2].op in (OP_TRUE, OP_FALSE)):
+                op = OP_FALSE if result[-2].op == OP_TRUE else OP_TRUE
+                result[-2:] = [Instruction(op, [], result[-2].label)]
+                continue
+            if (last.op == OP_JUMP_NOT_TRUTHY and len(result) >= 2 and last.label not in targets
+                    and result[-2].op in CONSTANTS and result[-2].label not in targets):
+                if result[-2].op == OP_FALSE:
+                    result[-2:] = [Instruction(OP_JUMP, last.operands, result[-2].label)]
+                else:
+                    del result[-2:]
+                    if not result:
+                        break
+                continue
+            if (len(result) >= 3 and result[-3].op in BOOLEANS and result[-2].op in BOOLEANS
+                    and last.op in (OP_EQUAL, OP_NOT_EQUAL)
+                    and result[-2].label not in targets and last.label not in targets):
+                same = result[-3].op == result[-2].op
+                op = OP_TRUE if same == (last.op == OP_EQUAL) else OP_FALSE
+                result[-3:] = [Instruction(op, [], result[-3].label)]
+                continue
+            if (len(result) >= 3 and result[-3].op == OP_CONSTANT and result[-2].op == OP_CONSTANT
+                    and result[-2].label not in targets and last.label not in targets):
+                left = constants[result[-3].operands[0]]
+                right = constants[result[-2].operands[0]]
+                folded = None
+                if type(left) is Integer and type(right) is Integer and last.op in INTEGER_OPERATIONS:
+                    value = INTEGER_OPERATIONS[last.op](left.value, right.value)
+                    if last.op in COMPARISONS:
+                        folded = Instruction(OP_TRUE if value else OP_FALSE, [], result[-3].label)
+                    else:
+                        folded = Instruction(OP_CONSTANT, [pool.add(value)], result[-3].label)
+                elif type(left) is String and type(right) is String and last.op == OP_ADD:
+                    value = intern_string(left.value + right.value)
+                    folded = Instruction(OP_CONSTANT, [pool.add(value)], result[-3].label)
+                if folded is not None:
+                    result[-3:] = [folded]
+                    continue
+            break
+    return result
+
+
+def thread_jumps(decoded):
+    index = label_index(decoded)
+    result = []
+    for i, instruction in enumerate(decoded):
+        jump = JUMP_OPERANDS.get(instruction.op)
+        if jump is None:
+            result.append(instruction)
+            continue
+        target = instruction.operands[jump]
+        k = index(target)
+        seen = set()
+        while k < len(decoded) and k not in seen:
+            seen.add(k)
+            if decoded[k].op != OP_JUMP:
+                break
+            target = decoded[k].operands[0]
+            k = index(target)
+        if k < len(decoded):
+            # a removed label stands for the next instruction kept
+            target = decoded[k].label
+        destination = decoded[k] if k < len(decoded) else None
+        if instruction.op == OP_JUMP and destination is not None and destination.op in (OP_RETURN_VALUE, OP_RETURN_LOCAL):
+            result.append(Instruction(destination.op, destination.operands, instruction.label,
+                                      destination.position, destination.lookup))
+            continue
+        if instruction.op == OP_JUMP and k == i + 1:
+            continue
+        operands = list(instruction.operands)
+        operands[jump] = target
+        result.append(Instruction(instruction.op, operands, instruction.label,
+                                  instruction.position, instruction.lookup))
+    return result
+
+
+def remove_dead_code(decoded):
+    index = label_index(decoded)
+    reachable = [False] * len(decoded)
+    pending = [0] if decoded else []
+    while pending:
+        i = pending.pop()
+        while i < len(decoded) and not reachable[i]:
+            reachable[i] = True
+            instruction = decoded[i]
+            jump = JUMP_OPERANDS.get(instruction.op)
+            if jump is not None:
+                pending.append(index(instruction.operands[jump]))
+            if instruction.op in TERMINATORS:
+                break
+            i += 1
+    reached = [instruction for i, instruction in enumerate(decoded) if reachable[i]]
+
+    # jumps to the next instruction left; labels only increase, so a jump
+    # goes to the next instruction if its target is between their labels
+    kept = []
+    for i, instruction in enumerate(reached):
+        if (instruction.op == OP_JUMP and i + 1 < len(reached)
+                and instruction.label < instruction.operands[0] <= reached[i + 1].label):
+            continue
+        kept.append(instruction)
+
+    targets = jump_targets(kept)
+    result = []
+    for instruction in kept:
+        if (instruction.op == OP_POP and result and result[-1].op in PURE
+                and instruction.label not in targets):
+            result.pop()
+            continue
+        result.append(instruction)
+    return result
+
+
+def fuse_superinstructions(decoded):
+    targets = jump_targets(decoded)
+    result = []
+    for instruction in decoded:
+        if instruction.label in targets or not result:
+            result.append(instruction)
+            continue
+        previous = result[-1]
+        op = instruction.op
+        if previous.op == OP_GET_LOCAL and op == OP_CONSTANT:
+            fused = Instruction(OP_GET_LOCAL_CONSTANT, previous.operands + instruction.operands,
+                                previous.label, None, previous.lookup)
+        elif previous.op == OP_GET_LOCAL_CONSTANT and (op == OP_ADD or op == OP_SUB):
+            fused_op = OP_ADD_LOCAL_CONSTANT if op == OP_ADD else OP_SUB_LOCAL_CONSTANT
+            fused = Instruction(fused_op, previous.operands, previous.label, instruction.position, previous.lookup)
+        elif previous.op in COMPARISONS and op == OP_JUMP_NOT_TRUTHY:
+            fused = Instruction(OP_COMPARE_JUMP, [previous.op] + instruction.operands,
+                                previous.label, previous.position)
+        elif previous.op == OP_GET_LOCAL and op == OP_RETURN_VALUE:
+            fused = Instruction(OP_RETURN_LOCAL, previous.operands, previous.label, None, previous.lookup)
+        else:
+            result.append(instruction)
+            continue
+        result[-1] = fused
+    return result
+
+
+def optimize_code(instructions, positions, lookups, pool, options):
+    decoded = decode(instructions, positions, lookups)
+    labels = [instruction.label for instruction in decoded]
+    if options['fold_constants']:
+        decoded = fold_constants(decoded, pool)
+    if options['thread_jumps']:
+        decoded = thread_jumps(decoded)
+    if options['remove_dead_code']:
+        decoded = remove_dead_code(decoded)
+    if options['superinstructions']:
+        decoded = fuse_superinstructions(decoded)
+
+    # the functions created by this code
+    for instruction in decoded:
+        if instruction.op == OP_CLOSURE:
+            fn = pool.constants[instruction.operands[0]]
+            fn.instructions, fn.positions, fn.lookups = optimize_code(
+                fn.instructions, fn.positions, fn.lookups, pool, options)
+    return encode(decoded, labels)
+
+
+def optimize(bytecode, fold_constants=True, thread_jumps=True, remove_dead_code=True, superinstructions=True):
+    """Optimize the output of Compiler.bytecode().
+
+    Returns the bytecode of the optimized program. The functions it
+    creates are optimized in place and folded constants are added to
+    bytecode['constants'], so the constants can still be shared with a
+    later Compiler, as in the REPL.
+    """
+    options = {
+        'fold_constants': fold_constants,
+        'thread_jumps': thread_jumps,
+        'remove_dead_code': remove_dead_code,
+        'superinstructions': superinstructions,
+    }
+    pool = ConstantPool(bytecode['constants'])
+    instructions, positions, lookups = optimize_code(
+        bytecode['instructions'], bytecode['positions'], bytecode['lookups'], pool, options)
+    return dict(bytecode, instructions=instructions, positions=positions, lookups=lookups)
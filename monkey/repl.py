@@ -3,6 +3,14 @@ from .parser import Parser
 from .token import TokenType
 from .evaluator import evaluate
 from .environment import Environment
+from .closure_compiler import execute
+from .stack_evaluator import stack_evaluate
+from .compiler import CompileError, Compiler, new_symbol_table
+from .object import Error
+from .peephole import optimize
+from .vm import VM
+
+ENGINES = ('evaluate', 'closures', 'stack', 'vm')
 
 
 # def start():
@@ -21,9 +29,32 @@ def print_parse_errors(errors):
         print('\t{}\n'.format(e))
 
 
-def start():
-    prompt = '>> '
+def new_runner(engine):
+    """A function(program) running programs with `engine`, one after the
+    other, in the same globals."""
+    if engine == 'vm':
+        symbol_table = new_symbol_table()
+        constants = []
+        globals_ = []
+
+        def run(program):
+            compiler = Compiler(symbol_table, constants)
+            try:
+                compiler.compile(program)
+            except CompileError as e:
+                return Error(str(e))
+            return VM(optimize(compiler.bytecode()), globals_).run()
+        return run
+
+    engines = {'evaluate': evaluate, 'closures': execute, 'stack': stack_evaluate}
+    run_tree = engines[engine]
     env = Environment()
+    return lambda program: run_tree(program, env)
+
+
+def start(engine='evaluate'):
+    prompt = '>> '
+    run = new_runner(engine)
     while True:
         str_input = input(prompt)
         l = Lexer(str_input)
@@ -34,7 +65,7 @@ def start():
             print_parse_errors(p.errors)
             continue
 
-        evaluated = evaluate(program, env)
+        evaluated = run(program)
         if evaluated is not None:
             print(evaluated.inspect())
 
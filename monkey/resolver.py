@@ -0,0 +1,172 @@
+"""Lexical addressing of variables.
+
+The resolver annotates identifiers with where their value lives, so that
+the execution engines do not look names up through every enclosing
+environment:
+
+    depth, slot        the value is values[slot] of the environment
+                       `depth` levels out
+    depth, None        a top level variable, looked up by name in the
+                       environment `depth` levels out
+    BUILTIN, index     the builtin BUILTIN_VALUES[index]
+    None, None         not resolved, looked up by name
+
+Only function calls create scopes. The scope of a function holds its
+parameters and every `let` in its body outside nested functions, in that
+order, and is stored in `FunctionLiteral.scope`. A function is resolved
+the first time its literal is evaluated, against the environment it is
+evaluated in, so function bodies that never run are never visited.
+
+Reading a slot that has not been assigned yet, such as a `let` that has
+not run, falls back to a lookup by name, which gives the same results as
+unresolved evaluation. A name is resolved to a builtin unless a top level
+variable of that name exists or is declared by the program being
+resolved. Once any environment declares a variable of a builtin's name,
+such as a later input of the REPL, identifiers bound to that builtin are
+looked up by name: see `shadowed_builtins` in monkey.environment.
+"""
+from .ast import (
+    Node,
+    Program,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BlockStatement,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+    FunctionLiteral,
+    CallExpression,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .builtins import builtins
+
+BUILTIN = -1
+BUILTIN_SLOTS = {name: i for i, name in enumerate(builtins)}
+BUILTIN_VALUES = tuple(builtins.values())
+
+# node type -> names of the fields holding child nodes or lists of them
+CHILDREN = {
+    Program: ('statements',),
+    ExpressionStatement: ('expression',),
+    PrefixExpression: ('right',),
+    InfixExpression: ('left', 'right'),
+    BlockStatement: ('statements',),
+    IfExpression: ('condition', 'consequence', 'alternative'),
+    ReturnStatement: ('value',),
+    LetStatement: ('value',),
+    CallExpression: ('function', 'arguments'),
+    ArrayLiteral: ('elements',),
+    IndexExpression: ('left', 'index'),
+}
+
+
+def children(node):
+    for field in CHILDREN.get(type(node), ()):
+        child = getattr(node, field)
+        if child is None:
+            continue
+        if isinstance(child, Node):
+            yield child
+        else:
+            yield from child
+
+
+def declarations(node, names):
+    """Add the names bound by `let` in `node`, outside nested functions,
+    to the list `names`."""
+    node_type = type(node)
+    if node_type is LetStatement:
+        names.append(node.name.value)
+    elif node_type is FunctionLiteral:
+        return
+    for child in children(node):
+        declarations(child, names)
+
+
+class Resolver:
+    def __init__(self, scope, env):
+        # scope: names of the function being resolved, or None at the top
+        # level; env: the environment that encloses it
+        self.scope = scope
+        self.env = env
+
+    def lookup(self, node):
+        name = node.value
+        depth = 0
+        if self.scope is not None:
+            slot = self.scope.get(name)
+            if slot is not None:
+                node.depth = 0
+                node.slot = slot
+                return
+            depth = 1
+
+        env = self.env
+        while env.shared:
+            slot = env.names.get(name)
+            if slot is not None:
+                node.depth = depth
+                node.slot = slot
+                return
+            env = env.outer
+            depth += 1
+
+        if name in BUILTIN_SLOTS and not is_declared(env, name):
+            node.depth = BUILTIN
+            node.slot = BUILTIN_SLOTS[name]
+        else:
+            node.depth = depth
+            node.slot = None
+
+    def visit(self, node):
+        node_type = type(node)
+        if node_type is Identifier:
+            self.lookup(node)
+            return
+        elif node_type is LetStatement:
+            name = node.name
+            name.depth = 0
+            name.slot = self.scope.get(name.value) if self.scope is not None else None
+        elif node_type is FunctionLiteral:
+            # resolved when it is first evaluated
+            return
+
+        for child in children(node):
+            self.visit(child)
+
+
+def is_declared(env, name):
+    while env is not None:
+        if name in env.names:
+            return True
+        env = env.outer
+    return False
+
+
+def resolve_function(literal, env):
+    """Resolve the body of `literal`, evaluated in `env`, and set its scope."""
+    names = [p.value for p in literal.parameters]
+    declarations(literal.body, names)
+    scope = {}
+    for name in names:
+        if name not in scope:
+            scope[name] = len(scope)
+    Resolver(scope, env).visit(literal.body)
+    literal.scope = scope
+    return scope
+
+
+def resolve(node, env):
+    """Resolve `node`, about to be evaluated in `env`, outside function
+    bodies. The top level variables it declares are added to `env`."""
+    if type(node) is FunctionLiteral:
+        resolve_function(node, env)
+        return
+    names = []
+    declarations(node, names)
+    for name in names:
+        env.declare(name)
+    Resolver(None, env).visit(node)
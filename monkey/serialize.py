@@ -0,0 +1,345 @@
+"""Compact binary encoding of `monkey.ast` programs.
+
+Layout, all integers little endian:
+
+    header   b'MKA' + version byte, u32 offset of the string table,
+             u32 offset of the root node
+    nodes    tag byte followed by the node's fields, see `FIELDS`
+    strings  u32 count, u32 end offset of each string, utf-8 data
+
+Node fields are varints: child nodes are referenced by absolute offset
+(0 for None) and are written before their parent, strings are indexes
+into the string table, integers such as source positions are zigzag
+encoded, and a list is its length + 1
+(0 for None) followed by its items. `loads` decodes straight from the
+buffer, and the statements of programs and blocks are only decoded when
+they are first accessed, so function bodies that are never called and
+branches that are never taken are never built. Both directions keep the
+nodes left to do on a stack, so deep trees do not hit the recursion
+limit.
+"""
+import struct
+from collections.abc import MutableSequence
+
+from .ast import (
+    Program,
+    LetStatement,
+    Identifier,
+    ReturnStatement,
+    ExpressionStatement,
+    IntegerLiteral,
+    PrefixExpression,
+    InfixExpression,
+    IfExpression,
+    BlockStatement,
+    Boolean,
+    FunctionLiteral,
+    CallExpression,
+    StringLiteral,
+    ArrayLiteral,
+    IndexExpression,
+)
+
+MAGIC = b'MKA'
+VERSION = 2
+HEADER = struct.Struct('<3sBII')
+U32 = struct.Struct('<I')
+
+# field kinds
+NODE = 1
+NODES = 2
+STATEMENTS = 3
+STRING = 4
+INTEGER = 5
+BOOLEAN = 6
+
+# the tag of a node type is its index in this table
+FIELDS = (
+    (Program, (('statements', STATEMENTS),)),
+    (LetStatement, (('position', INTEGER), ('name', NODE), ('value', NODE))),
+    (Identifier, (('position', INTEGER), ('value', STRING))),
+    (ReturnStatement, (('position', INTEGER), ('value', NODE))),
+    (ExpressionStatement, (('position', INTEGER), ('expression', NODE))),
+    (IntegerLiteral, (('position', INTEGER), ('value', INTEGER))),
+    (PrefixExpression, (('position', INTEGER), ('operator', STRING), ('right', NODE))),
+    (InfixExpression, (('position', INTEGER), ('operator', STRING), ('left', NODE), ('right', NODE))),
+    (IfExpression, (('position', INTEGER), ('condition', NODE), ('consequence', NODE), ('alternative', NODE))),
+    (BlockStatement, (('position', INTEGER), ('statements', STATEMENTS))),
+    (Boolean, (('position', INTEGER), ('value', BOOLEAN))),
+    (FunctionLiteral, (('position', INTEGER), ('parameters', NODES), ('body', NODE))),
+    (CallExpression, (('position', INTEGER), ('function', NODE), ('arguments', NODES))),
+    (StringLiteral, (('position', INTEGER), ('value', STRING))),
+    (ArrayLiteral, (('position', INTEGER), ('elements', NODES))),
+    (IndexExpression, (('position', INTEGER), ('left', NODE), ('index', NODE))),
+)
+
+TAGS = {cls: tag for tag, (cls, _) in enumerate(FIELDS)}
+
+
+def unset_slots(cls, fields):
+    names = {name for name, _ in fields}
+    return tuple(name for c in cls.__mro__ for name in getattr(c, '__slots__', ())
+                 if name not in names)
+
+
+# slots that are not serialized, such as annotations added by later passes,
+# start out as None on loaded nodes
+UNSET = tuple(unset_slots(cls, fields) for cls, fields in FIELDS)
+
+
+class SerializeError(Exception):
+    pass
+
+
+class Encoder:
+    def __init__(self):
+        self.out = bytearray(HEADER.size)
+        self.strings = {}
+
+    def string(self, s):
+        index = self.strings.get(s)
+        if index is None:
+            index = self.strings[s] = len(self.strings)
+        return index
+
+    def varint(self, buf, n):
+        while n > 0x7f:
+            buf.append(n & 0x7f | 0x80)
+            n >>= 7
+        buf.append(n)
+
+    def node(self, root):
+        # children are written before their parent: a node is written when
+        # it comes off the stack the second time, with the offsets of its
+        # children at the end of `offsets`
+        if root is None:
+            return 0
+        offsets = []
+        stack = [(root, None)]
+        while stack:
+            node, children = stack.pop()
+            if children is None:
+                tag = TAGS.get(type(node))
+                if tag is None:
+                    raise SerializeError('cannot serialize {}'.format(type(node).__name__))
+                children = []
+                for name, kind in FIELDS[tag][1]:
+                    value = getattr(node, name)
+                    if value is None:
+                        continue
+                    if kind == NODE:
+                        children.append(value)
+                    elif kind == NODES or kind == STATEMENTS:
+                        for n in value:
+                            if n is not None:
+                                children.append(n)
+                stack.append((node, children))
+                for i in range(len(children) - 1, -1, -1):
+                    stack.append((children[i], None))
+            else:
+                first = len(offsets) - len(children)
+                offset = self.write(node, iter(offsets[first:]))
+                del offsets[first:]
+                offsets.append(offset)
+        return offsets[0]
+
+    def write(self, node, child_offsets):
+        tag = TAGS[type(node)]
+        fields = bytearray([tag])
+        for name, kind in FIELDS[tag][1]:
+            value = getattr(node, name)
+            if kind == NODE:
+                self.varint(fields, 0 if value is None else next(child_offsets))
+            elif kind == NODES or kind == STATEMENTS:
+                if value is None:
+                    fields.append(0)
+                    continue
+                self.varint(fields, len(value) + 1)
+                for n in value:
+                    self.varint(fields, 0 if n is None else next(child_offsets))
+            elif kind == STRING:
+                self.varint(fields, self.string(value))
+            elif kind == INTEGER:
+                # zigzag, so that negative values stay short
+                self.varint(fields, value * 2 if value >= 0 else -value * 2 - 1)
+            else:
+                fields.append(1 if value else 0)
+
+        offset = len(self.out)
+        self.out += fields
+        return offset
+
+    def finish(self, root):
+        strings_offset = len(self.out)
+        data = [s.encode('utf-8', 'surrogatepass') for s in self.strings]
+        self.out += U32.pack(len(data))
+        end = 0
+        for d in data:
+            end += len(d)
+            self.out += U32.pack(end)
+        for d in data:
+            self.out += d
+
+        HEADER.pack_into(self.out, 0, MAGIC, VERSION, strings_offset, root)
+        return bytes(self.out)
+
+
+def dumps(program):
+    encoder = Encoder()
+    root = encoder.node(program)
+    return encoder.finish(root)
+
+
+class LazyNodes(MutableSequence):
+    """Sequence of nodes decoded on first access. Iterating decodes the
+    ones left, and then runs over a list; nodes set or inserted replace
+    the decoded ones."""
+
+    def __init__(self, decoder, offsets):
+        self.decoder = decoder
+        # the offset of each node, 0 once it is set
+        self.offsets = offsets
+        self.nodes = [None] * len(offsets)
+        self.complete = False
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        node = self.nodes[i]
+        if node is None:
+            node = self.nodes[i] = self.decoder.node(self.offsets[i])
+        return node
+
+    def __iter__(self):
+        if not self.complete:
+            nodes = self.nodes
+            offsets = self.offsets
+            decode = self.decoder.node
+            for i in range(len(nodes)):
+                if nodes[i] is None:
+                    nodes[i] = decode(offsets[i])
+            self.complete = True
+        return iter(self.nodes)
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            value = list(value)
+            self.nodes[i] = value
+            self.offsets[i] = [0] * len(value)
+        else:
+            self.nodes[i] = value
+            self.offsets[i] = 0
+
+    def __delitem__(self, i):
+        del self.nodes[i]
+        del self.offsets[i]
+
+    def insert(self, i, value):
+        self.nodes.insert(i, value)
+        self.offsets.insert(i, 0)
+
+
+class Decoder:
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer).cast('B')
+        magic, version, self.strings_offset, self.root = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise SerializeError('not a serialized monkey program')
+        if version != VERSION:
+            raise SerializeError('unsupported format version {}'.format(version))
+        self.strings_count, = U32.unpack_from(self.buffer, self.strings_offset)
+        self.strings = [None] * self.strings_count
+
+    def string(self, index):
+        s = self.strings[index]
+        if s is None:
+            ends_offset = self.strings_offset + U32.size
+            data_offset = ends_offset + U32.size * self.strings_count
+            start = U32.unpack_from(self.buffer, ends_offset + U32.size * (index - 1))[0] if index else 0
+            end, = U32.unpack_from(self.buffer, ends_offset + U32.size * index)
+            data = self.buffer[data_offset + start:data_offset + end]
+            s = self.strings[index] = str(data, 'utf-8', 'surrogatepass')
+        return s
+
+    def varint(self, offset):
+        buffer = self.buffer
+        n = 0
+        shift = 0
+        while True:
+            b = buffer[offset]
+            offset += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n, offset
+            shift += 7
+
+    def node(self, offset):
+        # a child is decoded after its parent, from the stack of (offset,
+        # the parent or list holding it, its field name or index)
+        if offset == 0:
+            return None
+
+        buffer = self.buffer
+        varint = self.varint
+        holder = [None]
+        stack = [(offset, holder, 0)]
+        while stack:
+            offset, parent, key = stack.pop()
+            tag = buffer[offset]
+            cls, fields = FIELDS[tag]
+            node = cls.__new__(cls)
+            for name in UNSET[tag]:
+                setattr(node, name, None)
+            offset += 1
+            for name, kind in fields:
+                # most varints are a single byte, so that case is read inline
+                value = buffer[offset]
+                if value < 0x80:
+                    offset += 1
+                else:
+                    value, offset = varint(offset)
+
+                if kind == NODE:
+                    if value != 0:
+                        stack.append((value, node, name))
+                    value = None
+                elif kind == STRING:
+                    value = self.string(value)
+                elif kind == NODES or kind == STATEMENTS:
+                    if value == 0:
+                        value = None
+                    else:
+                        offsets = []
+                        for _ in range(value - 1):
+                            child, offset = varint(offset)
+                            offsets.append(child)
+                        if kind == STATEMENTS:
+                            value = LazyNodes(self, offsets)
+                        else:
+                            value = [None] * len(offsets)
+                            for i, child in enumerate(offsets):
+                                if child != 0:
+                                    stack.append((child, value, i))
+                elif kind == INTEGER:
+                    value = value >> 1 if value & 1 == 0 else -(value >> 1) - 1
+                else:
+                    value = value == 1
+                setattr(node, name, value)
+            if type(key) is int:
+                parent[key] = node
+            else:
+                setattr(parent, key, node)
+        return holder[0]
+
+
+def loads(buffer):
+    """Load a program from `buffer` (bytes, memoryview or mmap) lazily.
+
+    The buffer is referenced, not copied, until every node and string has
+    been decoded, so an mmap must stay open while the program is in use.
+    """
+    decoder = Decoder(buffer)
+    return decoder.node(decoder.root)
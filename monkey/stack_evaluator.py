@@ -0,0 +1,288 @@
+"""Evaluation that keeps its pending work on an explicit stack.
+
+`stack_evaluate` gives the same results as `evaluate`, but one loop
+replaces the mutual recursion of the eval functions, so a Monkey call
+costs no Python frame and recursion depth is limited only by memory.
+
+A call whose value is the value of the calling function, such as
+`return f(x)` or the last expression of a body or of an if branch, does
+not push a frame: the callee returns straight to the caller's caller.
+Tail-recursive loops therefore run in constant space.
+
+Errors raise EvaluationError as in `evaluate`. A return statement drops
+every frame above the call it returns from, wherever it is in an
+expression; outside a call it drops the frames above the program, which
+stops on the ReturnValue it is handed.
+"""
+from .ast import (
+    IntegerLiteral,
+    Program,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BlockStatement,
+    IfExpression,
+    ReturnStatement,
+    LetStatement,
+    CallExpression,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .object import (
+    ReturnValue,
+    Function,
+    Builtin,
+    Array,
+)
+from .evaluator import (
+    NULL,
+    FALSE,
+    evaluate,
+    eval_integer_literal,
+    EvaluationError,
+    new_error,
+    call_builtin,
+    extend_function_env,
+    eval_prefix_expression,
+    eval_infix_expression,
+    eval_index_expression,
+)
+from .resolver import resolve
+
+# frame kinds; a frame is pushed as its entries followed by its kind, and
+# the node of a frame stays on the stack while its value is computed
+PROGRAM = 1        # program, index of the statement being evaluated
+BLOCK = 2          # block, index of the statement being evaluated
+PREFIX_RIGHT = 3   # expression
+INFIX_LEFT = 4     # expression
+INFIX_RIGHT = 5    # expression, left value
+IF_CONDITION = 6   # expression
+RETURN_VALUE = 7   # (none)
+LET_VALUE = 8      # statement
+CALL_FUNCTION = 9  # expression
+CALL_ARGUMENT = 10  # expression, function, values so far
+CALL_RETURN = 11   # environment of the caller
+ARRAY_ELEMENT = 12  # literal, values so far
+INDEX_LEFT = 13    # expression
+INDEX_VALUE = 14   # expression, left value
+
+
+def stack_evaluate(node, env):
+    root = node
+    stack = []
+    try:
+        return run(node, env, stack)
+    except EvaluationError as e:
+        if e.error.position is None and stack:
+            # the node of the frame that failed
+            e.error.position = getattr(stack[-1], 'position', None)
+        if type(root) is Program:
+            return e.error
+        raise
+
+
+def run(node, env, stack):
+    push = stack.append
+    pop = stack.pop
+    # heights of the stack at the CALL_RETURN frames, innermost last, and
+    # above the program frame
+    calls = []
+    base = 0
+
+    while True:
+        # evaluate `node` in `env`, pushing a frame for each node that
+        # waits for the value of a child, until a value is produced
+        while True:
+            node_type = type(node)
+            if node_type is ExpressionStatement:
+                node = node.expression
+            elif node_type is InfixExpression:
+                push(node)
+                push(INFIX_LEFT)
+                node = node.left
+            elif node_type is IntegerLiteral:
+                value = node.constant
+                if value is None:
+                    value = eval_integer_literal(node, env)
+                break
+            elif node_type is CallExpression:
+                push(node)
+                push(CALL_FUNCTION)
+                node = node.function
+            elif node_type is IfExpression:
+                push(node)
+                push(IF_CONDITION)
+                node = node.condition
+            elif node_type is BlockStatement:
+                statements = node.statements
+                if len(statements) == 0:
+                    value = None
+                    break
+                if len(statements) > 1:
+                    push(node)
+                    push(0)
+                    push(BLOCK)
+                # the last statement gives the value of the block
+                node = statements[0]
+            elif node_type is ReturnStatement:
+                if not stack or stack[-1] != CALL_RETURN:
+                    push(RETURN_VALUE)
+                # else the value is returned by the call anyway
+                node = node.value
+            elif node_type is PrefixExpression:
+                push(node)
+                push(PREFIX_RIGHT)
+                node = node.right
+            elif node_type is IndexExpression:
+                push(node)
+                push(INDEX_LEFT)
+                node = node.left
+            elif node_type is LetStatement:
+                push(node)
+                push(LET_VALUE)
+                node = node.value
+            elif node_type is ArrayLiteral:
+                if len(node.elements) == 0:
+                    value = Array([])
+                    break
+                push(node)
+                push([])
+                push(ARRAY_ELEMENT)
+                node = node.elements[0]
+            elif node_type is Program:
+                resolve(node, env)
+                if len(node.statements) == 0:
+                    value = None
+                    break
+                push(node)
+                push(0)
+                push(PROGRAM)
+                base = len(stack)
+                node = node.statements[0]
+            else:
+                # identifiers, literals and nodes added with register()
+                value = evaluate(node, env)
+                break
+
+        # hand `value` to the frames waiting for it, until one of them
+        # has another node to evaluate
+        while True:
+            if not stack:
+                return value
+            kind = pop()
+
+            if kind == INFIX_LEFT:
+                push(value)
+                push(INFIX_RIGHT)
+                node = stack[-3].right
+                break
+            elif kind == INFIX_RIGHT:
+                left = pop()
+                value = eval_infix_expression(stack[-1].operator, left, value)
+                pop()
+            elif kind == BLOCK or kind == PROGRAM:
+                i = pop() + 1
+                statements = stack[-1].statements
+                if type(value) is ReturnValue:
+                    # returned from the program, or from the root node
+                    pop()
+                    if kind == PROGRAM:
+                        value = value.value
+                    continue
+                if i == len(statements):
+                    pop()
+                    continue
+                if i < len(statements) - 1 or kind == PROGRAM:
+                    push(i)
+                    push(kind)
+                else:
+                    pop()
+                node = statements[i]
+                break
+            elif kind == CALL_RETURN:
+                env = pop()
+                calls.pop()
+            elif kind == CALL_FUNCTION or kind == CALL_ARGUMENT:
+                if kind == CALL_FUNCTION:
+                    fn = value
+                    args = []
+                    arguments = stack[-1].arguments
+                    if len(arguments) > 0:
+                        push(fn)
+                        push(args)
+                        push(CALL_ARGUMENT)
+                        node = arguments[0]
+                        break
+                else:
+                    args = pop()
+                    args.append(value)
+                    arguments = stack[-2].arguments
+                    if len(args) < len(arguments):
+                        push(args)
+                        push(CALL_ARGUMENT)
+                        node = arguments[len(args)]
+                        break
+                    fn = pop()
+
+                if isinstance(fn, Function):
+                    pop()
+                    call_env = extend_function_env(fn, args)
+                    # in tail position the frame of the current call
+                    # returns the value to the caller
+                    if not stack or stack[-1] != CALL_RETURN:
+                        push(env)
+                        push(CALL_RETURN)
+                        calls.append(len(stack))
+                    env = call_env
+                    node = fn.body
+                    break
+                elif isinstance(fn, Builtin):
+                    value = call_builtin(fn, args)
+                else:
+                    raise EvaluationError(new_error('not a function: {}', fn.type_()))
+                pop()
+            elif kind == IF_CONDITION:
+                expression = pop()
+                if value is not FALSE and value is not NULL:
+                    node = expression.consequence
+                    break
+                elif expression.alternative is not None:
+                    node = expression.alternative
+                    break
+                value = None
+            elif kind == RETURN_VALUE:
+                if calls:
+                    # up to the CALL_RETURN frame, which takes the value
+                    del stack[calls[-1]:]
+                else:
+                    del stack[base:]
+                    value = ReturnValue(value)
+            elif kind == LET_VALUE:
+                name = pop().name
+                if name.slot is not None:
+                    env.values[name.slot] = value
+                else:
+                    env.set(name.value, value)
+                value = None
+            elif kind == PREFIX_RIGHT:
+                value = eval_prefix_expression(stack[-1].operator, value)
+                pop()
+            elif kind == INDEX_LEFT:
+                push(value)
+                push(INDEX_VALUE)
+                node = stack[-3].index
+                break
+            elif kind == INDEX_VALUE:
+                left = pop()
+                value = eval_index_expression(left, value)
+                pop()
+            elif kind == ARRAY_ELEMENT:
+                elements = stack[-1]
+                elements.append(value)
+                literal = stack[-2].elements
+                if len(elements) < len(literal):
+                    push(ARRAY_ELEMENT)
+                    node = literal[len(elements)]
+                    break
+                del stack[-2:]
+                value = Array(elements)
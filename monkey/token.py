@@ -34,6 +34,10 @@ class TokenType(Enum):
     LBRACKET = 28
     RBRACKET = 29
 
+    # members are singletons compared by identity, so they can hash by
+    # identity too instead of Enum's hash of the member name in Python
+    __hash__ = object.__hash__
+
     def __int__(self):
         return self.value
 
@@ -43,9 +47,12 @@ class TokenType(Enum):
 
 
 class Token:
-    def __init__(self, _type, literal):
+    __slots__ = ('_type', '_literal', 'position')
+
+    def __init__(self, _type, literal, position=-1):
         self._type = _type
         self._literal = literal
+        self.position = position
 
     def __repr__(self):
         template = 'Token({}, "{}")'
@@ -0,0 +1,427 @@
+from array import array
+
+from .token import Token, TokenType
+from .ast import (
+    Program,
+    LetStatement,
+    Identifier,
+    ReturnStatement,
+    ExpressionStatement,
+    IntegerLiteral,
+    PrefixExpression,
+    InfixExpression,
+    IfExpression,
+    BlockStatement,
+    Boolean,
+    FunctionLiteral,
+    CallExpression,
+    StringLiteral,
+    ArrayLiteral,
+    IndexExpression,
+)
+from .parser import LOWEST, PREFIX, precedences
+from .lexer import (
+    KEYWORDS,
+    OPERATORS,
+    TOKEN_PATTERN,
+    IDENT_GROUP,
+    INT_GROUP,
+    STRING_GROUP,
+    OPERATOR_GROUP,
+)
+
+# token kind ids are the TokenType values, which are contiguous from 0
+TOKEN_TYPES = tuple(sorted(TokenType, key=int))
+
+IDENT_ID = int(TokenType.IDENT)
+INT_ID = int(TokenType.INT)
+STRING_ID = int(TokenType.STRING)
+ILLEGAL_ID = int(TokenType.ILLEGAL)
+EOF_ID = int(TokenType.EOF)
+KEYWORD_IDS = {k: int(v) for k, v in KEYWORDS.items()}
+OPERATOR_IDS = {k: int(v) for k, v in OPERATORS.items()}
+PRECEDENCES = {int(k): v for k, v in precedences.items()}
+
+LET_ID = int(TokenType.LET)
+RETURN_ID = int(TokenType.RETURN)
+ASSIGN_ID = int(TokenType.ASSIGN)
+SEMICOLON_ID = int(TokenType.SEMICOLON)
+COMMA_ID = int(TokenType.COMMA)
+LPAREN_ID = int(TokenType.LPAREN)
+RPAREN_ID = int(TokenType.RPAREN)
+LBRACE_ID = int(TokenType.LBRACE)
+RBRACE_ID = int(TokenType.RBRACE)
+LBRACKET_ID = int(TokenType.LBRACKET)
+RBRACKET_ID = int(TokenType.RBRACKET)
+TRUE_ID = int(TokenType.TRUE)
+ELSE_ID = int(TokenType.ELSE)
+
+
+class TokenStream:
+    """Columnar token stream over a source string.
+
+    Token i has kind id `kinds[i]` and its literal is the slice
+    `source[starts[i]:starts[i] + lengths[i]]`; for strings the slice is the
+    contents between the quotes. The stream always ends with one EOF token.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        offset_code = 'I' if len(source) < 2 ** 32 else 'Q'
+        self.kinds = array('B')
+        self.starts = array(offset_code)
+        self.lengths = array(offset_code)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, i):
+        return TOKEN_TYPES[self.kinds[i]]
+
+    def literal(self, i):
+        start = self.starts[i]
+        return self.source[start:start + self.lengths[i]]
+
+    def token(self, i):
+        kind = self.kinds[i]
+        start = self.starts[i]
+        literal = self.source[start:start + self.lengths[i]]
+        if kind == STRING_ID:
+            # the token starts at the opening quote
+            start -= 1
+        return Token(TOKEN_TYPES[kind], literal, start)
+
+    def reader(self):
+        return TokenStreamReader(self)
+
+    def parser(self):
+        return StreamParser(self)
+
+
+class TokenStreamReader:
+    """Lexer-compatible cursor over a `TokenStream`, for code that wants
+    `Token` objects; `StreamParser` reads the stream without them."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.index = 0
+
+    def next_token(self):
+        stream = self.stream
+        i = self.index
+        if i < len(stream.kinds) - 1:
+            self.index = i + 1
+        return stream.token(i)
+
+
+class At:
+    """Stands for a token when creating AST nodes, which only read its
+    position."""
+    __slots__ = ('position',)
+
+
+class StreamParser:
+    """Parser over a `TokenStream` that builds the same trees and reports
+    the same errors as `Parser`.
+
+    It looks at token i and i + 1 by index: kinds are compared as ids from
+    the `kinds` array, and a literal is sliced from the source only for the
+    nodes that keep it. No `Token` object is created.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.source = stream.source
+        self.kinds = stream.kinds
+        self.starts = stream.starts
+        self.lengths = stream.lengths
+        self.last = len(stream.kinds) - 1
+        # the current token; the one after it is the peek token
+        self.index = 0
+        self.errors = []
+        self.at_token = At()
+        self.prefix_parse_functions = {
+            IDENT_ID: self.parse_identifier,
+            INT_ID: self.parse_integer_literal,
+            int(TokenType.BANG): self.parse_prefix_expression,
+            int(TokenType.MINUS): self.parse_prefix_expression,
+            TRUE_ID: self.parse_boolean,
+            int(TokenType.FALSE): self.parse_boolean,
+            LPAREN_ID: self.parse_grouped_expression,
+            int(TokenType.IF): self.parse_if_expression,
+            int(TokenType.FUNCTION): self.parse_function_literal,
+            STRING_ID: self.parse_string_literal,
+            LBRACKET_ID: self.parse_array_literal,
+        }
+        self.infix_parse_functions = {kind: self.parse_infix_expression for kind in PRECEDENCES}
+        self.infix_parse_functions[LPAREN_ID] = self.parse_call_expression
+        self.infix_parse_functions[LBRACKET_ID] = self.parse_index_expression
+
+    def cur_kind(self):
+        return self.kinds[self.index]
+
+    def peek_kind(self):
+        i = self.index
+        return self.kinds[i + 1 if i < self.last else i]
+
+    def next_token(self):
+        # past the end, the stream repeats its EOF token as a lexer does
+        if self.index < self.last:
+            self.index += 1
+
+    def at(self):
+        # the position of the current token, for a node constructor
+        i = self.index
+        start = self.starts[i]
+        at = self.at_token
+        # a string token starts at the opening quote
+        at.position = start - 1 if self.kinds[i] == STRING_ID else start
+        return at
+
+    def literal(self):
+        i = self.index
+        start = self.starts[i]
+        return self.source[start:start + self.lengths[i]]
+
+    def expect_peek(self, kind):
+        if self.peek_kind() == kind:
+            self.next_token()
+            return True
+        self.errors.append('expected next token to be {}, got {} instead'.format(
+            TOKEN_TYPES[kind], TOKEN_TYPES[self.peek_kind()]))
+        return False
+
+    def parse_program(self):
+        program = Program()
+        while self.kinds[self.index] != EOF_ID:
+            statement = self.parse_statement()
+            if statement is not None:
+                program.statements.append(statement)
+            self.next_token()
+        return program
+
+    def parse_statement(self):
+        kind = self.kinds[self.index]
+        if kind == LET_ID:
+            return self.parse_let_statement()
+        elif kind == RETURN_ID:
+            return self.parse_return_statement()
+        return self.parse_expression_statement()
+
+    def parse_let_statement(self):
+        statement = LetStatement(self.at())
+        if not self.expect_peek(IDENT_ID):
+            return None
+        statement.name = Identifier(self.at(), self.literal())
+        if not self.expect_peek(ASSIGN_ID):
+            return None
+        self.next_token()
+        statement.value = self.parse_expression(LOWEST)
+        if self.peek_kind() == SEMICOLON_ID:
+            self.next_token()
+        return statement
+
+    def parse_return_statement(self):
+        statement = ReturnStatement(self.at())
+        self.next_token()
+        statement.value = self.parse_expression(LOWEST)
+        if self.peek_kind() == SEMICOLON_ID:
+            self.next_token()
+        return statement
+
+    def parse_expression_statement(self):
+        statement = ExpressionStatement(self.at())
+        statement.expression = self.parse_expression(LOWEST)
+        if self.peek_kind() == SEMICOLON_ID:
+            self.next_token()
+        return statement
+
+    def parse_expression(self, precedence):
+        kind = self.kinds[self.index]
+        prefix = self.prefix_parse_functions.get(kind)
+        if prefix is None:
+            self.errors.append('no prefix parse function for {} found'.format(TOKEN_TYPES[kind]))
+            return None
+        left = prefix()
+
+        while True:
+            peek = self.peek_kind()
+            if peek == SEMICOLON_ID or precedence >= PRECEDENCES.get(peek, LOWEST):
+                return left
+            self.next_token()
+            left = self.infix_parse_functions[peek](left)
+
+    def parse_identifier(self):
+        return Identifier(self.at(), self.literal())
+
+    def parse_integer_literal(self):
+        integer = IntegerLiteral(self.at())
+        literal = self.literal()
+        try:
+            value = int(literal)
+        except Exception as e:
+            print('{}: Could not parse {} as integer'.format(e, literal))
+            return None
+        integer.value = value
+        return integer
+
+    def parse_string_literal(self):
+        return StringLiteral(self.at(), self.literal())
+
+    def parse_boolean(self):
+        return Boolean(self.at(), self.kinds[self.index] == TRUE_ID)
+
+    def parse_prefix_expression(self):
+        expression = PrefixExpression(self.at(), self.literal())
+        self.next_token()
+        expression.right = self.parse_expression(PREFIX)
+        return expression
+
+    def parse_infix_expression(self, left):
+        expression = InfixExpression(self.at(), self.literal(), left)
+        precedence = PRECEDENCES[self.kinds[self.index]]
+        self.next_token()
+        expression.right = self.parse_expression(precedence)
+        return expression
+
+    def parse_grouped_expression(self):
+        self.next_token()
+        expression = self.parse_expression(LOWEST)
+        if not self.expect_peek(RPAREN_ID):
+            return None
+        return expression
+
+    def parse_if_expression(self):
+        expression = IfExpression(self.at())
+        if not self.expect_peek(LPAREN_ID):
+            return None
+        self.next_token()
+        expression.condition = self.parse_expression(LOWEST)
+        if not self.expect_peek(RPAREN_ID) or not self.expect_peek(LBRACE_ID):
+            return None
+        expression.consequence = self.parse_block_statement()
+        if self.peek_kind() == ELSE_ID:
+            self.next_token()
+            if not self.expect_peek(LBRACE_ID):
+                return None
+            expression.alternative = self.parse_block_statement()
+        return expression
+
+    def parse_block_statement(self):
+        block = BlockStatement(self.at())
+        self.next_token()
+        kinds = self.kinds
+        while kinds[self.index] != RBRACE_ID and kinds[self.index] != EOF_ID:
+            statement = self.parse_statement()
+            if statement is not None:
+                block.statements.append(statement)
+            self.next_token()
+        return block
+
+    def parse_function_literal(self):
+        literal = FunctionLiteral(self.at())
+        if not self.expect_peek(LPAREN_ID):
+            return None
+        literal.parameters = self.parse_function_parameters()
+        if not self.expect_peek(LBRACE_ID):
+            return None
+        literal.body = self.parse_block_statement()
+        return literal
+
+    def parse_function_parameters(self):
+        identifiers = []
+        if self.peek_kind() == RPAREN_ID:
+            self.next_token()
+            return identifiers
+        self.next_token()
+        identifiers.append(Identifier(self.at(), self.literal()))
+        while self.peek_kind() == COMMA_ID:
+            self.next_token()
+            self.next_token()
+            identifiers.append(Identifier(self.at(), self.literal()))
+        if not self.expect_peek(RPAREN_ID):
+            return None
+        return identifiers
+
+    def parse_expression_list(self, end):
+        expressions = []
+        if self.peek_kind() == end:
+            self.next_token()
+            return expressions
+        self.next_token()
+        expressions.append(self.parse_expression(LOWEST))
+        while self.peek_kind() == COMMA_ID:
+            self.next_token()
+            self.next_token()
+            expressions.append(self.parse_expression(LOWEST))
+        if not self.expect_peek(end):
+            return None
+        return expressions
+
+    def parse_call_expression(self, function):
+        expression = CallExpression(self.at(), function)
+        expression.arguments = self.parse_expression_list(RPAREN_ID)
+        return expression
+
+    def parse_array_literal(self):
+        array = ArrayLiteral(self.at())
+        array.elements = self.parse_expression_list(RBRACKET_ID)
+        return array
+
+    def parse_index_expression(self, left):
+        expression = IndexExpression(self.at(), left)
+        self.next_token()
+        expression.index = self.parse_expression(LOWEST)
+        if not self.expect_peek(RBRACKET_ID):
+            return None
+        return expression
+
+
+def tokenize(source):
+    """Lex the whole of `source` into a `TokenStream`."""
+    stream = TokenStream(source)
+    kinds_append = stream.kinds.append
+    starts_append = stream.starts.append
+    lengths_append = stream.lengths.append
+    match = TOKEN_PATTERN.match
+    size = len(source)
+    position = 0
+
+    while True:
+        m = match(source, position)
+        group = m.lastindex
+        if group == IDENT_GROUP:
+            start, position = m.span(group)
+            kinds_append(KEYWORD_IDS.get(m.group(group), IDENT_ID))
+        elif group == OPERATOR_GROUP:
+            start, position = m.span(group)
+            kinds_append(OPERATOR_IDS[m.group(group)])
+        elif group == STRING_GROUP:
+            start, end = m.span(group)
+            kinds_append(STRING_ID)
+            starts_append(start)
+            lengths_append(end - start)
+            position = m.end()
+            continue
+        elif group == INT_GROUP:
+            start, position = m.span(group)
+            # Lexer reads numbers with str.isdigit, which accepts non-ascii digits
+            while position < size and source[position].isdigit():
+                position += 1
+            kinds_append(INT_ID)
+        else:
+            start = position = m.end()
+            if start >= size:
+                kinds_append(EOF_ID)
+                starts_append(start)
+                lengths_append(0)
+                return stream
+            position += 1
+            if source[start].isdigit():
+                while position < size and source[position].isdigit():
+                    position += 1
+                kinds_append(INT_ID)
+            else:
+                kinds_append(ILLEGAL_ID)
+        starts_append(start)
+        lengths_append(position - start)
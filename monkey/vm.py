@@ -0,0 +1,398 @@
+"""Virtual machine running the bytecode of monkey.compiler.
+
+One loop runs every call: the state of the calling functions is saved in
+`frames` and Monkey calls use no Python frames. Operands live in a value
+stack allocated up front and indexed by `sp`, the locals of a call in a
+list of their own, which the closures created by the call keep.
+
+The results, and the errors with their positions, are those of
+`monkey.evaluator.evaluate`.
+"""
+from .builtins import builtins
+from .code import DefinitionType
+from .object import (
+    Integer,
+    Array,
+    Builtin,
+    Function,
+    Closure,
+    CompiledFunction,
+    Error,
+    NULL,
+    TRUE,
+    FALSE,
+    small_integers,
+)
+from .resolver import BUILTIN_SLOTS, BUILTIN_VALUES
+from .evaluator import (
+    EvaluationError,
+    new_error,
+    apply_function,
+    call_builtin,
+    eval_infix_expression,
+    eval_prefix_expression,
+    eval_index_expression,
+)
+
+STACK_SIZE = 2048
+
+OP_CONSTANT = int(DefinitionType.op_constant)
+OP_POP = int(DefinitionType.op_pop)
+OP_ADD = int(DefinitionType.op_add)
+OP_SUB = int(DefinitionType.op_sub)
+OP_MUL = int(DefinitionType.op_mul)
+OP_DIV = int(DefinitionType.op_div)
+OP_TRUE = int(DefinitionType.op_true)
+OP_FALSE = int(DefinitionType.op_false)
+OP_NULL = int(DefinitionType.op_null)
+OP_EQUAL = int(DefinitionType.op_equal)
+OP_NOT_EQUAL = int(DefinitionType.op_not_equal)
+OP_GREATER_THAN = int(DefinitionType.op_greater_than)
+OP_LESS_THAN = int(DefinitionType.op_less_than)
+OP_MINUS = int(DefinitionType.op_minus)
+OP_BANG = int(DefinitionType.op_bang)
+OP_JUMP_NOT_TRUTHY = int(DefinitionType.op_jump_not_truthy)
+OP_JUMP = int(DefinitionType.op_jump)
+OP_GET_GLOBAL = int(DefinitionType.op_get_global)
+OP_SET_GLOBAL = int(DefinitionType.op_set_global)
+OP_GET_LOCAL = int(DefinitionType.op_get_local)
+OP_SET_LOCAL = int(DefinitionType.op_set_local)
+OP_GET_BUILTIN = int(DefinitionType.op_get_builtin)
+OP_GET_FREE = int(DefinitionType.op_get_free)
+OP_ARRAY = int(DefinitionType.op_array)
+OP_INDEX = int(DefinitionType.op_index)
+OP_CALL = int(DefinitionType.op_call)
+OP_RETURN_VALUE = int(DefinitionType.op_return_value)
+OP_CLOSURE = int(DefinitionType.op_closure)
+OP_GET_LOCAL_CONSTANT = int(DefinitionType.op_get_local_constant)
+OP_ADD_LOCAL_CONSTANT = int(DefinitionType.op_add_local_constant)
+OP_SUB_LOCAL_CONSTANT = int(DefinitionType.op_sub_local_constant)
+OP_COMPARE_JUMP = int(DefinitionType.op_compare_jump)
+OP_RETURN_LOCAL = int(DefinitionType.op_return_local)
+
+# operator of the arithmetic and comparison opcodes, for
+# eval_infix_expression
+INFIX_OPERATORS = {
+    OP_ADD: '+',
+    OP_SUB: '-',
+    OP_MUL: '*',
+    OP_DIV: '/',
+    OP_EQUAL: '==',
+    OP_NOT_EQUAL: '!=',
+    OP_GREATER_THAN: '>',
+    OP_LESS_THAN: '<',
+}
+
+
+class VM:
+    def __init__(self, bytecode, globals_=None):
+        # pass the globals of a previous VM to run a program compiled with
+        # the state of the previous compiler, as in the REPL
+        self.constants = bytecode['constants']
+        self.main = CompiledFunction(bytecode['instructions'], 0, [], None,
+                                     bytecode['positions'], bytecode['lookups'])
+        num_globals = len(bytecode['globals'])
+        if globals_ is None:
+            globals_ = [None] * num_globals
+        elif len(globals_) < num_globals:
+            globals_.extend([None] * (num_globals - len(globals_)))
+        self.globals = globals_
+        # builtin index -> index of the global of the same name, declared
+        # after functions that read the builtin were compiled, as in the REPL
+        self.shadowed = {BUILTIN_SLOTS[name]: i for i, name in enumerate(bytecode['globals'])
+                         if name in BUILTIN_SLOTS}
+        self.stack = [None] * max(STACK_SIZE, 2 * len(self.main.instructions))
+
+    def lookup(self, info, free):
+        # the value of a variable that is not assigned yet
+        name, candidates, global_index, position = info
+        for depth, slot in candidates:
+            value = free[depth - 1][slot]
+            if value is not None:
+                return value
+        if global_index is not None:
+            value = self.globals[global_index]
+            if value is not None:
+                return value
+        builtin = builtins.get(name)
+        if builtin is not None:
+            return builtin
+        raise EvaluationError(Error('identifier not found: {}'.format(name), position))
+
+    def run(self):
+        """Run the program; its value, or the Error it stopped with."""
+        stack = self.stack
+        constants = self.constants
+        globals_ = self.globals
+        shadowed = self.shadowed
+
+        # the state of the running function; callers are saved in frames
+        # as (fn, instructions, ip, locals, free, base) tuples
+        frames = []
+        fn = self.main
+        ins = fn.instructions
+        ip = 0
+        locals_ = None
+        free = ()
+        base = 0
+        sp = 0
+
+        try:
+            while True:
+                op = ins[ip]
+                if op == OP_GET_LOCAL:
+                    value = locals_[ins[ip + 1]]
+                    if value is None:
+                        value = self.lookup(fn.lookups[ip], free)
+                    stack[sp] = value
+                    sp += 1
+                    ip += 2
+                elif op == OP_CONSTANT:
+                    stack[sp] = constants[(ins[ip + 1] << 8) | ins[ip + 2]]
+                    sp += 1
+                    ip += 3
+                elif op == OP_ADD_LOCAL_CONSTANT or op == OP_SUB_LOCAL_CONSTANT:
+                    left = locals_[ins[ip + 1]]
+                    if left is None:
+                        left = self.lookup(fn.lookups[ip], free)
+                    right = constants[(ins[ip + 2] << 8) | ins[ip + 3]]
+                    if type(left) is Integer and type(right) is Integer:
+                        if op == OP_ADD_LOCAL_CONSTANT:
+                            result = left.value + right.value
+                        else:
+                            result = left.value - right.value
+                        if type(result) is int and -256 <= result <= 1024:
+                            value = small_integers[result + 256]
+                        else:
+                            value = Integer(result)
+                    else:
+                        value = eval_infix_expression('+' if op == OP_ADD_LOCAL_CONSTANT else '-', left, right)
+                    stack[sp] = value
+                    sp += 1
+                    ip += 4
+                elif op == OP_GET_LOCAL_CONSTANT:
+                    value = locals_[ins[ip + 1]]
+                    if value is None:
+                        value = self.lookup(fn.lookups[ip], free)
+                    stack[sp] = value
+                    stack[sp + 1] = constants[(ins[ip + 2] << 8) | ins[ip + 3]]
+                    sp += 2
+                    ip += 4
+                elif op == OP_COMPARE_JUMP:
+                    right = stack[sp - 1]
+                    left = stack[sp - 2]
+                    comparison = ins[ip + 1]
+                    if type(left) is Integer and type(right) is Integer:
+                        left = left.value
+                        right = right.value
+                        if comparison == OP_LESS_THAN:
+                            truth = left < right
+                        elif comparison == OP_GREATER_THAN:
+                            truth = left > right
+                        elif comparison == OP_EQUAL:
+                            truth = left == right
+                        else:
+                            truth = left != right
+                    else:
+                        value = eval_infix_expression(INFIX_OPERATORS[comparison], left, right)
+                        truth = value is not FALSE and value is not NULL
+                    sp -= 2
+                    if truth:
+                        ip += 4
+                    else:
+                        ip = (ins[ip + 2] << 8) | ins[ip + 3]
+                elif op == OP_RETURN_LOCAL:
+                    value = locals_[ins[ip + 1]]
+                    if value is None:
+                        value = self.lookup(fn.lookups[ip], free)
+                    if not frames:
+                        return value
+                    sp = base
+                    stack[sp] = value
+                    sp += 1
+                    fn, ins, ip, locals_, free, base = frames.pop()
+                elif op == OP_JUMP_NOT_TRUTHY:
+                    sp -= 1
+                    value = stack[sp]
+                    if value is FALSE or value is NULL:
+                        ip = (ins[ip + 1] << 8) | ins[ip + 2]
+                    else:
+                        ip += 3
+                elif op == OP_GET_GLOBAL:
+                    value = globals_[(ins[ip + 1] << 8) | ins[ip + 2]]
+                    if value is None:
+                        value = self.lookup(fn.lookups[ip], free)
+                    stack[sp] = value
+                    sp += 1
+                    ip += 3
+                elif op == OP_CALL:
+                    num_args = ins[ip + 1]
+                    callee = stack[sp - 1 - num_args]
+                    if type(callee) is Closure:
+                        code = callee.fn
+                        num_parameters = len(code.parameters)
+                        if num_args < num_parameters:
+                            raise EvaluationError(new_error(
+                                'wrong number of arguments: want={}, got={}', num_parameters, num_args))
+                        frames.append((fn, ins, ip + 2, locals_, free, base))
+                        # the arguments are the first locals; extra
+                        # arguments are ignored, as by evaluate
+                        locals_ = stack[sp - num_args:sp - num_args + num_parameters]
+                        if code.num_locals > num_parameters:
+                            locals_.extend([None] * (code.num_locals - num_parameters))
+                        base = sp = sp - num_args - 1
+                        fn = code
+                        ins = code.instructions
+                        free = callee.free
+                        ip = 0
+                        if sp + len(ins) > len(stack):
+                            # a function pushes at most one value per instruction
+                            stack.extend([None] * (len(stack) + len(ins)))
+                        continue
+                    args = stack[sp - num_args:sp]
+                    if type(callee) is Builtin:
+                        value = call_builtin(callee, args)
+                    elif isinstance(callee, Function):
+                        value = apply_function(callee, args)
+                    else:
+                        raise EvaluationError(new_error('not a function: {}', callee.type_()))
+                    sp -= num_args
+                    stack[sp - 1] = value
+                    ip += 2
+                elif op == OP_RETURN_VALUE:
+                    value = stack[sp - 1]
+                    if not frames:
+                        return value
+                    sp = base
+                    stack[sp] = value
+                    sp += 1
+                    fn, ins, ip, locals_, free, base = frames.pop()
+                elif op == OP_ADD or op == OP_SUB:
+                    right = stack[sp - 1]
+                    left = stack[sp - 2]
+                    if type(left) is Integer and type(right) is Integer:
+                        if op == OP_ADD:
+                            result = left.value + right.value
+                        else:
+                            result = left.value - right.value
+                        if type(result) is int and -256 <= result <= 1024:
+                            value = small_integers[result + 256]
+                        else:
+                            value = Integer(result)
+                    else:
+                        value = eval_infix_expression(INFIX_OPERATORS[op], left, right)
+                    sp -= 1
+                    stack[sp - 1] = value
+                    ip += 1
+                elif op == OP_LESS_THAN or op == OP_GREATER_THAN or op == OP_EQUAL or op == OP_NOT_EQUAL:
+                    right = stack[sp - 1]
+                    left = stack[sp - 2]
+                    if type(left) is Integer and type(right) is Integer:
+                        left = left.value
+                        right = right.value
+                        if op == OP_LESS_THAN:
+                            value = TRUE if left < right else FALSE
+                        elif op == OP_GREATER_THAN:
+                            value = TRUE if left > right else FALSE
+                        elif op == OP_EQUAL:
+                            value = TRUE if left == right else FALSE
+                        else:
+                            value = TRUE if left != right else FALSE
+                    else:
+                        value = eval_infix_expression(INFIX_OPERATORS[op], left, right)
+                    sp -= 1
+                    stack[sp - 1] = value
+                    ip += 1
+                elif op == OP_JUMP:
+                    ip = (ins[ip + 1] << 8) | ins[ip + 2]
+                elif op == OP_GET_FREE:
+                    value = free[ins[ip + 1] - 1][ins[ip + 2]]
+                    if value is None:
+                        value = self.lookup(fn.lookups[ip], free)
+                    stack[sp] = value
+                    sp += 1
+                    ip += 3
+                elif op == OP_GET_BUILTIN:
+                    index = ins[ip + 1]
+                    value = None
+                    if index in shadowed:
+                        value = globals_[shadowed[index]]
+                    stack[sp] = value if value is not None else BUILTIN_VALUES[index]
+                    sp += 1
+                    ip += 2
+                elif op == OP_SET_LOCAL:
+                    sp -= 1
+                    locals_[ins[ip + 1]] = stack[sp]
+                    ip += 2
+                elif op == OP_SET_GLOBAL:
+                    sp -= 1
+                    globals_[(ins[ip + 1] << 8) | ins[ip + 2]] = stack[sp]
+                    ip += 3
+                elif op == OP_POP:
+                    sp -= 1
+                    ip += 1
+                elif op == OP_INDEX:
+                    index = stack[sp - 1]
+                    left = stack[sp - 2]
+                    if type(left) is Array and type(index) is Integer:
+                        elements = left.elements
+                        index = index.value
+                        value = elements[index] if 0 <= index < len(elements) else NULL
+                    else:
+                        value = eval_index_expression(left, index)
+                    sp -= 1
+                    stack[sp - 1] = value
+                    ip += 1
+                elif op == OP_ARRAY:
+                    num_elements = (ins[ip + 1] << 8) | ins[ip + 2]
+                    elements = stack[sp - num_elements:sp]
+                    sp -= num_elements
+                    stack[sp] = Array(elements)
+                    sp += 1
+                    ip += 3
+                elif op == OP_CLOSURE:
+                    code = constants[(ins[ip + 1] << 8) | ins[ip + 2]]
+                    stack[sp] = Closure(code, free if locals_ is None else (locals_,) + free)
+                    sp += 1
+                    ip += 3
+                elif op == OP_MUL or op == OP_DIV:
+                    right = stack[sp - 1]
+                    left = stack[sp - 2]
+                    value = eval_infix_expression(INFIX_OPERATORS[op], left, right)
+                    sp -= 1
+                    stack[sp - 1] = value
+                    ip += 1
+                elif op == OP_MINUS:
+                    right = stack[sp - 1]
+                    if type(right) is Integer:
+                        result = -right.value
+                        value = small_integers[result + 256] if type(result) is int and -256 <= result <= 1024 \
+                            else Integer(result)
+                    else:
+                        value = eval_prefix_expression('-', right)
+                    stack[sp - 1] = value
+                    ip += 1
+                elif op == OP_BANG:
+                    right = stack[sp - 1]
+                    stack[sp - 1] = TRUE if right is FALSE or right is NULL else FALSE
+                    ip += 1
+                elif op == OP_TRUE:
+                    stack[sp] = TRUE
+                    sp += 1
+                    ip += 1
+                elif op == OP_FALSE:
+                    stack[sp] = FALSE
+                    sp += 1
+                    ip += 1
+                elif op == OP_NULL:
+                    stack[sp] = None
+                    sp += 1
+                    ip += 1
+                else:
+                    raise EvaluationError(new_error('unknown opcode: {}', op))
+        except EvaluationError as e:
+            # the instruction that failed is the one at ip in fn
+            error = e.error
+            if error.position is None:
+                error.position = fn.positions.get(ip)
+            return error
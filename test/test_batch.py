@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+from monkey.batch import check_paths, chunk_files, collect_files
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'sub'))
+        self.files = {
+            'a.mk': 'let x = 5; x + 1;',
+            'b.mk': 'let = 5;',
+            'sub/c.mk': 'fn(x, y) { x * y }(2, 3);',
+            'notes.txt': 'not a script',
+        }
+        for name, source in self.files.items():
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write(source)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_collect_files(self):
+        files = collect_files([self.directory, self.path('notes.txt')])
+        self.assertEqual(files, [self.path('a.mk'), self.path('b.mk'), self.path('sub/c.mk'), self.path('notes.txt')])
+
+    def test_chunk_files(self):
+        files = collect_files([self.directory])
+        self.assertEqual(chunk_files(files, 1), [[f] for f in files])
+        self.assertEqual(chunk_files(files, 10 ** 6), [files])
+
+    def check(self, workers):
+        results = {r.path: r for r in check_paths([self.directory, self.path('missing.mk')], workers)}
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[self.path('a.mk')].errors, [])
+        self.assertEqual(results[self.path('a.mk')].statements, 2)
+        self.assertEqual(len(results[self.path('b.mk')].errors), 2)
+        self.assertEqual(results[self.path('sub/c.mk')].statements, 1)
+        self.assertEqual(len(results[self.path('missing.mk')].errors), 1)
+
+    def test_sequential(self):
+        self.check(1)
+
+    def test_process_pool(self):
+        self.check(2)
@@ -0,0 +1,99 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from monkey import bytecode_file
+from monkey.bytecode_file import dumps, loads, dump, load, HEADER
+from monkey.compiler import Compiler
+from monkey.main import main
+from monkey.object import CompiledFunction
+from monkey.peephole import optimize
+from monkey.serialize import SerializeError
+from monkey.vm import VM
+from test.test_evaluator import EvaluatorTests
+
+
+def compile_program(test, input):
+    compiler = Compiler()
+    compiler.compile(EvaluatorTests.parse(test, input))
+    return optimize(compiler.bytecode())
+
+
+class TestBytecodeFileVM(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        return VM(loads(dumps(compile_program(self, input)))).run()
+
+
+class TestBytecodeFile(unittest.TestCase):
+    input = 'let f = fn(n, s) { if (n < 2) { s } else { f(n - 1, s + "!") } }; [f(3, "hi"), -70000, len]'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def test_round_trip(self):
+        bytecode = compile_program(self, self.input)
+        loaded = loads(dumps(bytecode))
+        self.assertEqual(bytes(loaded['instructions']), bytes(bytecode['instructions']))
+        self.assertEqual(loaded['globals'], bytecode['globals'])
+        self.assertEqual(dict(loaded['positions']), bytecode['positions'])
+        self.assertEqual(dict(loaded['lookups']), bytecode['lookups'])
+        self.assertEqual(len(loaded['constants']), len(bytecode['constants']))
+        for a, b in zip(bytecode['constants'], loaded['constants']):
+            self.assertIs(type(a), type(b))
+            if type(a) is CompiledFunction:
+                self.assertEqual(bytes(b.instructions), bytes(a.instructions))
+                self.assertEqual(b.num_locals, a.num_locals)
+                self.assertEqual(b.parameters, a.parameters)
+                self.assertEqual(b.body, str(a.body))
+                self.assertEqual(dict(b.positions), a.positions)
+                self.assertEqual(dict(b.lookups), a.lookups)
+            else:
+                self.assertEqual(b.value, a.value)
+
+    def test_instructions_are_not_copied(self):
+        data = dumps(compile_program(self, self.input))
+        loaded = loads(data)
+        self.assertIsInstance(loaded['instructions'], memoryview)
+        self.assertIs(loaded['instructions'].obj, data)
+
+    def test_load_maps_the_file(self):
+        path = os.path.join(self.directory, 'program.mkc')
+        dump(compile_program(self, self.input), path)
+        result = VM(load(path)).run()
+        self.assertEqual(result.inspect(), '[hi!!, -70000, builtin function]')
+
+    def test_error_positions(self):
+        input = 'let f = fn(x) { x + y }; f(1)'
+        result = VM(loads(dumps(compile_program(self, input)))).run()
+        self.assertEqual(result.message, 'identifier not found: y')
+        self.assertEqual(result.position, input.index('y'))
+
+    def test_bad_files(self):
+        data = dumps(compile_program(self, '1'))
+        with self.assertRaises(SerializeError):
+            loads(b'MKA' + data[3:])
+        with self.assertRaises(SerializeError):
+            loads(data[:3] + bytes([bytecode_file.VERSION + 1]) + data[4:])
+        with self.assertRaises(SerializeError):
+            loads(data[:4] + b'\0\0\0\0' + data[8:])
+        with self.assertRaises(SerializeError):
+            loads(data[:HEADER.size - 1])
+
+    def test_compile_and_run_cli(self):
+        source = os.path.join(self.directory, 'program.mk')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(self.input)
+        self.assertEqual(main(['--compile', source]), 0)
+        compiled = os.path.join(self.directory, 'program.mkc')
+        self.assertTrue(bytecode_file.is_bytecode_file(compiled))
+        self.assertFalse(bytecode_file.is_bytecode_file(source))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main([compiled]), 0)
+        self.assertEqual(out.getvalue(), '[hi!!, -70000, builtin function]\n')
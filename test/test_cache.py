@@ -0,0 +1,121 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from monkey import cache, serialize
+from monkey.cache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    input_str = 'let add = fn(x) { x + 1; }; add(5);'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_memory_hit(self):
+        c = ParseCache(self.directory)
+        program, errors = c.parse(self.input_str)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(program.statements), 2)
+        self.assertIs(c.parse(self.input_str)[0], program)
+        self.assertEqual((c.memory_hits, c.disk_hits, c.misses), (1, 0, 1))
+
+    def test_disk_hit(self):
+        program, _ = ParseCache(self.directory).parse(self.input_str)
+        c = ParseCache(self.directory)
+        cached, errors = c.parse(self.input_str)
+        self.assertEqual((c.memory_hits, c.disk_hits, c.misses), (0, 1, 0))
+        self.assertEqual(str(cached), str(program))
+        self.assertEqual(errors, [])
+
+    def test_errors_are_cached(self):
+        ParseCache(self.directory).parse('let = 5;')
+        c = ParseCache(self.directory)
+        _, errors = c.parse('let = 5;')
+        self.assertEqual(c.disk_hits, 1)
+        self.assertEqual(len(errors), 2)
+
+    def test_source_change_misses(self):
+        c = ParseCache(self.directory)
+        c.parse(self.input_str)
+        c.parse(self.input_str + ' ')
+        self.assertEqual(c.misses, 2)
+
+    def test_version_change_misses(self):
+        ParseCache(self.directory).parse(self.input_str)
+        c = ParseCache(self.directory)
+        c.version = 'other'
+        c.parse(self.input_str)
+        self.assertEqual(c.misses, 1)
+
+    def test_corrupt_file_is_reparsed(self):
+        c = ParseCache(self.directory)
+        c.parse(self.input_str)
+        with open(c.path(c.key(self.input_str)), 'wb') as f:
+            f.write(b'garbage')
+        c = ParseCache(self.directory)
+        program, _ = c.parse(self.input_str)
+        self.assertEqual(c.misses, 1)
+        self.assertEqual(len(program.statements), 2)
+
+    def test_pickled_errors_are_not_loaded(self):
+        c = ParseCache(self.directory)
+        program, _ = c.parse(self.input_str)
+        data = serialize.dumps(program)
+        with open(c.path(c.key(self.input_str)), 'wb') as f:
+            f.write(cache.LENGTH.pack(len(data)) + data + pickle.dumps(['error']))
+        c = ParseCache(self.directory)
+        _, errors = c.parse(self.input_str)
+        self.assertEqual((c.disk_hits, c.misses), (0, 1))
+        self.assertEqual(errors, [])
+
+    def test_corrupt_body_is_reparsed(self):
+        c = ParseCache(self.directory)
+        c.parse(self.input_str)
+        path = c.path(c.key(self.input_str))
+        with open(path, 'rb') as f:
+            data = bytearray(f.read())
+        # a byte of the serialized nodes, past the header
+        data[40] ^= 0xff
+        with open(path, 'wb') as f:
+            f.write(data)
+        c = ParseCache(self.directory)
+        program, _ = c.parse(self.input_str)
+        self.assertEqual((c.disk_hits, c.misses), (0, 1))
+        self.assertEqual(str(program), 'let add = (x)(x + 1);add(5)')
+
+    def test_failed_write_is_skipped(self):
+        c = ParseCache(self.directory)
+        with mock.patch.object(os, 'replace', side_effect=OSError('disk full')):
+            program, errors = c.parse(self.input_str)
+        self.assertEqual((len(program.statements), errors), (2, []))
+        self.assertEqual(os.listdir(self.directory), [])
+        with mock.patch.object(cache.tempfile, 'mkstemp', side_effect=PermissionError('read-only')):
+            program, _ = ParseCache(self.directory).parse(self.input_str)
+        self.assertEqual(len(program.statements), 2)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_rewrite_is_counted_once(self):
+        c = ParseCache(self.directory)
+        c.parse(self.input_str)
+        c.disk_bytes = c.total_disk_bytes()
+        c.memory.clear()
+        c.store(c.key(self.input_str), c.parse(self.input_str))
+        self.assertEqual(c.disk_bytes, c.total_disk_bytes())
+
+    def test_eviction(self):
+        c = ParseCache(self.directory, memory_entries=2, max_disk_bytes=4096)
+        for i in range(50):
+            c.parse('let x = {};'.format(i))
+        self.assertEqual(len(c.memory), 2)
+        self.assertLessEqual(c.total_disk_bytes(), 4096)
+        self.assertEqual(c.total_disk_bytes(), c.disk_bytes)
+        self.assertGreater(len(os.listdir(self.directory)), 0)
+
+    def test_fingerprint_is_stable(self):
+        self.assertEqual(cache.interpreter_fingerprint(), cache.interpreter_fingerprint())
@@ -0,0 +1,28 @@
+import unittest
+from monkey.closure_compiler import CompiledFunction, compile_node, execute
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from test.test_evaluator import EvaluatorTests
+
+
+class TestClosureCompiler(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        return execute(self.parse(input), Environment())
+
+    def test_compiled_once(self):
+        run = compile_node(self.parse('let a = fn(x) { x * 2 }; a(a(3))'))
+        self.assertEqual(run(Environment()).value, 12)
+        self.assertEqual(run(Environment()).value, 12)
+
+    def test_environment_persists(self):
+        env = Environment()
+        execute(self.parse('let a = 2;'), env)
+        self.assertEqual(execute(self.parse('a * 3'), env).value, 6)
+
+    def test_mixed_engines(self):
+        env = Environment()
+        execute(self.parse('let compiled = fn(x) { x + 1 };'), env)
+        evaluate(self.parse('let evaluated = fn(x) { compiled(x) * 2 };'), env)
+        self.assertIsInstance(env.get('compiled'), CompiledFunction)
+        self.assertEqual(execute(self.parse('evaluated(4)'), env).value, 10)
+        self.assertEqual(evaluate(self.parse('compiled(4)'), env).value, 5)
@@ -0,0 +1,53 @@
+import unittest
+from monkey.code import DefinitionType, Instructions, lookup, make, read_operands, read_uint16
+
+
+class TestCode(unittest.TestCase):
+    def test_make(self):
+        tests = [
+            (DefinitionType.op_constant, [65534], bytes([int(DefinitionType.op_constant), 255, 254])),
+            (DefinitionType.op_add, [], bytes([int(DefinitionType.op_add)])),
+            (DefinitionType.op_get_local, [255], bytes([int(DefinitionType.op_get_local), 255])),
+            (DefinitionType.op_get_free, [2, 255], bytes([int(DefinitionType.op_get_free), 2, 255])),
+        ]
+        for op, operands, expected in tests:
+            self.assertEqual(make(int(op), operands), expected)
+        self.assertEqual(make(255, []), b'')
+
+    def test_read_operands(self):
+        tests = [
+            (DefinitionType.op_constant, [65535], 3),
+            (DefinitionType.op_get_local, [255], 2),
+            (DefinitionType.op_get_free, [1, 255], 3),
+            (DefinitionType.op_pop, [], 1),
+        ]
+        for op, operands, length in tests:
+            instruction = b'\x00' + make(int(op), operands)
+            view = memoryview(instruction)
+            self.assertEqual(list(read_operands(int(op), view, 1)), operands)
+            self.assertEqual(len(instruction) - 1, length)
+        self.assertEqual(read_uint16(make(int(DefinitionType.op_jump), [1234]), 1), 1234)
+
+    def test_instructions_string(self):
+        instructions = Instructions()
+        for op, operands in [
+            (DefinitionType.op_add, []),
+            (DefinitionType.op_get_local, [1]),
+            (DefinitionType.op_constant, [2]),
+            (DefinitionType.op_constant, [65535]),
+            (DefinitionType.op_get_free, [1, 255]),
+        ]:
+            instructions += make(int(op), operands)
+        self.assertEqual(str(instructions), (
+            '0000 op_add\n'
+            '0001 op_get_local 1\n'
+            '0003 op_constant 2\n'
+            '0006 op_constant 65535\n'
+            '0009 op_get_free 1 255\n'
+        ))
+
+    def test_definitions(self):
+        for op in DefinitionType:
+            definition = lookup(int(op))
+            self.assertEqual(definition['name'], op.name)
+        self.assertIsNone(lookup(255))
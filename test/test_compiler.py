@@ -0,0 +1,234 @@
+import unittest
+from monkey.code import DefinitionType as Op, make
+from monkey.compiler import (
+    CompileError,
+    Compiler,
+    Symbol,
+    SymbolTable,
+    GLOBAL_SCOPE,
+    LOCAL_SCOPE,
+    BUILTIN_SCOPE,
+    FREE_SCOPE,
+    new_symbol_table,
+)
+from monkey.lexer import Lexer
+from monkey.object import CompiledFunction, Integer
+from monkey.parser import Parser
+
+
+def instructions(*parts):
+    result = b''
+    for part in parts:
+        op, operands = (part[0], part[1:]) if isinstance(part, tuple) else (part, ())
+        result += make(int(op), operands)
+    return result
+
+
+class TestCompiler(unittest.TestCase):
+    def compile(self, input):
+        p = Parser(Lexer(input))
+        program = p.parse_program()
+        self.assertEqual(p.errors, [])
+        compiler = Compiler()
+        compiler.compile(program)
+        return compiler.bytecode()
+
+    def assert_compiles(self, input, expected, constants):
+        bytecode = self.compile(input)
+        self.assertEqual(bytes(bytecode['instructions']), expected, input)
+        values = [c.value for c in bytecode['constants']]
+        self.assertEqual(values, constants, input)
+
+    def test_expressions(self):
+        self.assert_compiles('1 + 2; 1 * 2', instructions(
+            (Op.op_constant, 0), (Op.op_constant, 1), Op.op_add, Op.op_pop,
+            (Op.op_constant, 0), (Op.op_constant, 1), Op.op_mul, Op.op_return_value,
+        ), [1, 2])
+        self.assert_compiles('-1 < 2 == !true', instructions(
+            (Op.op_constant, 0), Op.op_minus, (Op.op_constant, 1), Op.op_less_than,
+            Op.op_true, Op.op_bang, Op.op_equal, Op.op_return_value,
+        ), [1, 2])
+        self.assert_compiles('"a" + "b" + "a"', instructions(
+            (Op.op_constant, 0), (Op.op_constant, 1), Op.op_add,
+            (Op.op_constant, 0), Op.op_add, Op.op_return_value,
+        ), ['a', 'b'])
+        self.assert_compiles('[1, 2][0]', instructions(
+            (Op.op_constant, 0), (Op.op_constant, 1), (Op.op_array, 2),
+            (Op.op_constant, 2), Op.op_index, Op.op_return_value,
+        ), [1, 2, 0])
+
+    def test_conditionals(self):
+        self.assert_compiles('if (true) { 10 }; 3333;', instructions(
+            Op.op_true,
+            (Op.op_jump_not_truthy, 10),
+            (Op.op_constant, 0),
+            (Op.op_jump, 11),
+            Op.op_null,
+            Op.op_pop,
+            (Op.op_constant, 1),
+            Op.op_return_value,
+        ), [10, 3333])
+        self.assert_compiles('if (true) { 10 } else { 20 }', instructions(
+            Op.op_true,
+            (Op.op_jump_not_truthy, 10),
+            (Op.op_constant, 0),
+            (Op.op_jump, 13),
+            (Op.op_constant, 1),
+            Op.op_return_value,
+        ), [10, 20])
+
+    def test_let_statements(self):
+        self.assert_compiles('let a = 1; let b = a; b', instructions(
+            (Op.op_constant, 0), (Op.op_set_global, 0),
+            (Op.op_get_global, 0), (Op.op_set_global, 1),
+            (Op.op_get_global, 1), Op.op_return_value,
+        ), [1])
+        # let has no value; later lets are declared before the program runs
+        self.assert_compiles('b; let b = 1;', instructions(
+            (Op.op_get_global, 0), Op.op_pop,
+            (Op.op_constant, 0), (Op.op_set_global, 0), Op.op_null, Op.op_return_value,
+        ), [1])
+        self.assert_compiles('len; let f = len;', instructions(
+            (Op.op_get_builtin, 0), Op.op_pop,
+            (Op.op_get_builtin, 0), (Op.op_set_global, 0), Op.op_null, Op.op_return_value,
+        ), [])
+
+    def test_functions(self):
+        bytecode = self.compile('let f = fn(a) { let b = a; return b; 1 }; f(2)')
+        self.assertEqual(bytes(bytecode['instructions']), instructions(
+            (Op.op_closure, 1), (Op.op_set_global, 0),
+            (Op.op_get_global, 0), (Op.op_constant, 2), (Op.op_call, 1), Op.op_return_value,
+        ))
+        fn = bytecode['constants'][1]
+        self.assertIsInstance(fn, CompiledFunction)
+        self.assertEqual(fn.num_locals, 2)
+        self.assertEqual(fn.parameters, ['a'])
+        self.assertEqual(bytes(fn.instructions), instructions(
+            (Op.op_get_local, 0), (Op.op_set_local, 1),
+            (Op.op_get_local, 1), Op.op_return_value, Op.op_pop,
+            (Op.op_constant, 0), Op.op_return_value,
+        ))
+        self.assertEqual(bytes(self.compile('fn() {}')['constants'][0].instructions), instructions(
+            Op.op_null, Op.op_return_value,
+        ))
+        # the position of the call, for errors
+        self.assertEqual(bytecode['positions'], {12: 43})
+
+    def test_closures(self):
+        bytecode = self.compile('let x = 1; fn(a) { fn(b) { let c = a + b + x; fn() { c + d } } }')
+        outer, middle, inner = (bytecode['constants'][i] for i in (3, 2, 1))
+        self.assertEqual(bytes(outer.instructions), instructions(
+            (Op.op_closure, 2), Op.op_return_value,
+        ))
+        self.assertEqual(bytes(middle.instructions), instructions(
+            (Op.op_get_free, 1, 0), (Op.op_get_local, 0), Op.op_add,
+            (Op.op_get_global, 0), Op.op_add, (Op.op_set_local, 1),
+            (Op.op_closure, 1), Op.op_return_value,
+        ))
+        self.assertEqual(bytes(inner.instructions), instructions(
+            (Op.op_get_free, 1, 1), (Op.op_get_global, 1), Op.op_add, Op.op_return_value,
+        ))
+        self.assertEqual(bytecode['globals'], ['x', 'd'])
+
+    def test_lookups(self):
+        # an unassigned variable is looked up in the scopes further out
+        bytecode = self.compile('let x = 1; fn(x) { fn(x) { if (false) { let x = 2; } x } }')
+        inner = bytecode['constants'][2]
+        self.assertEqual(inner.lookups, {15: ('x', ((1, 0),), 0, 53)})
+
+    def test_persistent_state(self):
+        symbol_table = new_symbol_table()
+        constants = []
+        first = Compiler(symbol_table, constants)
+        first.compile(Parser(Lexer('let a = 7;')).parse_program())
+        second = Compiler(symbol_table, constants)
+        second.compile(Parser(Lexer('a + 7')).parse_program())
+        self.assertEqual(bytes(second.bytecode()['instructions']), instructions(
+            (Op.op_get_global, 0), (Op.op_constant, 0), Op.op_add, Op.op_return_value,
+        ))
+        self.assertEqual(len(constants), 1)
+
+
+def names(n):
+    # n distinct identifiers, which cannot contain digits
+    result = []
+    for i in range(n):
+        name = 'x'
+        while True:
+            name += chr(ord('a') + i % 26)
+            i //= 26
+            if i == 0:
+                break
+        result.append(name)
+    return result
+
+
+class TestCompilerLimits(unittest.TestCase):
+    def compile(self, input, compiler=None):
+        compiler = compiler or Compiler()
+        compiler.compile(Parser(Lexer(input)).parse_program())
+        return compiler
+
+    def assert_limit(self, at_limit, over_limit, message, new_compiler=Compiler):
+        self.compile(at_limit, new_compiler())
+        with self.assertRaises(CompileError) as cm:
+            self.compile(over_limit, new_compiler())
+        self.assertEqual(str(cm.exception), message)
+
+    def test_constants(self):
+        def new_compiler():
+            return Compiler(constants=[Integer(i) for i in range(65535)])
+        self.assert_limit('"a"', '"a"; "b"', 'constant index 65536 is over the limit of 65535 for op_constant',
+                          new_compiler)
+
+    def test_jump_targets(self):
+        # the jump over the alternative of `if (true) { 1 }` goes to its end
+        target = len(instructions(Op.op_true, (Op.op_jump_not_truthy, 0), (Op.op_constant, 0), (Op.op_jump, 0),
+                                  Op.op_null))
+
+        def after(size):
+            def new_compiler():
+                compiler = Compiler()
+                compiler.scopes[-1].instructions += make(int(Op.op_null)) * size
+                return compiler
+            return new_compiler
+        self.compile('if (true) { 1 }', after(65535 - target)())
+        with self.assertRaises(CompileError) as cm:
+            self.compile('if (true) { 1 }', after(65536 - target)())
+        self.assertEqual(str(cm.exception), 'jump target 65536 is over the limit of 65535 for op_jump')
+
+    def test_long_program(self):
+        with self.assertRaises(CompileError) as cm:
+            self.compile(''.join('let {} = 1;'.format(n) for n in names(12000)) + 'if (true) { 1 }')
+        self.assertIn('is over the limit of 65535 for op_jump', str(cm.exception))
+
+    def test_arguments(self):
+        self.assert_limit('let f = fn() {{ 1 }}; f({})'.format(', '.join(['1'] * 255)),
+                          'let f = fn() {{ 1 }}; f({})'.format(', '.join(['1'] * 256)),
+                          'number of arguments 256 is over the limit of 255 for op_call')
+
+    def test_locals(self):
+        def function(n):
+            return 'fn() {{ {} 1 }}'.format(''.join('let {} = 1;'.format(name) for name in names(n)))
+        self.assert_limit(function(256), function(257), 'local index 256 is over the limit of 255 for op_set_local')
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_resolve(self):
+        table = new_symbol_table()
+        table.define('a')
+        local = SymbolTable(table)
+        local.define('b')
+        nested = SymbolTable(local)
+        nested.define('c')
+        nested.define('c')
+        self.assertEqual(nested.resolve('a'), Symbol('a', GLOBAL_SCOPE, 0))
+        self.assertEqual(nested.resolve('b'), Symbol('b', FREE_SCOPE, 0, 1))
+        self.assertEqual(nested.resolve('c'), Symbol('c', LOCAL_SCOPE, 0))
+        self.assertEqual(nested.resolve('len'), Symbol('len', BUILTIN_SCOPE, 0))
+        self.assertIsNone(nested.resolve('d'))
+        self.assertEqual(nested.num_definitions, 1)
+
+    def test_define_shadows_builtin(self):
+        table = new_symbol_table()
+        self.assertEqual(table.define('len'), Symbol('len', GLOBAL_SCOPE, 0))
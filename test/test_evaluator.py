@@ -0,0 +1,282 @@
+import gc
+import unittest
+from monkey import evaluator
+from monkey.ast import Node, IntegerLiteral
+from monkey.environment import Environment
+from monkey.evaluator import evaluate, register
+from monkey.lexer import Lexer
+from monkey.object import Integer, Boolean, String, Array, Function, Error, strings
+from monkey.parser import Parser
+
+
+class EvaluatorTests:
+    """Programs and the results every execution engine must produce.
+
+    Subclasses implement run_program(input) and return the resulting object.
+    """
+
+    def parse(self, input):
+        p = Parser(Lexer(input))
+        program = p.parse_program()
+        self.assertEqual(p.errors, [])
+        return program
+
+    def assert_results(self, cases):
+        for input, expected in cases:
+            evaluated = self.run_program(input)
+            if expected is None:
+                self.assertIsNone(evaluated, input)
+            elif isinstance(expected, bool):
+                self.assertIsInstance(evaluated, Boolean, input)
+                self.assertEqual(evaluated.value, expected, input)
+            elif isinstance(expected, int):
+                self.assertIsInstance(evaluated, Integer, input)
+                self.assertEqual(evaluated.value, expected, input)
+            elif isinstance(expected, str):
+                self.assertIsInstance(evaluated, String, input)
+                self.assertEqual(evaluated.value, expected, input)
+            else:
+                self.assertIsInstance(evaluated, Array, input)
+                self.assertEqual([e.value for e in evaluated.elements], expected, input)
+
+    def test_integer_expressions(self):
+        self.assert_results([
+            ('5', 5),
+            ('-10', -10),
+            ('5 + 5 + 5 + 5 - 10', 10),
+            ('2 * 2 * 2 * 2 * 2', 32),
+            ('-50 + 100 + -50', 0),
+            ('20 + 2 * -10', 0),
+            ('2 * (5 + 10)', 30),
+            ('3 * 3 * 3 + 10', 37),
+            ('(5 + 10 * 2 + 15 - 5) * 2 + -10', 60),
+        ])
+
+    def test_arithmetic_on_division_results(self):
+        # `/` makes a float, which the other operators take as any value
+        cases = [
+            ('4 / 2 + 1', 3.0),
+            ('-(4 / 2)', -2.0),
+            ('let x = 9 / 3; x * 2', 6.0),
+            ('let f = fn(x) { x - 1 }; f(10 / 4)', 1.5),
+            ('let f = fn(x) { x + 1000 }; f(1 / 2)', 1000.5),
+        ]
+        for input, expected in cases:
+            evaluated = self.run_program(input)
+            self.assertIsInstance(evaluated, Integer, input)
+            self.assertEqual((type(evaluated.value), evaluated.value), (float, expected), input)
+
+    def test_boolean_expressions(self):
+        self.assert_results([
+            ('true', True),
+            ('false', False),
+            ('1 < 2', True),
+            ('1 > 2', False),
+            ('1 == 1', True),
+            ('1 != 1', False),
+            ('true == true', True),
+            ('true != false', True),
+            ('(1 < 2) == true', True),
+            ('(1 > 2) == true', False),
+            ('!true', False),
+            ('!!true', True),
+            ('!5', False),
+            ('!!5', True),
+        ])
+
+    def test_if_else_expressions(self):
+        self.assert_results([
+            ('if (true) { 10 }', 10),
+            ('if (false) { 10 }', None),
+            ('if (1) { 10 }', 10),
+            ('if (1 < 2) { 10 } else { 20 }', 10),
+            ('if (1 > 2) { 10 } else { 20 }', 20),
+        ])
+
+    def test_return_statements(self):
+        self.assert_results([
+            ('return 10;', 10),
+            ('return 10; 9;', 10),
+            ('9; return 2 * 5; 9;', 10),
+            ('if (10 > 1) { if (10 > 1) { return 10; } return 1; }', 10),
+            ('let f = fn(x) { if (x > 1) { return x; } 0 }; f(5) + f(0)', 5),
+        ])
+
+    def test_returns_inside_expressions(self):
+        # a return leaves the expressions around it unfinished
+        self.assert_results([
+            ('let f = fn() { (if (true) { return 3; } else { 0 }) + 1 }; f()', 3),
+            ('let a = if (true) { return 3; }; 5', 3),
+            ('let g = fn(x) { x }; g(if (true) { return 3; }) + 1', 3),
+            ('let g = fn(x) { x }; let f = fn() { g(if (true) { return 3; }) + 1 }; f() + 10', 13),
+            ('let f = fn() { [1, -(if (true) { return 3; }), 2] }; f()', 3),
+            ('let f = fn(x) { let y = if (x) { return x; } else { 1 }; y + 1 }; f(5) + f(false)', 7),
+        ])
+
+    def test_let_statements(self):
+        self.assert_results([
+            ('let a = 5; a;', 5),
+            ('let a = 5 * 5; a;', 25),
+            ('let a = 5; let b = a; b;', 5),
+            ('let a = 5; let b = a; let c = a + b + 5; c;', 15),
+            ('let a = 5; if (true) { let a = 6; } a', 6),
+        ])
+
+    def test_functions(self):
+        evaluated = self.run_program('fn(x) { x + 2; };')
+        self.assertIsInstance(evaluated, Function)
+        self.assertEqual([str(p) for p in evaluated.parameters], ['x'])
+        self.assert_results([
+            ('let identity = fn(x) { x; }; identity(5);', 5),
+            ('let identity = fn(x) { return x; }; identity(5);', 5),
+            ('let double = fn(x) { x * 2; }; double(5);', 10),
+            ('let add = fn(x, y) { x + y; }; add(5, 5);', 10),
+            ('let add = fn(x, y) { x + y; }; add(5 + 5, add(5, 5));', 20),
+            ('fn(x) { x; }(5)', 5),
+            ('let f = fn() { 1 }; f()', 1),
+            ('let x = 1; let f = fn(y) { x + y }; let x = 10; f(1)', 11),
+            ('let f = fn(x) { let x = x * 2; x }; let x = 3; f(4) + x', 11),
+        ])
+
+    def test_scopes(self):
+        self.assert_results([
+            ('let x = 1; let f = fn() { if (false) { let x = 2; } x }; f()', 1),
+            ('let x = 1; let f = fn() { let y = x; let x = 2; y + x }; f()', 3),
+            ('let f = fn() { let g = fn() { x }; let x = 5; g() }; f()', 5),
+            ('let a = fn(x) { fn(y) { fn(z) { let w = x * y; w + z } } }; a(2)(3)(4)', 10),
+            ('let len = fn(s) { 7 }; len("ab")', 7),
+            ('let f = fn(s) { let len = fn(x) { 1 }; len(s) }; f("abc") + len("abc")', 4),
+            ('let g = fn() { h() }; let h = fn() { 8 }; g()', 8),
+        ])
+
+    def test_errors(self):
+        cases = [
+            ('5 + true;', 'type mismatch: INTEGER + BOOLEAN', 2),
+            ('5 + true; 5;', 'type mismatch: INTEGER + BOOLEAN', 2),
+            ('-true', 'unknown operator: -BOOLEAN', 0),
+            ('true + false;', 'unknown operator: BOOLEAN + BOOLEAN', 5),
+            ('5; true + false; 5', 'unknown operator: BOOLEAN + BOOLEAN', 8),
+            ('if (10 > 1) { true + false; }', 'unknown operator: BOOLEAN + BOOLEAN', 19),
+            ('if (10 > 1) { if (10 > 1) { return true + false; } return 1; }',
+             'unknown operator: BOOLEAN + BOOLEAN', 40),
+            ('foobar', 'identifier not found: foobar', 0),
+            ('let f = fn() { x }; f()', 'identifier not found: x', 15),
+            ('"Hello" - "World"', 'unknown operator: STRING - STRING', 8),
+            ('len(1)', "argument to 'len' not supported, got INTEGER", 3),
+            ('len("one", "two")', 'wrong number of arguments. got=2, want=1', 3),
+            ('1(2)', 'not a function: INTEGER', 1),
+            ('1[0]', 'index operator not supported: INTEGER', 1),
+            ('let f = fn(x) { x + true }; [1, f(1), 2]', 'type mismatch: INTEGER + BOOLEAN', 18),
+            ('let a = fn(x) { if (x == 0) { -fn() {} } else { a(x - 1) } }; a(3)',
+             'unknown operator: -FUNCTION', 30),
+        ]
+        for input, message, position in cases:
+            evaluated = self.run_program(input)
+            self.assertIsInstance(evaluated, Error, input)
+            self.assertEqual(evaluated.message, message, input)
+            self.assertEqual(evaluated.position, position, input)
+
+    def test_shared_values(self):
+        self.assertIs(self.run_program('1 + 2'), self.run_program('3'))
+        self.assertIs(self.run_program('-5 * 2'), self.run_program('let f = fn() { -10 }; f()'))
+        self.assertIs(self.run_program('len("abc")'), self.run_program('3'))
+        self.assertIs(self.run_program('"a"'), self.run_program('let s = "a"; s'))
+        self.assertEqual(self.run_program('100000 + 1').value, 100001)
+
+    def test_closures(self):
+        self.assert_results([
+            ('let newAdder = fn(x) { fn(y) { x + y }; }; let addTwo = newAdder(2); addTwo(2);', 4),
+            ('let a = fn(x) { fn(y) { fn(z) { x + y + z } } }; a(1)(2)(3)', 6),
+            ('let apply = fn(f, x) { f(x) }; apply(fn(x) { x * 3 }, 4)', 12),
+        ])
+
+    def test_recursion(self):
+        self.assert_results([
+            ('let fib = fn(n) { if (n < 2) { return n; } fib(n - 1) + fib(n - 2) }; fib(15)', 610),
+            ('let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } }; count(50)', 50),
+        ])
+
+    def test_strings(self):
+        self.assert_results([
+            ('"Hello World!"', 'Hello World!'),
+            ('"Hello" + " " + "World!"', 'Hello World!'),
+            ('let s = fn(n) { if (n == 0) { "" } else { "ab" + s(n - 1) } }; s(3)', 'ababab'),
+        ])
+
+    def test_builtin_functions(self):
+        self.assert_results([
+            ('len("")', 0),
+            ('len("four")', 4),
+            ('len("hello world")', 11),
+            ('let l = len; l("ab")', 2),
+        ])
+
+    def test_arrays(self):
+        self.assert_results([
+            ('[1, 2 * 2, 3 + 3]', [1, 4, 6]),
+            ('[]', []),
+            ('[1, 2, 3][0]', 1),
+            ('[1, 2, 3][1]', 2),
+            ('let i = 0; [1][i];', 1),
+            ('[1, 2, 3][1 + 1];', 3),
+            ('let myArray = [1, 2, 3]; myArray[2];', 3),
+            ('let myArray = [1, 2, 3]; myArray[0] + myArray[1] + myArray[2];', 6),
+            ('let a = [1, 2, 3]; let i = a[0]; a[i]', 2),
+            ('[[1, 2], [3]][0][1]', 2),
+            ('let f = fn(x) { [x, x * 2] }; f(3)[1]', 6),
+        ])
+        self.assertIs(self.run_program('[1, 2, 3][3]'), evaluator.NULL)
+        self.assertIs(self.run_program('[1, 2, 3][-1]'), evaluator.NULL)
+
+
+class TestEvaluator(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        return evaluate(self.parse(input), Environment())
+
+    def test_environment_persists(self):
+        env = Environment()
+        evaluate(self.parse('let a = 2;'), env)
+        self.assertEqual(evaluate(self.parse('a * 3'), env).value, 6)
+
+    def test_literal_constants(self):
+        program = self.parse('let f = fn() { [123456, "s"] }; f()')
+        first = evaluate(program, Environment())
+        second = evaluate(program, Environment())
+        self.assertIsNot(first, second)
+        self.assertIs(first.elements[0], second.elements[0])
+        self.assertIs(first.elements[1], second.elements[1])
+        self.assertEqual(evaluator.NULL.inspect(), 'null')
+
+    def test_interned_strings_are_released(self):
+        program = self.parse('"a string used once"')
+        evaluate(program, Environment())
+        self.assertIn('a string used once', strings)
+        del program
+        gc.collect()
+        self.assertNotIn('a string used once', strings)
+
+    def test_register(self):
+        class Double(Node):
+            __slots__ = ('value',)
+
+        class Triple(Double):
+            __slots__ = ()
+
+        @register(Double)
+        def eval_double(node, env):
+            return Integer(evaluate(node.value, env).value * 2)
+
+        literal = self.parse('21').statements[0].expression
+        double = Double()
+        double.value = literal
+        triple = Triple()
+        triple.value = literal
+        self.assertEqual(evaluate(double, Environment()).value, 42)
+        self.assertEqual(evaluate(triple, Environment()).value, 42)
+
+        @register(Triple)
+        def eval_triple(node, env):
+            return Integer(evaluate(node.value, env).value * 3)
+
+        self.assertEqual(evaluate(triple, Environment()).value, 63)
+        self.assertIsNone(evaluate(object(), Environment()))
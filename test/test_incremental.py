@@ -0,0 +1,88 @@
+import random
+import unittest
+from monkey.ast import Node
+from monkey.incremental import IncrementalParser
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+
+
+def dump(node):
+    # positions are left out, reused statements keep the ones they were parsed with
+    if isinstance(node, list):
+        return [dump(n) for n in node]
+    if isinstance(node, Node):
+        fields = [name for cls in type(node).__mro__ for name in getattr(cls, '__slots__', ())
+                  if name != 'position']
+        return type(node).__name__, {k: dump(getattr(node, k)) for k in fields}
+    return node
+
+
+class TestIncrementalParser(unittest.TestCase):
+    input_str = '''let five = 5;
+let add = fn(x) { x + five; };
+let result = add(10);
+if (result > 10) { "big" } else { "small" };
+let list = [1, 2 * 3, add(4)];
+result == 15;
+'''
+
+    def assert_matches_full_parse(self, incremental):
+        p = Parser(Lexer(incremental.source))
+        program = p.parse_program()
+        self.assertEqual(dump(incremental.program), dump(program))
+        self.assertEqual(incremental.errors, p.errors)
+        fresh = IncrementalParser(incremental.source)
+        spans = [(incremental.starts[i], incremental.ends[i]) for i in range(len(incremental.starts))]
+        self.assertEqual(spans, [(fresh.starts[i], fresh.ends[i]) for i in range(len(fresh.starts))])
+        self.assertEqual([incremental.failed[i] for i in range(len(incremental.failed))],
+                         [i for i, s in enumerate(incremental.statements) if s is None])
+
+    def test_initial_parse(self):
+        incremental = IncrementalParser(self.input_str)
+        self.assert_matches_full_parse(incremental)
+        self.assertEqual(len(incremental.program.statements), 6)
+
+    def test_edit_reuses_untouched_statements(self):
+        incremental = IncrementalParser(self.input_str)
+        program = incremental.program
+        before = list(program.statements)
+        offset = self.input_str.index('10);')
+        incremental.edit(offset, 2, '20')
+        self.assert_matches_full_parse(incremental)
+
+        # the program is updated in place
+        self.assertIs(incremental.edit(offset, 2, '30'), program)
+        self.assert_matches_full_parse(incremental)
+
+        after = incremental.program.statements
+        self.assertIs(after[0], before[0])
+        self.assertIsNot(after[2], before[2])
+        self.assertIs(after[3], before[3])
+        self.assertIs(after[5], before[5])
+
+    def test_edits_that_change_structure(self):
+        incremental = IncrementalParser(self.input_str)
+        edits = [
+            (self.input_str.index('let add'), 0, '"'),
+            (self.input_str.index('let add'), 1, ''),
+            (0, 4, 'let '),
+            (self.input_str.index('} else'), 1, ''),
+            (self.input_str.index('} else'), 0, '}'),
+            (len(self.input_str), 0, 'let extra = 1'),
+            (self.input_str.index(';'), 1, ''),
+        ]
+        for offset, removed, inserted in edits:
+            incremental.edit(offset, removed, inserted)
+            self.assert_matches_full_parse(incremental)
+
+    def test_random_edits(self):
+        rng = random.Random(7)
+        alphabet = 'let x=1;+(){}[]"fn,! '
+        incremental = IncrementalParser(self.input_str)
+        for _ in range(300):
+            source = incremental.source
+            offset = rng.randint(0, len(source))
+            removed = rng.randint(0, min(3, len(source) - offset))
+            inserted = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 3)))
+            incremental.edit(offset, removed, inserted)
+            self.assert_matches_full_parse(incremental)
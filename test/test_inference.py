@@ -0,0 +1,91 @@
+import unittest
+from monkey import evaluator
+from monkey.ast import FunctionLiteral, InfixExpression, PrefixExpression
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.inference import specialize
+from monkey.resolver import children
+from test.test_evaluator import EvaluatorTests
+
+
+class TestSpecializedEvaluator(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        program = self.parse(input)
+        specialize(program)
+        return evaluate(program, Environment())
+
+
+class TestInference(unittest.TestCase):
+    def specialized(self, input):
+        program = EvaluatorTests.parse(self, input)
+        counts = specialize(program)
+        return program, counts
+
+    def operators(self, node, found):
+        # the infix and prefix expressions under node, operands first
+        for child in children(node):
+            self.operators(child, found)
+        if type(node) is FunctionLiteral:
+            self.operators(node.body, found)
+        if type(node) in (InfixExpression, PrefixExpression):
+            found.append((str(node), node.specialized))
+        return found
+
+    def assert_specialized(self, input, expected):
+        program, counts = self.specialized(input)
+        found = self.operators(program, [])
+        self.assertEqual(found, expected, input)
+        self.assertEqual(counts, (sum(1 for _, h in expected if h is not None), len(expected)))
+
+    def test_literals(self):
+        self.assert_specialized('1 + 2 * 3; "a" + "b"; -5; !true; true == false; 1 / 2', [
+            ('(2 * 3)', evaluator.multiply_integers),
+            ('(1 + (2 * 3))', evaluator.add_integers),
+            ('(a + b)', evaluator.concatenate_strings),
+            ('(-5)', evaluator.negate_integer),
+            ('(!true)', evaluator.eval_bang_operator_expression),
+            ('(true == false)', evaluator.equal_booleans),
+            ('(1 / 2)', None),
+        ])
+
+    def test_let_bound_names(self):
+        self.assert_specialized('let x = 1; let s = "a"; x < 2; s + s; let y = x; y - x', [
+            ('(x < 2)', evaluator.less_than_integers),
+            ('(s + s)', evaluator.concatenate_strings),
+            ('(y - x)', evaluator.subtract_integers),
+        ])
+
+    def test_conflicting_lets(self):
+        self.assert_specialized('let x = 1; x + 1; let x = "a";', [('(x + 1)', None)])
+
+    def test_parameters_and_results(self):
+        self.assert_specialized(
+            'let fib = fn(n) { if (n < 2) { return n; } fib(n - 1) + fib(n - 2) }; fib(10)', [
+                ('(n < 2)', evaluator.less_than_integers),
+                ('(n - 1)', evaluator.subtract_integers),
+                ('(n - 2)', evaluator.subtract_integers),
+                ('(fib((n - 1)) + fib((n - 2)))', evaluator.add_integers),
+            ])
+
+    def test_parameters_of_different_types(self):
+        self.assert_specialized('let f = fn(x) { x + x }; f(1); f("a")', [('(x + x)', None)])
+
+    def test_escaping_functions(self):
+        self.assert_specialized('let f = fn(x) { x + 1 }; let g = f; f(1)', [('(x + 1)', None)])
+        self.assert_specialized('let f = fn(x) { fn(y) { y + x } }; f(1)(2)', [('(y + x)', None)])
+
+    def test_builtin_results(self):
+        self.assert_specialized('len("ab") + 1', [('(len(ab) + 1)', evaluator.add_integers)])
+
+    def test_wrong_inference_falls_back(self):
+        # x is read before the let in f, so it is the outer string
+        input = 'let x = "a"; let f = fn() { let y = x + x; let x = 1; y }; f()'
+        program, counts = self.specialized(input)
+        self.assertEqual(counts, (1, 1))
+        self.assertEqual(evaluate(program, Environment()).value, 'aa')
+
+    def test_errors(self):
+        program, _ = self.specialized('let f = fn(x) { x + 1 }; f(1); f(true)')
+        result = evaluate(program, Environment())
+        self.assertEqual(result.message, 'type mismatch: BOOLEAN + INTEGER')
+        self.assertEqual(result.position, 18)
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+from monkey import evaluator, jit
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.object import Array, Error
+from test.test_evaluator import EvaluatorTests
+
+
+class TestJitEvaluator(EvaluatorTests, unittest.TestCase):
+    """The evaluator results with every function compiled after its first call."""
+
+    def run_program(self, input):
+        with mock.patch.object(evaluator, 'JIT_THRESHOLD', 1):
+            return evaluate(self.parse(input), Environment())
+
+
+class TestJit(unittest.TestCase):
+    # each function is called more than once
+    programs = [
+        'let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib(15)',
+        'let f = fn(x, y) { x * y - -x }; [f(2, 3), f(4, 5), f(-6, 7)]',
+        'let f = fn(x) { let y = x + 1; if (y > 3) { return y * 2; } y }; [f(1), f(5), f(3)]',
+        'let f = fn(x) { let y = if (x > 2) { x } else { let z = 5; z }; return if (x == 3) { 0 } else { y }; }; [f(1), f(3), f(4)]',
+        'let f = fn(x) { [x, !x, -x, x / 2, x == 2, x != 2, 1 + if (x < 2) { 10 } else { 20 }] }; [f(1), f(2), f(3)]',
+        'let f = fn(x) { if (x) { 1 } }; [f(true), f(false), f(1)]',
+        'let f = fn(s) { s + "!" }; [f("a"), f("b"), f("c")]',
+        'let f = fn(x) { x + 1 }; [f(1), f(2), f("a")]',
+        'let f = fn(a) { a[1] }; [f([1, 2]), f([3]), f([4, 5])]',
+        'let f = fn(x) { len(x) }; [f("ab"), f("abc"), f([1])]',
+        'let f = fn(x) { y }; let g = fn() { f(1) }; g(); g(); let y = 2; [g(), g()]',
+        'let f = fn(x) { x + true }; [f(1), f(2)]',
+        'let f = fn(x) { -x }; [f(1), f(true)]',
+        'let f = fn(x) { x + missing }; [f(1), f(2)]',
+        'let f = fn(x) { x[0] }; [f([1]), f(1)]',
+        'let f = fn(x) { let y = y; x }; [f(1), f(2)]',
+        'let a = 5; let f = fn(x) { let a = a + x; a }; [f(1), f(2)]',
+        'let f = fn(x) { let x = x + 1; x }; [f(1), f(2)]',
+        'let f = fn(x) { x(1) }; [f(fn(y) { y + 1 }), f(len)]',
+        'let f = fn(g) { g(2) }; [f(fn(y) { y }), f(1)]',
+        'let f = fn(x) { let g = fn(y) { x + y }; g(1) }; [f(1), f(2)]',
+        'let f = fn(x) { if (false) { 1 } }; [f(f(1)), f(f(2))]',
+        'let f = fn(x) { }; [f(1), f(2)]',
+        'let f = fn(x, y) { x }; [f(1, 2), f(3, 4, 5)]',
+    ]
+
+    def setUp(self):
+        jit.reset_stats()
+
+    def run_program(self, input, threshold):
+        with mock.patch.object(evaluator, 'JIT_THRESHOLD', threshold):
+            return evaluate(EvaluatorTests.parse(self, input), Environment())
+
+    def describe(self, result):
+        if type(result) is Error:
+            return (result.message, result.position)
+        if type(result) is Array:
+            return [self.describe(e) for e in result.elements]
+        return None if result is None else result.inspect()
+
+    def test_same_results(self):
+        for input in self.programs:
+            expected = self.describe(self.run_program(input, None))
+            for threshold in (1, 2):
+                self.assertEqual(self.describe(self.run_program(input, threshold)), expected, input)
+
+    def test_tier_up(self):
+        input = 'let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; [fib, fib(10)]'
+        result = self.run_program(input, 5)
+        fib = result.elements[0]
+        self.assertEqual(result.elements[1].value, 55)
+        self.assertIsNotNone(fib.jitted)
+        self.assertIn('i0 = v0.value', fib.jitted.source)
+        self.assertEqual(jit.stats['tier_ups'], 1)
+        self.assertEqual(jit.stats['deoptimizations'], 0)
+
+    def test_below_threshold(self):
+        result = self.run_program('let f = fn(x) { x }; f(1); f(2); f', 3)
+        self.assertEqual(result.calls, 2)
+        self.assertIsNone(result.jitted)
+        self.assertEqual(jit.stats['tier_ups'], 0)
+
+    def test_disabled(self):
+        result = self.run_program('let f = fn(x) { x }; f(1); f(2); f', None)
+        self.assertIsNone(result.jitted)
+
+    def test_deoptimize(self):
+        result = self.run_program('let f = fn(x) { x + x }; [f(1), f(2), f("a"), f("b"), f]', 1)
+        self.assertEqual(result.inspect()[:14], '[2, 4, aa, bb,')
+        f = result.elements[4]
+        self.assertEqual(jit.stats['deoptimizations'], 1)
+        self.assertEqual(jit.stats['translations'], 2)
+        self.assertNotIn('Integer', f.jitted.source)
+
+    def test_translation_is_shared(self):
+        input = 'let make = fn() { fn(x) { x * 2 } }; let f = make(); let g = make(); [f(1), f(2), g(3), g(4)]'
+        self.assertEqual(self.run_program(input, 1).inspect(), '[2, 4, 6, 8]')
+        # make returns a function literal, so only f and g are compiled
+        self.assertEqual(jit.stats['tier_ups'], 2)
+        self.assertEqual(jit.stats['translations'], 1)
+
+    def test_translations_are_bounded(self):
+        input = 'let f = fn(x) { x }; let g = fn(x) { x }; let h = fn(x) { x }; [f(1), g(1), h(1), f(2)]'
+        jit.translations.clear()
+        with mock.patch.object(jit, 'TRANSLATIONS', 2):
+            self.assertEqual(self.run_program(input, 1).inspect(), '[1, 1, 1, 2]')
+        self.assertEqual(len(jit.translations), 2)
+        self.assertEqual(jit.stats['translations'], 3)
+
+    def test_unsupported(self):
+        input = 'let f = fn(x) { fn() { x } }; f(1); f(2)'
+        self.assertEqual(self.run_program(input, 1).inspect(), 'fn() {\nx\n}')
+        self.assertEqual(jit.stats['tier_ups'], 0)
+        self.assertEqual(jit.stats['unsupported'], 1)
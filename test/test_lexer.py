@@ -1,5 +1,10 @@
+import io
+import mmap
+import os
+import tempfile
 import unittest
-from monkey.lexer import Lexer
+from monkey.lexer import Lexer, TableLexer, StreamingLexer
+from monkey.parser import Parser
 from monkey.token import Token, TokenType
 
 
@@ -63,3 +68,92 @@ class TestLexer(unittest.TestCase):
         for o in output_list:
             t = l.next_token()
             self.assert_token_equal(t, o)
+
+
+class TestTableLexer(unittest.TestCase):
+    def assert_same_tokens(self, input_str):
+        expected = Lexer(input_str)
+        actual = TableLexer(input_str)
+        while True:
+            e = expected.next_token()
+            a = actual.next_token()
+            self.assertEqual(a._type, e._type)
+            self.assertEqual(a._literal, e._literal)
+            self.assertEqual(a.position, e.position)
+            if e._type == TokenType.EOF:
+                break
+
+    def test_next_token(self):
+        input_str = '  =+(){},;abc56!-/*5;5 < 10 > 5;if (5 < 10) {return true;} else {return false;}10 == 10;10 != 9;'
+        self.assert_same_tokens(input_str)
+
+    def test_matches_lexer(self):
+        inputs = [
+            '',
+            '   \t\r\n',
+            'let add = fn(x, y) { x + y; };\nadd(five, ten);',
+            '"foobar" "foo bar" "" [1, 2][0]',
+            '=!===!=!',
+            'a_b @ # $ 12x',
+            '١٢ + 3',
+        ]
+        for input_str in inputs:
+            self.assert_same_tokens(input_str)
+
+    def test_eof_is_sticky(self):
+        l = TableLexer('x')
+        self.assertEqual(l.next_token()._type, TokenType.IDENT)
+        self.assertEqual(l.next_token()._type, TokenType.EOF)
+        self.assertEqual(l.next_token()._type, TokenType.EOF)
+
+
+class TestStreamingLexer(unittest.TestCase):
+    input_str = 'let s = "a long string literal";\nlet f = fn(x) { x == 10 != false; };\nf(s)[0]; \u00e9\u0661\u0662;\n'
+
+    def assert_same_tokens(self, expected, actual):
+        while True:
+            e = expected.next_token()
+            a = actual.next_token()
+            self.assertEqual(a._type, e._type)
+            self.assertEqual(a._literal, e._literal)
+            self.assertEqual(actual.token_start, expected.token_start)
+            if e._type == TokenType.EOF:
+                break
+
+    def test_chunk_boundaries(self):
+        for chunk_size in range(1, 12):
+            expected = TableLexer(self.input_str)
+            actual = StreamingLexer(io.StringIO(self.input_str), chunk_size)
+            self.assert_same_tokens(expected, actual)
+
+    def test_binary_chunks_split_characters(self):
+        data = self.input_str.encode('utf-8')
+        for chunk_size in range(1, 5):
+            expected = TableLexer(self.input_str)
+            actual = StreamingLexer(io.BytesIO(data), chunk_size)
+            self.assert_same_tokens(expected, actual)
+
+    def test_file_larger_than_chunk(self):
+        input_str = self.input_str * 500
+        fd, path = tempfile.mkstemp(suffix='.mk')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(input_str)
+            with open(path, 'rb') as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    actual = StreamingLexer(m, chunk_size=256)
+                    self.assert_same_tokens(TableLexer(input_str), actual)
+                    self.assertLess(len(actual.input_str), 512)
+                finally:
+                    m.close()
+        finally:
+            os.remove(path)
+
+    def test_parser(self):
+        input_str = 'let x = 5 * (2 + 3); let y = x == 25;'
+        expected = Parser(Lexer(input_str)).parse_program()
+        p = Parser(StreamingLexer(io.StringIO(input_str), chunk_size=4))
+        program = p.parse_program()
+        self.assertEqual(p.errors, [])
+        self.assertEqual(str(program), str(expected))
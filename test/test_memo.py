@@ -0,0 +1,175 @@
+import sys
+import unittest
+from unittest import mock
+from monkey import memo
+from monkey.ast import FunctionLiteral
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.memo import memoize
+from monkey.object import Error
+from monkey.resolver import children
+from test.test_evaluator import EvaluatorTests
+
+
+class TestMemoizedEvaluator(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        program = self.parse(input)
+        memoize(program)
+        return evaluate(program, Environment())
+
+
+class TestPurity(unittest.TestCase):
+    def pure(self, input):
+        # the function literals of input, outermost first, and whether they
+        # are memoized
+        program = EvaluatorTests.parse(self, input)
+        memoize(program)
+        found = []
+
+        def visit(node):
+            if type(node) is FunctionLiteral:
+                found.append(node.memo is not None)
+                visit(node.body)
+            for child in children(node):
+                visit(child)
+        visit(program)
+        return found
+
+    def test_pure(self):
+        cases = [
+            'fn(x) { x * 2 }',
+            'fn(a, b) { let c = a + b; if (c > 10) { return c; } c * 2 }',
+            'let fib = fn(n) { if (n < 2) { return n; } fib(n - 1) + fib(n - 2) };',
+            'fn(s) { len(s) + 1 }',
+            'fn(f, x) { f(x) }',
+            'fn(pair) { pair[0] == 0 }',
+            'let n = 1; fn(n) { n }',
+        ]
+        for input in cases:
+            self.assertEqual(self.pure(input), [True], input)
+
+    def test_impure(self):
+        cases = [
+            # free variables
+            'let y = 1; fn(x) { x + y }',
+            'fn(x) { z }',
+            # arrays compared by identity
+            'fn(a, b) { a == b }',
+            # a parameter bound again, or a variable that could be looked up
+            # further out before it is assigned
+            'let n = 1; fn(n) { let n = if (n) { 1 }; n }',
+            'let y = 1; fn(x) { if (x) { let y = 2; } y }',
+            'fn(x) { let len = 1; len }',
+            # callees
+            'fn(x) { g(x) }',
+            'let g = fn(x) { x }; let g = fn(x) { 2 }; fn(x) { g(x) }',
+            'let g = 1; fn(x) { g(x) }',
+            'fn(x) { puts(x) }',
+        ]
+        for input in cases:
+            self.assertEqual(self.pure(input)[-1], False, input)
+
+    def test_nested_functions(self):
+        self.assertEqual(self.pure('fn(x) { fn(y) { y } }'), [False, True])
+        self.assertEqual(self.pure('fn(x) { fn(y) { x } }'), [False, False])
+
+    def test_callees(self):
+        self.assertEqual(self.pure('let g = fn(x) { x + y }; let f = fn(x) { g(x) };'), [False, False])
+        self.assertEqual(self.pure('let g = fn(x) { h(x) }; let h = fn(x) { g(x) };'), [True, True])
+        # g is looked up further out until it is assigned
+        self.assertEqual(self.pure('let g = 1; let f = fn() { let h = fn(x) { g(x) }; let g = fn(x) { x }; h };'),
+                         [False, False, True])
+
+
+class TestMemoize(unittest.TestCase):
+    def run_memoized(self, input, **limits):
+        program = EvaluatorTests.parse(self, input)
+        memoizer = memoize(program, **limits)
+        return evaluate(program, Environment()), memoizer
+
+    def test_hits_and_misses(self):
+        result, memoizer = self.run_memoized(
+            'let fib = fn(n) { if (n < 2) { return n; } fib(n - 1) + fib(n - 2) }; fib(60)')
+        self.assertEqual(result.value, 1548008755920)
+        self.assertEqual([m.name for m in memoizer.memos], ['fib'])
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.skipped), (61, 58, 0))
+        # keys of one value, results of one
+        self.assertEqual((memoizer.entries, memoizer.size), (61, 61 * 3))
+        memoizer.clear()
+        self.assertEqual((memoizer.entries, memoizer.size), (0, 0))
+
+    def test_arguments(self):
+        _, memoizer = self.run_memoized('let f = fn(x) { 1 }; f(1); f(1); f("1"); f(true); f([1, [2]]); f([1, [2]]);'
+                                        'f(fn() { 1 }); f(len); f(if (false) { 1 }); f([1, len])')
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.skipped), (4, 2, 4))
+        with mock.patch.object(memo, 'KEY_SIZE', 5):
+            _, memoizer = self.run_memoized('let f = fn(x) { 1 }; f([1, 2, 3, 4]); f([1, 2, 3, 4]); f([1, 2, 3, 4, 5])')
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.skipped), (1, 1, 1))
+
+    def test_float_arguments(self):
+        # 4 / 2 is an integer of value 2.0, which must not find the result for 2
+        result, memoizer = self.run_memoized('let f = fn(x) { x * 3 }; f(2); f(4 / 2)')
+        self.assertEqual((type(result.value), result.value), (float, 6.0))
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.skipped), (1, 0, 1))
+        result, memoizer = self.run_memoized('let f = fn(x) { x * 3 }; f(4 / 2); f(2)')
+        self.assertEqual((type(result.value), result.value), (int, 6))
+
+    def test_give_up(self):
+        with mock.patch.object(memo, 'GIVE_UP', 2):
+            _, memoizer = self.run_memoized('let f = fn(x) { 1 }; f(len); f(len); f(1); f(1)')
+            self.assertEqual((memoizer.misses, memoizer.hits, memoizer.skipped), (0, 0, 4))
+            _, memoizer = self.run_memoized('let f = fn(x) { 1 }; f(1); f(1); f(len); f(len); f(len); f(1)')
+            self.assertEqual((memoizer.misses, memoizer.hits, memoizer.skipped), (1, 2, 3))
+
+    def test_results(self):
+        # arrays are equal only to themselves, so they are not cached
+        result, memoizer = self.run_memoized('let f = fn(x) { [x] }; f(1) == f(1)')
+        self.assertIs(result.value, False)
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.entries), (2, 0, 0))
+        result, memoizer = self.run_memoized('let f = fn(x) { if (x) { 1 } }; f(false); f(false); f(true)')
+        self.assertEqual(result.value, 1)
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.entries), (2, 1, 2))
+
+    def test_errors_are_not_cached(self):
+        result, memoizer = self.run_memoized('let f = fn(x) { x + true }; f(1); f(1)')
+        self.assertIsInstance(result, Error)
+        self.assertEqual(result.message, 'type mismatch: INTEGER + BOOLEAN')
+        self.assertEqual((memoizer.misses, memoizer.hits, memoizer.entries), (1, 0, 0))
+
+    def test_limit(self):
+        _, memoizer = self.run_memoized('let f = fn(x) { x }; f(1); f(2); f(3); f(1); f(3); f(2)', limit=2)
+        memo = memoizer.memos[0]
+        self.assertEqual((memo.misses, memo.hits, memo.evictions), (5, 1, 3))
+        self.assertEqual(list(memo.results), [(3,), (2,)])
+
+    def test_capacity(self):
+        # each entry has a size of 3: a key of one value and the result
+        _, memoizer = self.run_memoized('let f = fn(x) { x }; let g = fn(x) { x };'
+                                        'f(1); f(2); f(3); g(1); g(2); g(1); f(4)', capacity=9)
+        f, g = memoizer.memos
+        self.assertEqual((memoizer.entries, memoizer.size), (3, 9))
+        self.assertEqual(list(f.results), [(2,), (3,), (4,)])
+        self.assertEqual(list(g.results), [])
+        self.assertEqual((g.misses, g.hits), (3, 0))
+        self.assertEqual((f.misses, f.hits, f.evictions), (4, 0, 1))
+
+    def test_capacity_counts_strings(self):
+        # a key of 1 + (1 + 10) and a result of 1 + 20, then 1 + (1 + 1) and 1 + 2
+        _, memoizer = self.run_memoized('let f = fn(s) { s + s }; f("abcdefghij"); f("a")', capacity=36)
+        f = memoizer.memos[0]
+        self.assertEqual(list(f.results), [('a',)])
+        self.assertEqual((memoizer.entries, memoizer.size, f.evictions), (1, 6, 1))
+        _, memoizer = self.run_memoized('let f = fn(s) { s + s }; f("abcdefghij")', capacity=32)
+        self.assertEqual((memoizer.entries, memoizer.size), (0, 0))
+
+    def test_deep_recursion(self):
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(20000)
+        try:
+            result, memoizer = self.run_memoized(
+                'let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };'
+                'count(300) + count(300) + count(301)', limit=1000)
+        finally:
+            sys.setrecursionlimit(limit)
+        self.assertEqual(result.value, 901)
+        self.assertEqual((memoizer.misses, memoizer.hits), (302, 2))
@@ -0,0 +1,121 @@
+import unittest
+from monkey.closure_compiler import execute
+from monkey.compiler import Compiler
+from monkey.environment import Environment
+from monkey.evaluator import evaluate
+from monkey.object import Array, Error
+from monkey.optimizer import optimize
+from monkey.peephole import optimize as optimize_bytecode
+from monkey.stack_evaluator import stack_evaluate
+from monkey.vm import VM
+from test.test_evaluator import EvaluatorTests
+
+
+def run_vm(program, env):
+    compiler = Compiler()
+    compiler.compile(program)
+    return VM(optimize_bytecode(compiler.bytecode())).run()
+
+
+ENGINES = {'evaluate': evaluate, 'closures': execute, 'stack': stack_evaluate, 'vm': run_vm}
+
+
+class TestOptimizedEvaluator(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        return evaluate(optimize(self.parse(input)), Environment())
+
+
+class TestOptimizer(unittest.TestCase):
+    def assert_optimized(self, input, expected):
+        self.assertEqual(str(optimize(EvaluatorTests.parse(self, input))), expected, input)
+
+    def test_constant_folding(self):
+        self.assert_optimized('1 + 2 * 3', '7')
+        self.assert_optimized('-(5 - 10)', '5')
+        self.assert_optimized('!false == true', 'true')
+        self.assert_optimized('"a" + "b" + "c"', 'abc')
+        self.assert_optimized('fn(x) { x + (2 * 3) }', '(x)(x + 6)')
+
+    def test_errors_are_not_folded(self):
+        self.assert_optimized('1 + true', '(1 + true)')
+        self.assert_optimized('-"a"', '(-a)')
+        self.assert_optimized('"a" - "b"', '(a - b)')
+        self.assert_optimized('10 / (1 + 1)', '(10 / 2)')
+
+    def test_dead_branches(self):
+        self.assert_optimized('if (1 < 2) { 10 } else { 20 }', '10')
+        self.assert_optimized('if (!true) { 10 } else { let x = 2; x }', 'let x = 2;x')
+        self.assert_optimized('let y = if (false) { 1 } else { 2 }', 'let y = 2;')
+        self.assert_optimized('if (false) { 1 }; 2', '2')
+        self.assert_optimized('1; if (false) { 1 }', '1iffalse ')
+        self.assert_optimized('[if (true) { 1 } else { 2 }]', '[1]')
+
+    def test_unreachable_statements(self):
+        self.assert_optimized('fn() { 1; return 2; 3; 4 }', '()1return 2;')
+        self.assert_optimized('return 1; let x = 2;', 'return 1;')
+        self.assert_optimized('fn() { if (true) { return 1; } 2 }', '()return 1;')
+
+    def test_inlining(self):
+        self.assert_optimized('let sq = fn(x) { x * x }; sq(4)', 'let sq = (x)(x * x);16')
+        self.assert_optimized('let add = fn(a, b) { return a + b; }; add("x", "y")',
+                              'let add = (a, b)return (a + b);;xy')
+        self.assert_optimized('let sq = fn(x) { x * x }; sq(true)', 'let sq = (x)(x * x);(true * true)')
+
+    def test_not_inlined(self):
+        cases = [
+            # not literal arguments
+            'let sq = fn(x) { x * x }; let y = 2; sq(y)',
+            # wrong number of arguments
+            'let sq = fn(x) { x * x }; sq(1, 2)',
+            # called before the let
+            'sq(2); let sq = fn(x) { x * x };',
+            # bound twice
+            'let sq = fn(x) { x * x }; let sq = fn(x) { x }; sq(2)',
+            # free variables
+            'let y = 1; let f = fn(x) { x + y }; f(2)',
+            # recursive
+            'let f = fn(x) { f(x) }; f(1)',
+            # shadowed
+            'let sq = fn(x) { x * x }; fn(sq) { sq(2) }',
+            'let sq = fn(x) { x * x }; fn() { let sq = 1; sq(2) }',
+            # more than one statement
+            'let f = fn(x) { x; x }; f(1)',
+            # statements that would act in the caller
+            'let f = fn(x) { if (x) { return 7; } }; f(true) + 1',
+            'let f = fn(x) { if (x) { let y = x; y } }; f(true)',
+        ]
+        for input in cases:
+            program = EvaluatorTests.parse(self, input)
+            expected = str(program)
+            self.assertEqual(str(optimize(program)), expected, input)
+
+    def test_same_results_on_every_engine(self):
+        programs = [
+            '1 + true',
+            'let f = fn(x) { if (1 > 2) { 10 } else { x + "a" } }; f(3)',
+            'let f = fn() { return 1; 2 + true; }; f()',
+            'let sq = fn(x) { x * x }; sq(4) + sq("a")',
+            'let add = fn(a, b) { a + b }; add(1, 2) + add(1, true)',
+            'let f = fn(x) { x(1) }; f(5)',
+            'let y = 7; let f = fn() { let g = fn() { y }; return g(); let y = 2; }; f()',
+            'let x = 1; if (false) { let x = 2; } x',
+            '[1 + 1, if (true) { 3 }, if (false) { 3 }]',
+            '5; if (false) { 1 }',
+            'if (0) { } else { 5 }',
+            'let f = fn(x) { if (x) { return 7; } }; f(true) + 1',
+            'let f = fn(x) { if (x) { return 7; } }; f(true); 9',
+            'let f = fn(x) { if (x) { let y = x; y } }; f(3)',
+        ]
+
+        def describe(result):
+            if type(result) is Error:
+                return (result.message, result.position)
+            if type(result) is Array:
+                return [describe(e) for e in result.elements]
+            return None if result is None else result.inspect()
+
+        for input in programs:
+            for name, run in ENGINES.items():
+                expected = describe(run(EvaluatorTests.parse(self, input), Environment()))
+                optimized = optimize(EvaluatorTests.parse(self, input))
+                self.assertEqual(describe(run(optimized, Environment())), expected, (name, input))
@@ -1,6 +1,6 @@
 import unittest
-from monkey.lexer import Lexer
-from monkey.parser import Parser
+from monkey.lexer import Lexer, TableLexer
+from monkey.parser import Parser, StackParser
 
 
 class TestParser(unittest.TestCase):
@@ -20,6 +20,41 @@ class TestParser(unittest.TestCase):
             n = expect_identifier_names[i]
             self.assert_let_statement_name_equal(s, n)
 
+    def test_positions_and_literals(self):
+        input = 'let x = 5;\n(a + b) * -c;\nif (x) { "s" }'
+        l = Lexer(input)
+        p = Parser(l)
+
+        program = p.parse_program()
+        self.check_parse_errors(p)
+        let, exp, cond = program.statements
+        self.assertEqual((let.position, let.name.position, let.value.position), (0, 4, 8))
+        self.assertEqual(let.value.token_literal(), '5')
+        self.assertEqual(exp.token_literal(), 'a')
+        self.assertEqual(exp.expression.token_literal(), '*')
+        self.assertEqual(exp.expression.position, 19)
+        self.assertEqual(exp.expression.right.position, 21)
+        block = cond.expression.consequence
+        self.assertEqual((block.position, block.statements[0].position), (32, 34))
+        self.assertEqual(block.statements[0].token_literal(), 's')
+
+    def test_function_parameters(self):
+        input = 'fn() {}; fn(x) {}; fn(x, y, z) {};'
+        p = Parser(Lexer(input))
+
+        program = p.parse_program()
+        self.check_parse_errors(p)
+        params = [[str(i) for i in s.expression.parameters] for s in program.statements]
+        self.assertEqual(params, [[], ['x'], ['x', 'y', 'z']])
+
+    def test_index_expression(self):
+        input = 'myArray[1 + 1]; a[b][c]'
+        p = Parser(Lexer(input))
+
+        program = p.parse_program()
+        self.check_parse_errors(p)
+        self.assertEqual(str(program), '(myArray[(1 + 1)])((a[b])[c])')
+
     def assert_let_statement_name_equal(self, statement, name):
         self.assertEqual(statement.token_literal(), "let")
         self.assertEqual(statement.name.value, name)
@@ -36,3 +71,36 @@ class TestParser(unittest.TestCase):
             print("parse error: {}".format(msg))
 
         self.fail()
+
+
+class TestStackParser(unittest.TestCase):
+    input = """let add = fn(x, y) { return x + y * -2; };
+let r = if (add(1, 2) > 3 == !true) { [1, "a", add][2](4, 5) } else { (1 + 2) * 3 };
+r[0] != 10 / 2 - 1;
+let = 5; (1 + ; if (x) { 1 } else 2
+"""
+
+    def test_same_as_parser(self):
+        expected = Parser(Lexer(self.input))
+        expected_program = expected.parse_program()
+        p = StackParser(Lexer(self.input))
+        program = p.parse_program()
+        self.assertEqual(str(program), str(expected_program))
+        self.assertEqual(p.errors, expected.errors)
+        self.assertGreater(len(p.errors), 0)
+
+    def test_deep_nesting(self):
+        depth = 5000
+        inputs = [
+            '(' * depth + 'x' + ')' * depth,
+            '-' * depth + 'x',
+            'f(' * depth + ')' * depth,
+            '[' * depth + ']' * depth,
+            'if (x) {' * depth + '}' * depth,
+            ' + '.join(['fn(x) { x }'] * depth),
+        ]
+        for input in inputs:
+            p = StackParser(TableLexer(input))
+            program = p.parse_program()
+            self.assertEqual(p.errors, [])
+            self.assertEqual(len(program.statements), 1)
@@ -0,0 +1,132 @@
+import unittest
+from monkey.code import DefinitionType as Op
+from monkey.compiler import Compiler
+from monkey.object import CompiledFunction
+from monkey.peephole import optimize
+from monkey.vm import VM
+from test.test_compiler import instructions
+from test.test_evaluator import EvaluatorTests
+
+NONE = dict(fold_constants=False, thread_jumps=False, remove_dead_code=False, superinstructions=False)
+
+
+class TestOptimizedVM(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        compiler = Compiler()
+        compiler.compile(self.parse(input))
+        return VM(optimize(compiler.bytecode())).run()
+
+    def test_optimize_twice(self):
+        compiler = Compiler()
+        compiler.compile(self.parse('let f = fn(n) { if (n < 2) { n } else { f(n - 1) + 1 } }; f(30)'))
+        bytecode = optimize(compiler.bytecode())
+        self.assertEqual(VM(optimize(bytecode)).run().value, 30)
+
+
+class TestPeephole(unittest.TestCase):
+    def optimized(self, input, **options):
+        compiler = Compiler()
+        compiler.compile(EvaluatorTests.parse(self, input))
+        return optimize(compiler.bytecode(), **dict(NONE, **options))
+
+    def assert_optimized(self, input, expected, **options):
+        bytecode = self.optimized(input, **options)
+        self.assertEqual(bytes(bytecode['instructions']), expected, input)
+        return bytecode
+
+    def assert_function(self, input, expected, **options):
+        bytecode = self.optimized(input, **options)
+        fn = [c for c in bytecode['constants'] if isinstance(c, CompiledFunction)][0]
+        self.assertEqual(bytes(fn.instructions), expected, input)
+        return fn
+
+    def test_no_optimization(self):
+        self.assert_optimized('1 + 2', instructions(
+            (Op.op_constant, 0), (Op.op_constant, 1), Op.op_add, Op.op_return_value,
+        ))
+
+    def test_fold_constants(self):
+        bytecode = self.assert_optimized('1 + 2 * 3 - -4', instructions(
+            (Op.op_constant, 7), Op.op_return_value,
+        ), fold_constants=True)
+        self.assertEqual(bytecode['constants'][7].value, 11)
+        self.assert_optimized('!(1 < 2) == !true', instructions(
+            Op.op_true, Op.op_return_value,
+        ), fold_constants=True)
+        bytecode = self.assert_optimized('"a" + "b"', instructions(
+            (Op.op_constant, 2), Op.op_return_value,
+        ), fold_constants=True)
+        self.assertEqual(bytecode['constants'][2].value, 'ab')
+        # operations that can fail are kept
+        self.assert_optimized('1 + true', instructions(
+            (Op.op_constant, 0), Op.op_true, Op.op_add, Op.op_return_value,
+        ), fold_constants=True)
+        self.assert_optimized('if (1 > 2) { 3 }', instructions(
+            (Op.op_jump, 9), (Op.op_constant, 2), (Op.op_jump, 10), Op.op_null, Op.op_return_value,
+        ), fold_constants=True)
+
+    def test_thread_jumps(self):
+        self.assert_function('fn(x) { if (x) { if (x) { 1 } else { 2 } } else { 3 } }', instructions(
+            (Op.op_get_local, 0),
+            (Op.op_jump_not_truthy, 18),
+            (Op.op_get_local, 0),
+            (Op.op_jump_not_truthy, 14),
+            (Op.op_constant, 0),
+            Op.op_return_value,
+            (Op.op_constant, 1),
+            Op.op_return_value,
+            (Op.op_constant, 2),
+            Op.op_return_value,
+        ), thread_jumps=True)
+
+    def test_remove_dead_code(self):
+        self.assert_function('let f = fn(x) { return x; 1; }; 2; len', instructions(
+            (Op.op_get_local, 0), Op.op_return_value,
+        ), remove_dead_code=True)
+        self.assert_optimized('let f = fn(x) { return x; 1; }; 2; fn() {}; len', instructions(
+            (Op.op_closure, 1), (Op.op_set_global, 0), (Op.op_get_builtin, 0), Op.op_return_value,
+        ), remove_dead_code=True)
+        # reading a variable can fail
+        self.assert_optimized('x; 1', instructions(
+            (Op.op_get_global, 0), Op.op_pop, (Op.op_constant, 0), Op.op_return_value,
+        ), remove_dead_code=True)
+
+    def test_superinstructions(self):
+        fn = self.assert_function('fn(x) { if (x < 1) { x } else { x + 1 - x } }', instructions(
+            (Op.op_get_local_constant, 0, 0),
+            (Op.op_compare_jump, int(Op.op_less_than), 13),
+            (Op.op_get_local, 0),
+            (Op.op_jump, 20),
+            (Op.op_add_local_constant, 0, 0),
+            (Op.op_get_local, 0),
+            Op.op_sub,
+            Op.op_return_value,
+        ), superinstructions=True)
+        # errors in fused instructions keep their positions
+        self.assertEqual(fn.positions, {4: 14, 13: 34, 19: 38})
+        self.assertEqual(sorted(fn.lookups), [0, 8, 13, 17])
+        self.assert_function('fn(x) { x }', instructions(
+            (Op.op_return_local, 0),
+        ), superinstructions=True)
+
+    def describe(self, result):
+        return None if result is None else result.inspect()
+
+    def test_removed_jump_targets(self):
+        # folding deletes instructions other jumps go to
+        cases = [
+            'let a = [if (true) { 1 } else { 2 }, if (true) { 3 } else { 4 }]; a;',
+            'len(if(0){},if(3){})',
+            'let f=0;(if(!f){}else{if(""){}})',
+            'let f = fn(x) { [if (true) { x } else { 2 }, if (1) { 3 }] }; f(5)',
+        ]
+        for input in cases:
+            expected = self.describe(VM(self.optimized(input)).run())
+            for options in (dict(fold_constants=True), dict(fold_constants=True, thread_jumps=True),
+                            dict(fold_constants=True, remove_dead_code=True), NONE):
+                result = VM(self.optimized(input, **dict(options, superinstructions=True))).run()
+                self.assertEqual(self.describe(result), expected, (input, options))
+            compiler = Compiler()
+            compiler.compile(EvaluatorTests.parse(self, input))
+            result = VM(optimize(compiler.bytecode())).run()
+            self.assertEqual(self.describe(result), expected, input)
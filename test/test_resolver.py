@@ -0,0 +1,97 @@
+import unittest
+from unittest import mock
+from monkey import evaluator
+from monkey.environment import Environment, shadowed_builtins
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.repl import ENGINES, new_runner
+from monkey.resolver import BUILTIN, resolve, resolve_function
+
+
+class TestResolver(unittest.TestCase):
+    def parse(self, input):
+        p = Parser(Lexer(input))
+        program = p.parse_program()
+        self.assertEqual(p.errors, [])
+        return program
+
+    def test_top_level(self):
+        program = self.parse('let a = 1; if (a) { let b = a; }; len("x")')
+        env = Environment()
+        resolve(program, env)
+        self.assertEqual(list(env.names), ['a', 'b'])
+        self.assertIsNone(env.get('a'))
+        a = program.statements[1].expression.consequence.statements[0].value
+        self.assertEqual((a.depth, a.slot), (0, None))
+        len_ = program.statements[2].expression.function
+        self.assertEqual(len_.depth, BUILTIN)
+
+    def test_function_scope(self):
+        program = self.parse('let g = 1; fn(x, y) { let z = x; if (y) { let w = g; } fn(v) { x + v + z } }')
+        literal = program.statements[1].expression
+        env = Environment()
+        resolve(program, env)
+        self.assertIsNone(literal.scope)
+
+        scope = resolve_function(literal, env)
+        self.assertEqual(scope, {'x': 0, 'y': 1, 'z': 2, 'w': 3})
+        statements = literal.body.statements
+        x = statements[0].value
+        self.assertEqual((x.depth, x.slot), (0, 0))
+        g = statements[1].expression.consequence.statements[0].value
+        self.assertEqual((g.depth, g.slot), (1, None))
+        self.assertEqual(statements[1].expression.consequence.statements[0].name.slot, 3)
+
+        inner = statements[2].expression
+        self.assertIsNone(inner.scope)
+        call_env = Environment(scope, env)
+        resolve_function(inner, call_env)
+        x, v = inner.body.statements[0].expression.left.left, inner.body.statements[0].expression.left.right
+        z = inner.body.statements[0].expression.right
+        self.assertEqual((x.depth, x.slot), (1, 0))
+        self.assertEqual((v.depth, v.slot), (0, 0))
+        self.assertEqual((z.depth, z.slot), (1, 2))
+
+    def test_shadowed_builtin(self):
+        program = self.parse('fn() { len("x") }')
+        env = Environment()
+        env.set('len', None)
+        literal = program.statements[0].expression
+        resolve_function(literal, env)
+        len_ = literal.body.statements[0].expression.function
+        self.assertEqual((len_.depth, len_.slot), (1, None))
+
+    def test_builtin_shadowed_in_another_environment(self):
+        # the resolution is stored on the program, which both environments run
+        program = self.parse('let f = fn() { len("abc") }; f();')
+        for engine in ('evaluate', 'closures', 'stack'):
+            self.assertEqual(new_runner(engine)(program).value, 3, engine)
+        for engine in ('evaluate', 'closures', 'stack'):
+            run = new_runner(engine)
+            run(self.parse('let len = fn(x) { 42 };'))
+            self.assertEqual(run(program).value, 42, engine)
+            self.assertEqual(new_runner(engine)(program).value, 3, engine)
+        self.assertIn('len', shadowed_builtins)
+
+    def test_builtin_shadowed_in_repl(self):
+        # inputs run one after the other in the same globals
+        inputs = ['let f = fn(x) { len(x) };', 'f("abc")', 'let len = fn(x) { 0 };', 'f("abc")']
+        for engine in ENGINES:
+            run = new_runner(engine)
+            results = [run(self.parse(input)) for input in inputs]
+            self.assertEqual((results[1].value, results[3].value), (3, 0), engine)
+
+        with mock.patch.object(evaluator, 'JIT_THRESHOLD', 1):
+            run = new_runner('evaluate')
+            results = [run(self.parse(input)) for input in inputs + ['f("abc")']]
+        self.assertEqual([results[i].value for i in (1, 3, 4)], [3, 0, 0])
+
+    def test_environment(self):
+        outer = Environment()
+        outer.set('a', 1)
+        scope = {'b': 0}
+        env = Environment(scope, outer)
+        self.assertEqual(env.get('a'), 1)
+        env.set('c', 2)
+        self.assertEqual(env.get('c'), 2)
+        self.assertEqual(scope, {'b': 0})
@@ -0,0 +1,114 @@
+import mmap
+import os
+import tempfile
+import unittest
+from monkey import serialize
+from monkey.ast import Node, IndexExpression, ExpressionStatement, IntegerLiteral, Program
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.serialize import dumps, loads, LazyNodes, SerializeError
+from monkey.token import Token, TokenType
+
+
+def parse(input_str):
+    p = Parser(Lexer(input_str))
+    return p.parse_program()
+
+
+class TestSerialize(unittest.TestCase):
+    input_str = '''let five = 5;
+let add = fn(x) { if (x > -10) { return x + five; } else { !true } };
+add(five * (2 - 3)) == -1 != false;
+let s = "hello" + "world";
+let arr = [1, 2 * 3, add(4), "x"];
+'''
+
+    def assert_same_tree(self, a, b):
+        if isinstance(a, (list, LazyNodes)):
+            self.assertEqual(len(a), len(b))
+            for x, y in zip(a, b):
+                self.assert_same_tree(x, y)
+            return
+        self.assertIs(type(a), type(b))
+        if isinstance(a, Node):
+            for cls in type(a).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    self.assert_same_tree(getattr(a, name), getattr(b, name))
+        else:
+            self.assertEqual(a, b)
+
+    def test_round_trip(self):
+        program = parse(self.input_str)
+        loaded = loads(dumps(program))
+        self.assertEqual(str(loaded), str(program))
+        self.assertEqual(len(loaded.statements), len(program.statements))
+        for a, b in zip(program.statements, loaded.statements):
+            self.assert_same_tree(a, b)
+
+    def test_index_expression(self):
+        program = parse('arr')
+        exp = IndexExpression(Token(TokenType.LBRACKET, '['), program.statements[0].expression)
+        exp.index = parse('1 + 2').statements[0].expression
+        statement = ExpressionStatement(Token(TokenType.IDENT, 'arr'))
+        statement.expression = exp
+        program = Program()
+        program.statements.append(statement)
+        self.assertEqual(str(loads(dumps(program))), '(arr[(1 + 2)])')
+
+    def test_statements_are_lazy(self):
+        loaded = loads(dumps(parse(self.input_str)))
+        self.assertEqual(loaded.statements.nodes, [None] * 5)
+        add = loaded.statements[1].value
+        self.assertEqual(add.body.statements.nodes, [None])
+        self.assertEqual(str(add.body.statements[0].expression.condition), '(x > (-10))')
+        self.assertIsNone(loaded.statements.nodes[0])
+
+    def test_statements_are_mutable(self):
+        loaded = loads(dumps(parse('1; 2; 3; 4;')))
+        statements = loaded.statements
+        first = statements[0]
+        statements[1] = first
+        del statements[2]
+        statements.insert(0, None)
+        statements.append(first)
+        self.assertEqual([None if s is None else str(s) for s in statements], [None, '1', '1', '4', '1'])
+        statements[1:3] = []
+        self.assertEqual(len(statements), 3)
+        self.assertEqual([str(s) for s in statements[1:]], ['4', '1'])
+
+    def test_deep_tree(self):
+        # 1 + 1 + ... nests to the left without recursing in the parser
+        depth = 20000
+        program = parse(' + '.join(['1'] * depth))
+        loaded = loads(dumps(program))
+        node = loaded.statements[0].expression
+        count = 1
+        while type(node) is not IntegerLiteral:
+            self.assertEqual(node.right.value, 1)
+            node = node.left
+            count += 1
+        self.assertEqual(count, depth)
+
+    def test_strings_are_shared(self):
+        data = dumps(parse('five; five; five; five;'))
+        self.assertEqual(data.count(b'five'), 1)
+
+    def test_load_from_mmap(self):
+        program = parse(self.input_str)
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dumps(program))
+            with open(path, 'rb') as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.assertEqual(str(loads(m)), str(program))
+        finally:
+            os.remove(path)
+
+    def test_bad_input(self):
+        with self.assertRaises(SerializeError):
+            loads(b'XXXX' + bytes(8))
+        with self.assertRaises(SerializeError):
+            loads(b'MKA' + bytes([serialize.VERSION + 1]) + bytes(8))
+        with self.assertRaises(SerializeError):
+            dumps(object())
@@ -0,0 +1,42 @@
+import sys
+import unittest
+from monkey import stack_evaluator
+from monkey.environment import Environment
+from monkey.stack_evaluator import stack_evaluate
+from test.test_evaluator import EvaluatorTests
+
+
+class TestStackEvaluator(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        return stack_evaluate(self.parse(input), Environment())
+
+    def test_deep_recursion(self):
+        depth = sys.getrecursionlimit() * 10
+        evaluated = self.run_program(
+            'let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } }; count(%d)' % depth)
+        self.assertEqual(evaluated.value, depth)
+
+    def test_tail_calls(self):
+        self.assert_results([
+            ('let loop = fn(n, acc) { if (n == 0) { return acc; } return loop(n - 1, acc + 1); }; loop(50000, 0)', 50000),
+            ('let loop = fn(n) { if (n == 0) { "done" } else { loop(n - 1) } }; loop(50000)', 'done'),
+            ('let even = fn(n) { if (n == 0) { true } else { odd(n - 1) } };'
+             'let odd = fn(n) { if (n == 0) { false } else { even(n - 1) } }; even(50001)', False),
+        ])
+
+    def test_tail_call_frames(self):
+        # a tail call reuses the frame of the call it replaces
+        stacks = []
+        original = stack_evaluator.extend_function_env
+
+        def extend(fn, args):
+            frame = sys._getframe(1)
+            stacks.append(len(frame.f_locals['stack']))
+            return original(fn, args)
+
+        stack_evaluator.extend_function_env = extend
+        try:
+            self.run_program('let loop = fn(n) { if (n == 0) { 0 } else { loop(n - 1) } }; loop(100)')
+        finally:
+            stack_evaluator.extend_function_env = original
+        self.assertEqual(len(set(stacks[1:])), 1)
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+from monkey.lexer import Lexer
+from monkey.parser import Parser
+from monkey.serialize import dumps
+from monkey.token import Token, TokenType
+from monkey.token_stream import tokenize
+
+
+class TestTokenStream(unittest.TestCase):
+    def test_tokenize_matches_lexer(self):
+        input_str = 'let add = fn(x) { x + 10; };\nadd(5) == 15 != "a b" [1, 2]! @ 12٣'
+        stream = tokenize(input_str)
+        l = Lexer(input_str)
+        for i in range(len(stream)):
+            t = l.next_token()
+            self.assertEqual(stream.kind(i), t._type)
+            self.assertEqual(stream.literal(i), t._literal)
+            self.assertEqual(stream.token(i).position, t.position)
+        self.assertEqual(stream.kind(len(stream) - 1), TokenType.EOF)
+
+    def test_literal_slices_source(self):
+        stream = tokenize('foo "bar"')
+        self.assertEqual(stream.starts[0], 0)
+        self.assertEqual(stream.lengths[0], 3)
+        self.assertEqual(stream.starts[1], 5)
+        self.assertEqual(stream.literal(1), 'bar')
+
+    def test_reader(self):
+        reader = tokenize('let x = 5;').reader()
+        self.assertEqual(reader.next_token()._literal, 'let')
+        self.assertEqual(reader.next_token()._type, TokenType.IDENT)
+
+    def test_parser_consumes_reader(self):
+        input_str = 'let x = 5; let y = x * (2 + 3); if (x < y) { y } else { x };'
+        expected = Parser(Lexer(input_str)).parse_program()
+        p = Parser(tokenize(input_str).reader())
+        program = p.parse_program()
+        self.assertEqual(p.errors, [])
+        self.assertEqual(str(program), str(expected))
+
+    def test_stream_parser(self):
+        # trees, positions included, and errors are those of Parser
+        cases = [
+            'let add = fn(x, y) { return x + y * -2; }; add(1, [2, "s"][0]) == !true;',
+            'if (a < b) { a } else { if (c) { "x" } }; f(g(1)(2))[3] / 4 > 5 != 6',
+            'let = 5; let x 5; fn(x { x }; [1, 2; if (x { }; (1 + ; @',
+            '',
+        ]
+        for input in cases:
+            expected = Parser(Lexer(input))
+            expected_program = expected.parse_program()
+            p = tokenize(input).parser()
+            program = p.parse_program()
+            self.assertEqual(dumps(program), dumps(expected_program), input)
+            self.assertEqual(p.errors, expected.errors, input)
+
+    def test_stream_parser_creates_no_tokens(self):
+        stream = tokenize('let f = fn(x) { if (x > 1) { [x, "a"][0] } else { -x } }; f(2);')
+        with mock.patch.object(Token, '__init__', side_effect=AssertionError('Token created')):
+            program = stream.parser().parse_program()
+            with self.assertRaises(AssertionError):
+                Parser(stream.reader()).parse_program()
+        self.assertEqual(str(program), 'let f = (x)if(x > 1) ([x, a][0])else (-x);f(2)')
@@ -0,0 +1,43 @@
+import unittest
+from monkey.compiler import Compiler, new_symbol_table
+from monkey.object import Closure
+from monkey.vm import VM
+from test.test_evaluator import EvaluatorTests
+
+
+class TestVM(EvaluatorTests, unittest.TestCase):
+    def run_program(self, input):
+        compiler = Compiler()
+        compiler.compile(self.parse(input))
+        return VM(compiler.bytecode()).run()
+
+    def test_globals_persist(self):
+        symbol_table = new_symbol_table()
+        constants = []
+        globals_ = []
+        results = []
+        for input in ['let a = 2;', 'let f = fn(x) { x * a }; f', 'f(3) + b', 'let b = 1; f(3) + b']:
+            compiler = Compiler(symbol_table, constants)
+            compiler.compile(self.parse(input))
+            results.append(VM(compiler.bytecode(), globals_).run())
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], Closure)
+        self.assertEqual(results[2].message, 'identifier not found: b')
+        self.assertEqual(results[3].value, 7)
+
+    def test_deep_recursion(self):
+        evaluated = self.run_program(
+            'let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } }; count(20000)')
+        self.assertEqual(evaluated.value, 20000)
+
+    def test_large_arrays(self):
+        evaluated = self.run_program('[%s][2999]' % ', '.join(['1'] * 2999 + ['2']))
+        self.assertEqual(evaluated.value, 2)
+
+    def test_arguments(self):
+        self.assert_results([
+            ('fn(a) { a }(1, 2)', 1),
+        ])
+        evaluated = self.run_program('fn(a, b) { a }(1)')
+        self.assertEqual(evaluated.message, 'wrong number of arguments: want=2, got=1')
+        self.assertEqual(evaluated.position, 14)